@@ -0,0 +1,52 @@
+"""sticker set position
+
+Revision ID: 6f2b8d41a7c3
+Revises: 1d9c6b3e8f52
+Create Date: 2026-10-18 14:22:48.306115
+
+Allows several ordered sticker sets per user and type. The new columns
+carry constant defaults, so adding them is a metadata-only change; the
+unique constraint is built from a concurrently created index and replaces
+the plain (user_id, sticker_set_type) index it makes redundant.
+
+Existing sets start with sticker_count 0 because their contents live only
+in Telegram; the bot backfills those counts with getStickerSet on startup.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f2b8d41a7c3'
+down_revision = '1d9c6b3e8f52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('sticker_set', sa.Column('position', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('sticker_set', sa.Column('sticker_count', sa.Integer(), server_default='0', nullable=False))
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE UNIQUE INDEX CONCURRENTLY uq_sticker_set_user_id_sticker_set_type_position '
+            'ON sticker_set (user_id, sticker_set_type, position)'
+        )
+        op.execute(
+            'ALTER TABLE sticker_set ADD CONSTRAINT uq_sticker_set_user_id_sticker_set_type_position '
+            'UNIQUE USING INDEX uq_sticker_set_user_id_sticker_set_type_position'
+        )
+        op.execute('DROP INDEX CONCURRENTLY ix_sticker_set_user_id_sticker_set_type')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY ix_sticker_set_user_id_sticker_set_type '
+            'ON sticker_set (user_id, sticker_set_type)'
+        )
+
+    op.drop_constraint('uq_sticker_set_user_id_sticker_set_type_position', 'sticker_set', type_='unique')
+    op.drop_column('sticker_set', 'sticker_count')
+    op.drop_column('sticker_set', 'position')
@@ -0,0 +1,100 @@
+"""telegram id bigint
+
+Revision ID: 8a41d2c6e5f0
+Revises: 3c8e1f4a9b27
+Create Date: 2026-10-18 10:41:37.905518
+
+Converts user.telegram_id from VARCHAR(512) to BIGINT without holding an
+ACCESS EXCLUSIVE lock for the duration of a table rewrite: a shadow column
+is kept in sync by a trigger, backfilled in small committed batches,
+indexed concurrently and then swapped in with a short metadata-only
+transaction.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a41d2c6e5f0'
+down_revision = '3c8e1f4a9b27'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10_000
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('telegram_id_bigint', sa.BigInteger(), nullable=True))
+    op.execute(
+        """
+        CREATE FUNCTION user_sync_telegram_id_bigint() RETURNS trigger AS $$
+        BEGIN
+            NEW.telegram_id_bigint := NEW.telegram_id::bigint;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER user_sync_telegram_id_bigint
+        BEFORE INSERT OR UPDATE OF telegram_id ON "user"
+        FOR EACH ROW EXECUTE FUNCTION user_sync_telegram_id_bigint()
+        """
+    )
+
+    with op.get_context().autocommit_block():
+        backfill = sa.text(
+            """
+            UPDATE "user" SET telegram_id_bigint = telegram_id::bigint
+            WHERE id IN (
+                SELECT id FROM "user"
+                WHERE telegram_id_bigint IS NULL
+                LIMIT :batch_size
+            )
+            """
+        )
+        if op.get_context().as_sql:
+            op.execute(
+                'UPDATE "user" SET telegram_id_bigint = telegram_id::bigint '
+                'WHERE telegram_id_bigint IS NULL'
+            )
+        else:
+            connection = op.get_bind()
+            while connection.execute(backfill, {"batch_size": BATCH_SIZE}).rowcount:
+                pass
+
+        op.execute(
+            'CREATE UNIQUE INDEX CONCURRENTLY user_telegram_id_bigint_key '
+            'ON "user" (telegram_id_bigint)'
+        )
+        op.execute(
+            'ALTER TABLE "user" ADD CONSTRAINT user_telegram_id_bigint_not_null '
+            'CHECK (telegram_id_bigint IS NOT NULL) NOT VALID'
+        )
+        op.execute(
+            'ALTER TABLE "user" VALIDATE CONSTRAINT user_telegram_id_bigint_not_null'
+        )
+
+    op.execute('DROP TRIGGER user_sync_telegram_id_bigint ON "user"')
+    op.execute('DROP FUNCTION user_sync_telegram_id_bigint()')
+    op.alter_column('user', 'telegram_id_bigint', nullable=False)
+    op.drop_constraint('user_telegram_id_bigint_not_null', 'user', type_='check')
+    op.drop_column('user', 'telegram_id')
+    op.alter_column('user', 'telegram_id_bigint', new_column_name='telegram_id')
+    op.execute(
+        'ALTER TABLE "user" ADD CONSTRAINT user_telegram_id_key '
+        'UNIQUE USING INDEX user_telegram_id_bigint_key'
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        'user',
+        'telegram_id',
+        type_=sa.String(length=512),
+        existing_type=sa.BigInteger(),
+        existing_nullable=False,
+        postgresql_using='telegram_id::text',
+    )
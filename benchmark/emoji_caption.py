@@ -0,0 +1,67 @@
+import argparse
+from timeit import repeat
+
+from emoji import distinct_emoji_list
+
+from util.emoji_caption import get_emojis, get_first_emoji
+
+CAPTIONS = {
+    "short": "my cat 😺",
+    "multi": "party 🎉🥳🎈 with friends 👩‍👩‍👧‍👦",
+    "long text": "lorem ipsum dolor sit amet " * 37 + "😈",
+    "no emoji": "no emoji here, just a long caption 1234567890 #tag " * 20,
+    "emoji spam": "😂🔥👍🏽❤️" * 256,
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare caption emoji extraction with emoji.distinct_emoji_list."
+    )
+    parser.add_argument("--number", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+def measure(func: str, caption: str, number: int, repeat_count: int) -> float:
+    timings = repeat(
+        func,
+        globals={
+            "caption": caption,
+            "distinct_emoji_list": distinct_emoji_list,
+            "get_emojis": get_emojis,
+            "get_first_emoji": get_first_emoji,
+        },
+        number=number,
+        repeat=repeat_count,
+    )
+    return min(timings) / number * 1_000_000
+
+
+def main() -> None:
+    args = parse_args()
+
+    print(
+        f"{'caption':<12} {'chars':>6} {'distinct_emoji_list':>20} "
+        f"{'get_first_emoji':>16} {'get_emojis':>11}  (µs per call)"
+    )
+
+    for name, caption in CAPTIONS.items():
+        baseline, first_emoji, emojis = (
+            measure(
+                func=func, caption=caption, number=args.number, repeat_count=args.repeat
+            )
+            for func in (
+                "distinct_emoji_list(caption)",
+                "get_first_emoji(caption)",
+                "get_emojis(caption)",
+            )
+        )
+        print(
+            f"{name:<12} {len(caption):>6} {baseline:>20.1f} "
+            f"{first_emoji:>16.1f} {emojis:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
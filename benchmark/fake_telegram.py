@@ -0,0 +1,189 @@
+import asyncio
+from collections.abc import Callable
+from io import BytesIO
+from itertools import count
+from random import Random
+from typing import Any, TypedDict
+
+from PIL import Image  # type: ignore
+from aiohttp import BodyPartReader, web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Benchmark", "username": "bench_bot"}
+MAX_STICKERS_PER_SET = 120
+ANIMATED_STICKER_SIZE = 32 * 1024
+
+
+class FakeTelegramStats(TypedDict):
+    requests: int
+    retry_afters: int
+    downloads: int
+    downloaded_bytes: int
+    uploaded_bytes: int
+    sticker_sets: int
+
+
+def create_picture_bytes(width: int, height: int) -> bytes:
+    with BytesIO() as output_io:
+        Image.new("RGB", (width, height), "purple").save(output_io, format="JPEG")
+        return output_io.getvalue()
+
+
+class FakeTelegram:
+    def __init__(  # noqa: CFQ002
+        self: "FakeTelegram",
+        latency: float,
+        jitter: float,
+        retry_after_rate: float,
+        retry_after: int,
+        seed: int,
+        on_reply: Callable[[int, int], None] | None = None,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.on_reply = on_reply
+
+        self._random = Random(seed)
+        self._message_ids = count(1)
+        self._sticker_sets: dict[str, int] = {}
+        self._picture_bytes = create_picture_bytes(width=1280, height=960)
+        self._animated_sticker_bytes = Random(seed).randbytes(ANIMATED_STICKER_SIZE)
+
+        self.requests = 0
+        self.retry_afters = 0
+        self.downloads = 0
+        self.downloaded_bytes = 0
+        self.uploaded_bytes = 0
+
+    def create_app(self: "FakeTelegram") -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.add_routes(
+            [
+                web.post("/bot{token}/{method}", self.handle_method),
+                web.get("/file/bot{token}/{path:.*}", self.handle_file),
+            ]
+        )
+        return app
+
+    async def _read_fields(
+        self: "FakeTelegram", request: web.Request
+    ) -> dict[str, str]:
+        fields: dict[str, str] = {}
+
+        if not request.content_type.startswith("multipart"):
+            return {key: str(value) for key, value in (await request.post()).items()}
+
+        reader = await request.multipart()
+
+        while (part := await reader.next()) is not None:
+            if not isinstance(part, BodyPartReader) or not part.name:
+                continue
+
+            if part.filename:
+                self.uploaded_bytes += len(await part.read())
+            else:
+                fields[part.name] = await part.text()
+
+        return fields
+
+    async def handle_method(self: "FakeTelegram", request: web.Request) -> web.Response:
+        self.requests += 1
+        method = request.match_info["method"].lower()
+        fields = await self._read_fields(request=request)
+
+        await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+
+        if self._random.random() < self.retry_after_rate:
+            self.retry_afters += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                },
+                status=429,
+            )
+
+        try:
+            result = self._call(method=method, fields=fields)
+        except ValueError as value_error:
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 400,
+                    "description": f"Bad Request: {value_error}",
+                },
+                status=400,
+            )
+
+        return web.json_response({"ok": True, "result": result})
+
+    def _call(  # noqa: CCR001
+        self: "FakeTelegram", method: str, fields: dict[str, str]
+    ) -> Any:
+        if method == "getme":
+            return BOT_USER
+
+        if method == "getfile":
+            return {
+                "file_id": fields["file_id"],
+                "file_unique_id": f"unique-{fields['file_id']}",
+                "file_path": f"files/{fields['file_id']}",
+            }
+
+        if method == "createnewstickerset":
+            if fields["name"] in self._sticker_sets:
+                raise ValueError("sticker set name is already occupied")
+
+            self._sticker_sets[fields["name"]] = 1
+            return True
+
+        if method == "addstickertoset":
+            if fields["name"] not in self._sticker_sets:
+                raise ValueError("STICKERSET_INVALID")
+
+            if self._sticker_sets[fields["name"]] >= MAX_STICKERS_PER_SET:
+                raise ValueError("STICKERS_TOO_MUCH")
+
+            self._sticker_sets[fields["name"]] += 1
+            return True
+
+        if method in ("sendmessage", "editmessagetext"):
+            chat_id = int(fields["chat_id"])
+
+            if self.on_reply and "reply_to_message_id" in fields:
+                self.on_reply(chat_id, int(fields["reply_to_message_id"]))
+
+            return {
+                "message_id": next(self._message_ids),
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private"},
+                "text": fields.get("text", ""),
+            }
+
+        return True
+
+    async def handle_file(self: "FakeTelegram", request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+
+        body = (
+            self._picture_bytes
+            if "photo" in request.match_info["path"]
+            else self._animated_sticker_bytes
+        )
+
+        self.downloads += 1
+        self.downloaded_bytes += len(body)
+        return web.Response(body=body)
+
+    def stats(self: "FakeTelegram") -> FakeTelegramStats:
+        return FakeTelegramStats(
+            requests=self.requests,
+            retry_afters=self.retry_afters,
+            downloads=self.downloads,
+            downloaded_bytes=self.downloaded_bytes,
+            uploaded_bytes=self.uploaded_bytes,
+            sticker_sets=len(self._sticker_sets),
+        )
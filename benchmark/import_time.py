@@ -0,0 +1,70 @@
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from statistics import median
+
+REPOSITORY_PATH = Path(__file__).resolve().parent.parent
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Measure how long importing a module takes, using -X importtime."
+    )
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    return parser.parse_args()
+
+
+def measure_import(module: str) -> dict[str, tuple[int, int]]:
+    completed_process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPOSITORY_PATH,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings: dict[str, tuple[int, int]] = {}
+
+    for line in completed_process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_time, cumulative_time, name = line.removeprefix("import time:").split("|")
+        timings[name.strip()] = (int(self_time), int(cumulative_time))
+
+    return timings
+
+
+def main() -> None:
+    args = parse_args()
+    runs = [measure_import(module=args.module) for _ in range(args.runs)]
+    names = set().union(*runs)
+
+    cumulative_times = {
+        name: median(run.get(name, (0, 0))[1] for run in runs) for name in names
+    }
+    self_times = {
+        name: median(run.get(name, (0, 0))[0] for run in runs) for name in names
+    }
+
+    print(
+        f"import {args.module}: {cumulative_times[args.module] / 1000:.1f} ms "
+        f"(median of {args.runs} runs)\n"
+    )
+    print(f"{'module':<50} {'cumulative ms':>14} {'self ms':>8}")
+
+    for name in sorted(names, key=cumulative_times.__getitem__, reverse=True)[
+        : args.top
+    ]:
+        print(
+            f"{name:<50} {cumulative_times[name] / 1000:>14.1f} "
+            f"{self_times[name] / 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import asyncio
+from dataclasses import dataclass, field
+from itertools import count
+from random import Random
+from time import monotonic
+from typing import Any
+
+from aiohttp import ClientSession
+
+UPDATE_KINDS = ("sticker", "animated_sticker", "photo", "start")
+
+
+@dataclass
+class LoadReport:
+    sent: int = 0
+    rejected: int = 0
+    answered: int = 0
+    duration: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+
+    @property
+    def unanswered(self: "LoadReport") -> int:
+        return self.sent - self.rejected - self.answered
+
+    @property
+    def throughput(self: "LoadReport") -> float:
+        return self.answered / self.duration if self.duration else 0.0
+
+    def percentile(self: "LoadReport", percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+
+        latencies = sorted(self.latencies)
+        index = min(int(len(latencies) * percent / 100), len(latencies) - 1)
+        return latencies[index]
+
+
+def build_message_update(
+    update_id: int, telegram_id: int, **message: Any
+) -> dict[str, Any]:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": telegram_id, "type": "private"},
+            "from": {
+                "id": telegram_id,
+                "is_bot": False,
+                "first_name": f"User {telegram_id}",
+                "username": f"user{telegram_id}",
+            },
+            **message,
+        },
+    }
+
+
+def build_start_message() -> dict[str, Any]:
+    return {
+        "text": "/start",
+        "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+    }
+
+
+def build_sticker_message(file_id: str, is_animated: bool) -> dict[str, Any]:
+    return {
+        "sticker": {
+            "file_id": file_id,
+            "file_unique_id": f"unique-{file_id}",
+            "type": "regular",
+            "width": 512,
+            "height": 512,
+            "is_animated": is_animated,
+            "is_video": False,
+            "emoji": "😈",
+            "set_name": "benchmark_source",
+        }
+    }
+
+
+def build_photo_message(file_id: str) -> dict[str, Any]:
+    return {
+        "caption": "😈",
+        "photo": [
+            {
+                "file_id": f"{file_id}-{width}",
+                "file_unique_id": f"unique-{file_id}-{width}",
+                "width": width,
+                "height": width * 3 // 4,
+                "file_size": width * width // 10,
+            }
+            for width in (90, 320, 800, 1280)
+        ],
+    }
+
+
+class LoadGenerator:
+    def __init__(  # noqa: CFQ002
+        self: "LoadGenerator",
+        webhook_url: str,
+        users: int,
+        rate: float,
+        duration: float,
+        mix: dict[str, float],
+        reply_timeout: float,
+        seed: int,
+    ) -> None:
+        self.webhook_url = webhook_url
+        self.users = users
+        self.rate = rate
+        self.duration = duration
+        self.mix = mix
+        self.reply_timeout = reply_timeout
+
+        self._random = Random(seed)
+        self._update_ids = count(1)
+        self._file_ids = count(1)
+        self._sent_at: dict[tuple[int, int], float] = {}
+        self._answered = asyncio.Event()
+        self._last_reply_at = 0.0
+        self._report = LoadReport()
+
+    def on_reply(self: "LoadGenerator", chat_id: int, message_id: int) -> None:
+        sent_at = self._sent_at.pop((chat_id, message_id), None)
+
+        if sent_at is None:
+            return
+
+        self._last_reply_at = monotonic()
+        self._report.answered += 1
+        self._report.latencies.append(self._last_reply_at - sent_at)
+
+        if not self._sent_at:
+            self._answered.set()
+
+    def _build_update(self: "LoadGenerator", kind: str, telegram_id: int) -> Any:
+        update_id = next(self._update_ids)
+        file_id = f"{kind}-{next(self._file_ids)}"
+
+        if kind == "start":
+            message = build_start_message()
+        elif kind == "photo":
+            message = build_photo_message(file_id=file_id)
+        else:
+            message = build_sticker_message(
+                file_id=file_id, is_animated=kind == "animated_sticker"
+            )
+
+        return build_message_update(
+            update_id=update_id, telegram_id=telegram_id, **message
+        )
+
+    async def _post(
+        self: "LoadGenerator", client_session: ClientSession, update: Any
+    ) -> None:
+        message = update["message"]
+        key = (message["chat"]["id"], message["message_id"])
+
+        self._answered.clear()
+        self._sent_at[key] = monotonic()
+        self._report.sent += 1
+
+        async with client_session.post(self.webhook_url, json=update) as response:
+            if response.status != 200:
+                self._sent_at.pop(key, None)
+                self._report.rejected += 1
+
+    async def _wait_for_replies(self: "LoadGenerator") -> None:
+        if not self._sent_at:
+            return
+
+        try:
+            await asyncio.wait_for(self._answered.wait(), timeout=self.reply_timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def register_users(self: "LoadGenerator") -> None:
+        async with ClientSession() as client_session:
+            await asyncio.gather(
+                *[
+                    self._post(
+                        client_session=client_session,
+                        update=self._build_update(kind="start", telegram_id=user),
+                    )
+                    for user in range(1, self.users + 1)
+                ]
+            )
+            await self._wait_for_replies()
+
+        self._sent_at.clear()
+        self._report = LoadReport()
+
+    async def run(self: "LoadGenerator") -> LoadReport:
+        kinds = list(self.mix)
+        weights = [self.mix[kind] for kind in kinds]
+        total = int(self.rate * self.duration)
+
+        async with ClientSession() as client_session:
+            started_at = monotonic()
+            post_tasks: list[asyncio.Task[None]] = []
+
+            for index in range(total):
+                delay = started_at + index / self.rate - monotonic()
+
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                update = self._build_update(
+                    kind=self._random.choices(kinds, weights)[0],
+                    telegram_id=self._random.randint(1, self.users),
+                )
+                post_tasks.append(
+                    asyncio.create_task(
+                        self._post(client_session=client_session, update=update)
+                    )
+                )
+
+            await asyncio.gather(*post_tasks)
+            sent_at = monotonic()
+            await self._wait_for_replies()
+
+            self._report.duration = max(sent_at, self._last_reply_at) - started_at
+
+        return self._report
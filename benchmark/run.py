@@ -0,0 +1,215 @@
+import argparse
+import asyncio
+import os
+import resource
+import signal
+import subprocess
+import sys
+from pathlib import Path
+from time import monotonic
+
+from aiohttp import ClientError, ClientSession, web
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from benchmark.fake_telegram import FakeTelegram
+from benchmark.load_generator import UPDATE_KINDS, LoadGenerator, LoadReport
+
+REPOSITORY_PATH = Path(__file__).resolve().parent.parent
+BENCHMARK_TABLES = (
+    "sticker",
+    "clone_job",
+    "upload_job",
+    "sticker_set",
+    '"user"',
+    "processed_update",
+    "pending_update",
+)
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix: dict[str, float] = {}
+
+    for item in value.split(","):
+        kind, _, weight = item.partition("=")
+
+        if kind not in UPDATE_KINDS:
+            raise argparse.ArgumentTypeError(f"Unknown update kind: {kind}")
+
+        mix[kind] = float(weight or 1)
+
+    return mix
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run the bot against a fake Telegram Bot API under load."
+    )
+    parser.add_argument(
+        "--database-url",
+        default=os.environ.get("BENCHMARK_DATABASE_URL"),
+        help="Dedicated Postgres database, its tables are truncated before the run",
+    )
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=20.0, help="Updates per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=parse_mix("sticker=6,animated_sticker=2,photo=1,start=1"),
+    )
+    parser.add_argument("--latency", type=float, default=0.05, help="API latency")
+    parser.add_argument("--jitter", type=float, default=0.02, help="API jitter")
+    parser.add_argument("--retry-after-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--reply-timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--app-port", type=int, default=18080)
+    parser.add_argument("--api-port", type=int, default=18081)
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Extra environment for the bot, e.g. --env WORKERS=2",
+    )
+
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url or BENCHMARK_DATABASE_URL is required")
+
+    return args
+
+
+def get_app_environment(args: argparse.Namespace) -> dict[str, str]:
+    return {
+        **os.environ,
+        "API_TOKEN": "1:benchmark",
+        "ADMIN_USERNAME": "benchmark",
+        "DATABASE_URL": args.database_url,
+        "DOMAIN": "localhost",
+        "PORT": str(args.app_port),
+        "POLL_TYPE": "WEBHOOK",
+        "TELEGRAM_API_URL": f"http://127.0.0.1:{args.api_port}",
+        **dict(item.split("=", 1) for item in args.env),
+    }
+
+
+async def prepare_database(database_url: str, environment: dict[str, str]) -> None:
+    subprocess.run(  # noqa: S603
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=REPOSITORY_PATH,
+        env=environment,
+        check=True,
+    )
+
+    async_engine = create_async_engine(
+        database_url.replace("postgresql://", "postgresql+asyncpg://")
+    )
+
+    async with async_engine.begin() as connection:
+        await connection.execute(
+            text(f"TRUNCATE {', '.join(BENCHMARK_TABLES)} RESTART IDENTITY")
+        )
+
+    await async_engine.dispose()
+
+
+async def wait_for_app(health_url: str, timeout: float) -> None:
+    deadline = monotonic() + timeout
+
+    async with ClientSession() as client_session:
+        while monotonic() < deadline:
+            try:
+                async with client_session.get(health_url) as response:
+                    if response.status == 200:
+                        return
+            except ClientError:
+                pass
+
+            await asyncio.sleep(0.2)
+
+    raise TimeoutError(f"Bot did not become healthy at {health_url}")
+
+
+def print_report(
+    report: LoadReport, fake_telegram: FakeTelegram, wall_seconds: float
+) -> None:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_seconds = usage.ru_utime + usage.ru_stime
+    api_stats = fake_telegram.stats()
+
+    print(f"updates sent:       {report.sent}")
+    print(f"updates answered:   {report.answered}")
+    print(f"updates rejected:   {report.rejected}")
+    print(f"updates unanswered: {report.unanswered}")
+    print(f"throughput:         {report.throughput:.1f} updates/s")
+    print(f"latency p50:        {report.percentile(50) * 1000:.0f} ms")
+    print(f"latency p90:        {report.percentile(90) * 1000:.0f} ms")
+    print(f"latency p99:        {report.percentile(99) * 1000:.0f} ms")
+    print(f"api requests:       {api_stats['requests']}")
+    print(f"api 429s:           {api_stats['retry_afters']}")
+    print(f"bytes downloaded:   {api_stats['downloaded_bytes']}")
+    print(f"bytes uploaded:     {api_stats['uploaded_bytes']}")
+    print(f"bot cpu:            {cpu_seconds:.1f} s ({cpu_seconds / wall_seconds:.0%})")
+    print(f"bot max rss:        {usage.ru_maxrss // 1024} MiB")
+
+
+async def run_benchmark(args: argparse.Namespace) -> None:
+    environment = get_app_environment(args=args)
+    await prepare_database(database_url=args.database_url, environment=environment)
+
+    load_generator = LoadGenerator(
+        webhook_url=f"http://127.0.0.1:{args.app_port}/webhook/main",
+        users=args.users,
+        rate=args.rate,
+        duration=args.duration,
+        mix=args.mix,
+        reply_timeout=args.reply_timeout,
+        seed=args.seed,
+    )
+    fake_telegram = FakeTelegram(
+        latency=args.latency,
+        jitter=args.jitter,
+        retry_after_rate=args.retry_after_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        on_reply=load_generator.on_reply,
+    )
+
+    runner = web.AppRunner(fake_telegram.create_app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.api_port).start()
+
+    app_process = subprocess.Popen(  # noqa: S603
+        [sys.executable, "main.py"],
+        cwd=REPOSITORY_PATH,
+        env=environment,
+    )
+    started_at = monotonic()
+
+    try:
+        await wait_for_app(
+            health_url=f"http://127.0.0.1:{args.app_port}/health", timeout=30
+        )
+        await load_generator.register_users()
+        report = await load_generator.run()
+    finally:
+        app_process.send_signal(signal.SIGINT)
+        await asyncio.to_thread(app_process.wait)
+        await runner.cleanup()
+
+    print_report(
+        report=report,
+        fake_telegram=fake_telegram,
+        wall_seconds=monotonic() - started_at,
+    )
+
+
+def main() -> None:
+    asyncio.run(run_benchmark(args=parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,49 @@
+import asyncio
 import logging
+import os
+import signal
+from datetime import timedelta
+from functools import partial
+from multiprocessing import Process
+from multiprocessing.connection import wait
+from time import sleep
+from typing import Any
 
 from aiogram import F, Router, Dispatcher, Bot
-from aiogram.filters import Command
-from aiogram.fsm.storage.memory import SimpleEventIsolation
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject, ExceptionTypeFilter
 from aiogram.types import Message, User as TelegramUser, Sticker, PhotoSize
+from aiogram.types.error_event import ErrorEvent
 from aiogram.webhook.aiohttp_server import (
     SimpleRequestHandler,
     setup_application,
 )
 from aiohttp import web
 from aiohttp_healthcheck import HealthCheck  # type: ignore
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-
-from model.models import UserModel, StickerSetModel, StickerSetType
-from settings_reader import PollType, settings
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from model.models import UserModel, StickerSetModel, StickerSetType, UploadJobSource
+from settings_reader import PollType, get_settings
+from util.batch import StickerBatcher, StickerBatchItem
+from util.bot_identity import BotIdentity
+from util.clone import StickerSetCloner, get_sticker_set_name
+from util.cache import BytesCache
+from util.database import create_database_engine, get_database_pool_stats
+from util.emoji_caption import get_first_emoji
+from util.executor import ImageExecutor, ImageExecutorBusyError
+from util.image_cache import ProcessedImageCache
+from util.isolation import (
+    UpdateExecutor,
+    UpdateShedError,
+    AdvisoryLocks,
+    AdvisoryLockUpdateExecutor,
+)
+from util.metrics import (
+    TelegramRequestMetrics,
+    metrics_registry,
+    observe_handler_duration,
+)
 from util.middleware import (
     get_async_database_session,
     filter_non_sticker,
@@ -21,10 +51,32 @@ from util.middleware import (
     filter_no_emoji_caption,
     get_user_sticker_set_async_session,
     filter_non_photo,
+    skip_processed_update,
 )
+from util.scheduler import RequestScheduler
+from util.tracing import (
+    TelegramRequestTracing,
+    create_span_exporter,
+    trace_handler,
+    trace_update,
+    traced_middleware,
+    tracer,
+)
+from util.tasks import (
+    backfill_sticker_counts,
+    prune_processed_updates,
+    prune_upload_jobs,
+)
+from util.telegram_session import TelegramSession
+from util.upload import UploadJobWorker
+from util.warmup import Readiness
+from util.webhook import UpdateAcknowledgement, UpdateQueue, QueuedRequestHandler
+from util.query.cache import user_cache, sticker_set_cache, configure_query_caches
 from util.query.user import get_user_by_telegram_id, save_user_to_database
+from util.query.sticker import get_user_sticker_sets_with_stickers
 from util.sticker import (
-    create_new_sticker_set,
+    get_owned_sticker_set,
+    handle_duplicate_sticker,
     handle_sticker_removal,
     handle_sticker_addition,
     get_sticker_file_input_from_picture,
@@ -32,9 +84,12 @@ from util.sticker import (
 )
 
 start_router = Router(name="start router")
+clone_router = Router(name="clone router")
 sticker_router = Router(name="sticker router")
 picture_router = Router(name="picture router")
 
+WORKER_RESTART_DELAY = 1.0
+
 logging.basicConfig(level=logging.INFO, datefmt="%Y-%m-%d %H:%M:%S")
 
 
@@ -49,18 +104,23 @@ async def command_start_handler(
         f"Send me a sticker and I'll put it in your personal sticker pack.\n"
         f"Send me a sticker from a pack create by this bot and this sticker will be removed.\n"  # noqa: E501
         f"Send me a picture with an emoji caption and I'll create a sticker from it.\n"
+        f"Send /clone with a sticker pack link to copy the whole pack.\n"
+        f"Send /packs to see your sticker packs.\n"
         f"If you have any questions, please contact me.\n\n"
         f"<a href='https://t.me/{admin_username}'>Contact</a>"
     )
 
-    user: UserModel | None = await get_user_by_telegram_id(
-        async_session=async_session, telegram_id=telegram_user.id
-    )
+    async with async_session.begin():
+        user: UserModel | None = await get_user_by_telegram_id(
+            async_session=async_session, telegram_id=telegram_user.id
+        )
+
+        if not user:
+            await save_user_to_database(
+                async_session=async_session, telegram_user=telegram_user
+            )
 
     if not user:
-        await save_user_to_database(
-            async_session=async_session, telegram_user=telegram_user
-        )
         await message.reply(
             text=f"Welcome, {telegram_user.full_name}!\n\n{text}",
             parse_mode="HTML",
@@ -70,10 +130,99 @@ async def command_start_handler(
     await message.reply(text=f"Hello, {telegram_user.full_name}!\n\n{text}")
 
 
+@start_router.message(Command("packs"))
+async def command_packs_handler(
+    message: Message,
+    async_session: AsyncSession,
+    telegram_user: TelegramUser,
+) -> None:
+    async with async_session.begin():
+        user: UserModel | None = await get_user_by_telegram_id(
+            async_session=async_session, telegram_id=telegram_user.id
+        )
+        sticker_sets = (
+            await get_user_sticker_sets_with_stickers(
+                async_session=async_session, user=user
+            )
+            if user
+            else []
+        )
+
+    if not user:
+        await message.reply(
+            "You are not registered yet.\n" "Please use /start command.."
+        )
+        return
+
+    if not sticker_sets:
+        await message.reply("You don't have any sticker packs yet.")
+        return
+
+    lines = [
+        f"<a href='https://t.me/addstickers/{sticker_set.name}'>{sticker_set.title}</a>: "  # noqa: E501
+        f"{sticker_set.sticker_count} stickers "
+        f"{''.join(get_first_emoji(text=sticker.emoji) or '' for sticker in sticker_set.stickers[:20])}"  # noqa: E501
+        for sticker_set in sticker_sets
+    ]
+
+    await message.reply("\n".join(lines), parse_mode="HTML")
+
+
+@clone_router.message(Command("clone"))
+async def command_clone_handler(  # noqa: CFQ004
+    message: Message,
+    bot: Bot,
+    command: CommandObject,
+    async_session: AsyncSession,
+    telegram_user: TelegramUser,
+    telegram_user_username: str,
+    sticker_set_cloner: StickerSetCloner,
+) -> None:
+    source_name = get_sticker_set_name(text=command.args)
+
+    if not source_name:
+        await message.reply(
+            "Send /clone followed by a sticker pack link or name, e.g.\n"
+            "/clone https://t.me/addstickers/Animals"
+        )
+        return
+
+    async with async_session.begin():
+        user: UserModel | None = await get_user_by_telegram_id(
+            async_session=async_session, telegram_id=telegram_user.id
+        )
+
+    if not user:
+        await message.reply(
+            "You are not registered yet.\n" "Please use /start command.."
+        )
+        return
+
+    try:
+        source_sticker_set = await bot.get_sticker_set(name=source_name)
+    except TelegramBadRequest:
+        await message.reply("I couldn't find this sticker pack 🥲")
+        return
+
+    if not source_sticker_set.stickers:
+        await message.reply("This sticker pack is empty 🥲")
+        return
+
+    if not await sticker_set_cloner.start(
+        bot=bot,
+        message=message,
+        user_id=user.id,
+        telegram_user_username=telegram_user_username,
+        source_sticker_set=source_sticker_set,
+    ):
+        await message.reply("This sticker pack is already being cloned.")
+
+
 @sticker_router.message(F.sticker)
 async def handle_sticker(  # pylint: disable=too-many-arguments # noqa: CFQ002
     message: Message,
     bot: Bot,
+    bot_identity: BotIdentity,
     admin_username: str,
     async_session: AsyncSession,
     user: UserModel,
@@ -83,38 +232,90 @@ async def handle_sticker(  # pylint: disable=too-many-arguments # noqa: CFQ002
     telegram_user_username: str,
     message_sticker: Sticker,
     sticker_emoji: str,
+    sticker_file_cache: BytesCache[str],
+    sticker_batcher: StickerBatcher | None = None,
+    upload_job_worker: UploadJobWorker | None = None,
+    update_acknowledgement: UpdateAcknowledgement | None = None,
 ) -> None:
-    if sticker_set and message_sticker.set_name == sticker_set.name:
+    owned_sticker_set = await get_owned_sticker_set(
+        bot=bot,
+        bot_identity=bot_identity,
+        async_session=async_session,
+        user=user,
+        sticker_set=sticker_set,
+        sticker=message_sticker,
+    )
+
+    if owned_sticker_set:
         return await handle_sticker_removal(
             bot=bot,
             message=message,
+            async_session=async_session,
+            sticker_set=owned_sticker_set,
             admin_username=admin_username,
             received_sticker=message_sticker,
         )
 
-    sticker_file_input = await get_sticker_file_input_from_sticker(
-        bot=bot, sticker_set_type=sticker_set_type, sticker=message_sticker
-    )
-
-    if not sticker_set:
-        return await create_new_sticker_set(
+    if sticker_batcher:
+        return sticker_batcher.add(
             bot=bot,
-            message=message,
-            async_session=async_session,
             telegram_user=telegram_user,
             telegram_user_username=telegram_user_username,
+            item=StickerBatchItem(
+                message=message,
+                sticker_set_type=sticker_set_type,
+                emojis=sticker_emoji,
+                file_unique_id=message_sticker.file_unique_id,
+                get_sticker_file_input=partial(
+                    get_sticker_file_input_from_sticker,
+                    bot=bot,
+                    sticker_set_type=sticker_set_type,
+                    sticker=message_sticker,
+                    sticker_file_cache=sticker_file_cache,
+                ),
+                update_acknowledgement=update_acknowledgement,
+            ),
+        )
+
+    if await handle_duplicate_sticker(
+        message=message,
+        async_session=async_session,
+        user=user,
+        file_unique_id=message_sticker.file_unique_id,
+    ):
+        return None
+
+    if upload_job_worker:
+        return await upload_job_worker.enqueue(
+            async_session=async_session,
+            message=message,
             user=user,
+            telegram_user_username=telegram_user_username,
             sticker_set_type=sticker_set_type,
-            sticker_file_input=sticker_file_input,
             emojis=sticker_emoji,
+            source=UploadJobSource.STICKER,
+            file=message_sticker,
         )
 
+    sticker_file_input = await get_sticker_file_input_from_sticker(
+        bot=bot,
+        sticker_set_type=sticker_set_type,
+        sticker=message_sticker,
+        sticker_file_cache=sticker_file_cache,
+    )
+
     return await handle_sticker_addition(
         bot=bot,
+        bot_identity=bot_identity,
         message=message,
-        user_sticker_set=sticker_set,
+        async_session=async_session,
         telegram_user=telegram_user,
+        telegram_user_username=telegram_user_username,
+        user=user,
+        sticker_set_type=sticker_set_type,
+        user_sticker_set=sticker_set,
         emojis=sticker_emoji,
+        file_unique_id=message_sticker.file_unique_id,
         sticker_file_input=sticker_file_input,
     )
 
@@ -123,97 +324,565 @@ async def handle_sticker(  # pylint: disable=too-many-arguments # noqa: CFQ002
 async def handle_picture(  # pylint: disable=too-many-arguments # noqa: CFQ002
     message: Message,
     bot: Bot,
+    bot_identity: BotIdentity,
     async_session: AsyncSession,
     user: UserModel,
-    sticker_set: StickerSetModel,
+    sticker_set: StickerSetModel | None,
     sticker_set_type: StickerSetType,
     telegram_user: TelegramUser,
     telegram_user_username: str,
     picture: PhotoSize,
-    emoji: str,
+    emojis: str | None,
+    image_executor: ImageExecutor,
+    image_cache: ProcessedImageCache,
+    sticker_batcher: StickerBatcher | None = None,
+    upload_job_worker: UploadJobWorker | None = None,
+    update_acknowledgement: UpdateAcknowledgement | None = None,
 ) -> None:
-    sticker_file_input = await get_sticker_file_input_from_picture(
-        bot=bot, picture=picture
-    )
-
-    if not sticker_set:
-        return await create_new_sticker_set(
+    if sticker_batcher:
+        return sticker_batcher.add(
             bot=bot,
-            message=message,
-            async_session=async_session,
             telegram_user=telegram_user,
             telegram_user_username=telegram_user_username,
+            item=StickerBatchItem(
+                message=message,
+                sticker_set_type=sticker_set_type,
+                emojis=emojis,
+                file_unique_id=picture.file_unique_id,
+                get_sticker_file_input=partial(
+                    get_sticker_file_input_from_picture,
+                    bot=bot,
+                    picture=picture,
+                    image_executor=image_executor,
+                    image_cache=image_cache,
+                ),
+                update_acknowledgement=update_acknowledgement,
+            ),
+        )
+
+    if not emojis:
+        return None
+
+    if await handle_duplicate_sticker(
+        message=message,
+        async_session=async_session,
+        user=user,
+        file_unique_id=picture.file_unique_id,
+    ):
+        return None
+
+    if upload_job_worker:
+        return await upload_job_worker.enqueue(
+            async_session=async_session,
+            message=message,
             user=user,
+            telegram_user_username=telegram_user_username,
             sticker_set_type=sticker_set_type,
-            sticker_file_input=sticker_file_input,
-            emojis=emoji,
+            emojis=emojis,
+            source=UploadJobSource.PICTURE,
+            file=picture,
+        )
+
+    try:
+        sticker_file_input = await get_sticker_file_input_from_picture(
+            bot=bot,
+            picture=picture,
+            image_executor=image_executor,
+            image_cache=image_cache,
+        )
+    except ImageExecutorBusyError:
+        await message.reply(
+            "I'm busy processing other pictures right now. "
+            "Please try again in a minute."
         )
+        return None
 
     return await handle_sticker_addition(
         bot=bot,
+        bot_identity=bot_identity,
         message=message,
-        user_sticker_set=sticker_set,
+        async_session=async_session,
         telegram_user=telegram_user,
-        emojis=emoji,
+        telegram_user_username=telegram_user_username,
+        user=user,
+        sticker_set_type=sticker_set_type,
+        user_sticker_set=sticker_set,
+        emojis=emojis,
+        file_unique_id=picture.file_unique_id,
         sticker_file_input=sticker_file_input,
     )
 
 
-async def on_startup(bot: Bot) -> None:
-    if settings.poll_type == PollType.WEBHOOK:
+async def handle_update_shed(event: ErrorEvent) -> None:
+    logging.warning("Update %s shed: %s", event.update.update_id, event.exception)
+
+
+async def on_startup(bot: Bot, dispatcher: Dispatcher) -> None:
+    settings = get_settings()
+
+    bot_identity: BotIdentity = dispatcher["bot_identity"]
+    readiness: Readiness = dispatcher["readiness"]
+    await readiness.warm_up(
+        bot=bot,
+        bot_identity=bot_identity,
+        async_engine=dispatcher["async_engine"],
+        image_executor=dispatcher["image_executor"],
+        database_connections=min(
+            settings.warm_up_database_connections, settings.database_pool_size
+        ),
+    )
+
+    bot_user = await bot_identity.get(bot=bot)
+    logging.info("Running as @%s", bot_user.username)
+
+    if settings.poll_type == PollType.WEBHOOK and not dispatcher.get("worker_index"):
         webhook_url = settings.webhook_url
         await bot.set_webhook(webhook_url)
         logging.info("Webhook set to: %s", webhook_url)
 
+    if not dispatcher.get("worker_index"):
+        dispatcher["backfill_sticker_counts_task"] = asyncio.create_task(
+            backfill_sticker_counts(bot=bot, async_engine=dispatcher["async_engine"])
+        )
+
+    if settings.deduplicate_updates:
+        dispatcher["prune_processed_updates_task"] = asyncio.create_task(
+            prune_processed_updates(
+                async_engine=dispatcher["async_engine"],
+                retention=timedelta(seconds=settings.processed_update_retention),
+                interval=settings.processed_update_prune_interval,
+            )
+        )
+
+    tracer.start()
+
+    sticker_set_cloner: StickerSetCloner = dispatcher["sticker_set_cloner"]
+    await sticker_set_cloner.resume(bot=bot)
+
+    upload_job_worker: UploadJobWorker | None = dispatcher.get("upload_job_worker")
+    if upload_job_worker:
+        upload_job_worker.start(bot=bot)
+
+        if not dispatcher.get("worker_index"):
+            dispatcher["prune_upload_jobs_task"] = asyncio.create_task(
+                prune_upload_jobs(
+                    async_engine=dispatcher["async_engine"],
+                    retention=timedelta(seconds=settings.upload_job_retention),
+                    interval=settings.processed_update_prune_interval,
+                )
+            )
 
-async def on_shutdown() -> None:
+    update_queue: UpdateQueue | None = dispatcher.get("update_queue")
+    if update_queue:
+        update_queue.start()
+        await update_queue.restore()
+
+    readiness.ready = True
+
+
+async def on_shutdown(dispatcher: Dispatcher) -> None:
     logging.info("Shutting down...")
 
+    readiness: Readiness = dispatcher["readiness"]
+    readiness.ready = False
 
-def main() -> None:
-    bot = Bot(settings.api_token, parse_mode="HTML")
+    prune_processed_updates_task: asyncio.Task[None] | None = dispatcher.get(
+        "prune_processed_updates_task"
+    )
+    if prune_processed_updates_task:
+        prune_processed_updates_task.cancel()
+
+    prune_upload_jobs_task: asyncio.Task[None] | None = dispatcher.get(
+        "prune_upload_jobs_task"
+    )
+    if prune_upload_jobs_task:
+        prune_upload_jobs_task.cancel()
+
+    backfill_sticker_counts_task: asyncio.Task[None] | None = dispatcher.get(
+        "backfill_sticker_counts_task"
+    )
+    if backfill_sticker_counts_task:
+        backfill_sticker_counts_task.cancel()
+
+    update_queue: UpdateQueue | None = dispatcher.get("update_queue")
+    if update_queue:
+        await update_queue.close()
+        logging.info("Update queue stats: %s", update_queue.stats())
+
+    sticker_batcher: StickerBatcher | None = dispatcher.get("sticker_batcher")
+    if sticker_batcher:
+        await sticker_batcher.close()
+        logging.info("Sticker batcher stats: %s", sticker_batcher.stats())
+
+    upload_job_worker: UploadJobWorker | None = dispatcher.get("upload_job_worker")
+    if upload_job_worker:
+        await upload_job_worker.close()
+        logging.info("Upload job worker stats: %s", upload_job_worker.stats())
+
+    sticker_set_cloner: StickerSetCloner = dispatcher["sticker_set_cloner"]
+    await sticker_set_cloner.close()
+    logging.info("Sticker set cloner stats: %s", sticker_set_cloner.stats())
+
+    image_executor: ImageExecutor = dispatcher["image_executor"]
+    logging.info("Image executor stats: %s", image_executor.stats())
+    update_executor: UpdateExecutor = dispatcher["update_executor"]
+    logging.info("Update executor stats: %s", update_executor.stats())
+    request_scheduler: RequestScheduler = dispatcher["request_scheduler"]
+    logging.info("Request scheduler stats: %s", request_scheduler.stats())
+    telegram_session: TelegramSession = dispatcher["telegram_session"]
+    logging.info("Telegram session stats: %s", telegram_session.stats())
+    sticker_file_cache: BytesCache[str] = dispatcher["sticker_file_cache"]
+    logging.info("Sticker file cache stats: %s", sticker_file_cache.stats())
+    image_cache: ProcessedImageCache = dispatcher["image_cache"]
+    logging.info("Image cache stats: %s", image_cache.stats())
+    logging.info("User cache stats: %s", user_cache.stats())
+    logging.info("Sticker set cache stats: %s", sticker_set_cache.stats())
+    logging.info(
+        "Database pool stats: %s",
+        get_database_pool_stats(async_engine=dispatcher["async_engine"]),
+    )
+    image_executor.shutdown()
+
+    await tracer.close()
+    logging.info("Tracer stats: %s", tracer.stats())
+
+    advisory_locks: AdvisoryLocks | None = dispatcher.get("advisory_locks")
+    if advisory_locks:
+        await advisory_locks.close()
+        logging.info("Advisory lock stats: %s", advisory_locks.stats())
+
+
+def create_dispatcher() -> tuple[Bot, Dispatcher]:
+    settings = get_settings()
+
+    session = TelegramSession(
+        connection_limit=settings.telegram_connection_limit,
+        connection_limit_per_host=settings.telegram_connection_limit_per_host,
+        keepalive_timeout=settings.telegram_keepalive_timeout,
+        dns_cache_ttl=settings.telegram_dns_cache_ttl,
+        request_timeout=settings.telegram_request_timeout,
+        connect_timeout=settings.telegram_connect_timeout,
+        read_timeout=settings.telegram_read_timeout,
+        api=(
+            TelegramAPIServer.from_base(settings.telegram_api_url)
+            if settings.telegram_api_url
+            else PRODUCTION
+        ),
+    )
+    bot = Bot(settings.api_token, session=session, parse_mode="HTML")
+
+    request_scheduler = RequestScheduler(
+        global_rate=settings.telegram_global_rate,
+        chat_rate=settings.telegram_chat_rate,
+        chat_burst=settings.telegram_chat_burst,
+        max_retries=settings.telegram_max_retries,
+    )
+    bot.session.middleware(request_scheduler)
+    bot.session.middleware(TelegramRequestMetrics())
+    bot.session.middleware(TelegramRequestTracing())
+
+    tracer.configure(
+        exporter=create_span_exporter(
+            file_path=settings.tracing_file,
+            otlp_endpoint=settings.tracing_otlp_endpoint,
+        ),
+        sample_rate=settings.tracing_sample_rate,
+        flush_interval=settings.tracing_flush_interval,
+        max_queue_size=settings.tracing_max_queue_size,
+    )
+
+    configure_query_caches(
+        max_size=settings.cache_max_size,
+        ttl=settings.cache_ttl,
+        cache_sticker_sets=not settings.coordinate_via_postgres,
+    )
 
-    dp = Dispatcher(
-        events_isolation=SimpleEventIsolation()
-    )  # pylint: disable=invalid-name
+    async_engine = create_database_engine(
+        url=settings.async_database_url,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout,
+        pool_recycle=settings.database_pool_recycle,
+        pool_pre_ping=settings.database_pool_pre_ping,
+        statement_cache_size=settings.database_statement_cache_size,
+    )
 
-    dp["async_engine"] = create_async_engine(
-        url=settings.async_database_url, pool_size=20, pool_pre_ping=True
+    advisory_locks = (
+        AdvisoryLocks(async_engine=async_engine)
+        if settings.coordinate_via_postgres
+        else None
+    )
+    update_executor = (
+        AdvisoryLockUpdateExecutor(
+            advisory_locks=advisory_locks,
+            max_concurrency=settings.update_max_concurrency,
+            max_pending_per_user=settings.update_max_pending_per_user,
+        )
+        if advisory_locks
+        else UpdateExecutor(
+            max_concurrency=settings.update_max_concurrency,
+            max_pending_per_user=settings.update_max_pending_per_user,
+        )
     )
+
+    dp = Dispatcher(events_isolation=update_executor)  # pylint: disable=invalid-name
+
+    dp["async_engine"] = async_engine
     dp["admin_username"] = settings.admin_username
+    dp["bot_identity"] = BotIdentity()
+    dp["readiness"] = Readiness()
+    dp["request_scheduler"] = request_scheduler
+    dp["telegram_session"] = session
+    dp["update_executor"] = update_executor
+    dp["advisory_locks"] = advisory_locks
+    dp["sticker_file_cache"] = BytesCache[str](
+        max_bytes=settings.sticker_file_cache_max_bytes
+    )
+    dp["image_cache"] = ProcessedImageCache(
+        memory_max_bytes=settings.image_cache_max_bytes,
+        disk_path=settings.image_cache_dir,
+        disk_max_bytes=settings.image_cache_disk_max_bytes,
+    )
+    dp["image_executor"] = ImageExecutor(
+        executor_type=settings.image_executor_type,
+        workers=settings.image_executor_workers,
+        queue_size=settings.image_executor_queue_size,
+    )
+
+    dp["sticker_set_cloner"] = StickerSetCloner(
+        async_engine=async_engine,
+        update_executor=update_executor,
+        bot_identity=dp["bot_identity"],
+        sticker_file_cache=dp["sticker_file_cache"],
+        concurrency=settings.clone_concurrency,
+        progress_interval=settings.clone_progress_interval,
+        lease=settings.clone_lease,
+    )
+
+    if settings.sticker_batch_window > 0:
+        dp["sticker_batcher"] = StickerBatcher(
+            async_engine=async_engine,
+            bot_identity=dp["bot_identity"],
+            update_executor=update_executor,
+            window=settings.sticker_batch_window,
+            max_size=settings.sticker_batch_max_size,
+            concurrency=settings.sticker_batch_concurrency,
+        )
+        metrics_registry.register_stats("sticker_batcher", dp["sticker_batcher"].stats)
+
+    if settings.upload_jobs_enabled:
+        dp["upload_job_worker"] = UploadJobWorker(
+            async_engine=async_engine,
+            bot_identity=dp["bot_identity"],
+            sticker_file_cache=dp["sticker_file_cache"],
+            image_executor=dp["image_executor"],
+            image_cache=dp["image_cache"],
+            concurrency=settings.upload_job_concurrency,
+            poll_interval=settings.upload_job_poll_interval,
+            lease=settings.upload_job_lease,
+            max_attempts=settings.upload_job_max_attempts,
+            retry_delay=settings.upload_job_retry_delay,
+            max_retry_delay=settings.upload_job_max_retry_delay,
+        )
+        metrics_registry.register_stats(
+            "upload_job_worker", dp["upload_job_worker"].stats
+        )
+
+    metrics_registry.register_stats("update_executor", update_executor.stats)
+
+    if advisory_locks:
+        metrics_registry.register_stats("advisory_locks", advisory_locks.stats)
+
+    metrics_registry.register_stats("request_scheduler", request_scheduler.stats)
+    metrics_registry.register_stats("telegram_session", session.stats)
+    metrics_registry.register_stats("image_executor", dp["image_executor"].stats)
+    metrics_registry.register_stats(
+        "sticker_file_cache", dp["sticker_file_cache"].stats
+    )
+    metrics_registry.register_stats("image_cache", dp["image_cache"].stats)
+    metrics_registry.register_stats("user_cache", user_cache.stats)
+    metrics_registry.register_stats("sticker_set_cache", sticker_set_cache.stats)
+    metrics_registry.register_stats(
+        "sticker_set_cloner", dp["sticker_set_cloner"].stats
+    )
+    metrics_registry.register_stats(
+        "database_pool", partial(get_database_pool_stats, async_engine=async_engine)
+    )
+    metrics_registry.register_stats("tracer", tracer.stats)
+    metrics_registry.register_stats("readiness", dp["readiness"].stats)
 
     dp.include_router(start_router)
+    dp.include_router(clone_router)
     dp.include_router(sticker_router)
     dp.include_router(picture_router)
 
+    dp.errors.register(handle_update_shed, ExceptionTypeFilter(UpdateShedError))
+
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
 
-    dp.message.middleware(filter_non_user)  # type: ignore
+    dp.update.outer_middleware(trace_update)  # type: ignore
 
-    start_router.message.middleware(get_async_database_session)  # type: ignore
+    if settings.deduplicate_updates:
+        dp.update.outer_middleware(skip_processed_update)  # type: ignore
 
-    sticker_router.message.middleware(filter_non_sticker)  # type: ignore
-    sticker_router.message.middleware(get_user_sticker_set_async_session)  # type: ignore # noqa: E501
+    dp.message.middleware(observe_handler_duration)  # type: ignore
+    dp.message.middleware(traced_middleware(filter_non_user))  # type: ignore
 
-    picture_router.message.middleware(filter_non_photo)  # type: ignore
-    picture_router.message.middleware(filter_no_emoji_caption)  # type: ignore
-    picture_router.message.middleware(get_user_sticker_set_async_session)  # type: ignore # noqa: E501
+    start_router.message.middleware(traced_middleware(get_async_database_session))  # type: ignore # noqa: E501
+    clone_router.message.middleware(traced_middleware(get_async_database_session))  # type: ignore # noqa: E501
+
+    sticker_router.message.middleware(traced_middleware(filter_non_sticker))  # type: ignore # noqa: E501
+    sticker_router.message.middleware(traced_middleware(get_user_sticker_set_async_session))  # type: ignore # noqa: E501
+
+    picture_router.message.middleware(traced_middleware(filter_non_photo))  # type: ignore # noqa: E501
+    picture_router.message.middleware(traced_middleware(filter_no_emoji_caption))  # type: ignore # noqa: E501
+    picture_router.message.middleware(traced_middleware(get_user_sticker_set_async_session))  # type: ignore # noqa: E501
+
+    for router in (start_router, clone_router, sticker_router, picture_router):
+        router.message.middleware(trace_handler)  # type: ignore
+
+    return bot, dp
+
+
+async def handle_update_queue_stats(request: web.Request) -> web.Response:
+    update_queue: UpdateQueue = request.app["update_queue"]
+    return web.json_response(update_queue.stats())
+
+
+async def handle_metrics(_: web.Request) -> web.Response:
+    return web.Response(
+        text=metrics_registry.render(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
 
-    if settings.poll_type == PollType.WEBHOOK:
-        health = HealthCheck()
 
-        app = web.Application()
+async def handle_database_pool_stats(request: web.Request) -> web.Response:
+    return web.json_response(
+        get_database_pool_stats(async_engine=request.app["async_engine"])
+    )
+
+
+def run_webhook(worker_index: int) -> None:
+    settings = get_settings()
+
+    bot, dp = create_dispatcher()
+    dp["worker_index"] = worker_index
+
+    health = HealthCheck(success_ttl=0, failed_ttl=0)
+    health.add_check(dp["readiness"].check)
+
+    app = web.Application()
+    app["async_engine"] = dp["async_engine"]
+    setup_application(app, dp, bot=bot)
+
+    if settings.webhook_queue_enabled:
+        update_queue = UpdateQueue(
+            dispatcher=dp,
+            bot=bot,
+            async_engine=dp["async_engine"],
+            max_size=settings.webhook_queue_size,
+            workers=settings.webhook_queue_workers,
+        )
+        dp["update_queue"] = update_queue
+        app["update_queue"] = update_queue
+        metrics_registry.register_stats("update_queue", update_queue.stats)
+
+        QueuedRequestHandler(
+            dispatcher=dp, bot=bot, update_queue=update_queue
+        ).register(app, path=settings.main_bot_path)
+
+        app.add_routes([web.get("/health/queue", handle_update_queue_stats)])
+    else:
         SimpleRequestHandler(dispatcher=dp, bot=bot).register(
             app, path=settings.main_bot_path
         )
-        setup_application(app, dp, bot=bot)
 
-        app.add_routes([web.get("/health", health)])
+    app.add_routes(
+        [
+            web.get("/health", health),
+            web.get("/health/database", handle_database_pool_stats),
+            web.get("/metrics", handle_metrics),
+        ]
+    )
 
-        web.run_app(app, host="0.0.0.0", port=settings.port)
+    web.run_app(
+        app,
+        host="0.0.0.0",
+        port=settings.port,
+        reuse_port=settings.workers > 1,
+        print=None if worker_index else print,
+    )
+
+
+def run_webhook_workers() -> None:
+    settings = get_settings()
+
+    processes: dict[int, Process] = {}
+    stopping = False
+
+    def start_worker(worker_index: int) -> None:
+        process = Process(
+            target=run_webhook, args=(worker_index,), name=f"worker-{worker_index}"
+        )
+        process.start()
+        processes[worker_index] = process
+
+    def terminate_workers(signal_number: int, _: Any) -> None:
+        nonlocal stopping
+        stopping = True
+
+        logging.info("Received signal %s, stopping workers...", signal_number)
+        for process in processes.values():
+            if process.pid:
+                os.kill(process.pid, signal.SIGINT)
+
+    signal.signal(signal.SIGTERM, terminate_workers)
+    signal.signal(signal.SIGINT, terminate_workers)
+
+    for worker_index in range(settings.workers):
+        start_worker(worker_index=worker_index)
+
+    logging.info("Started %s webhook workers", len(processes))
+
+    while processes:
+        wait([process.sentinel for process in processes.values()])
+
+        for worker_index, process in list(processes.items()):
+            if process.is_alive():
+                continue
+
+            process.join()
+            del processes[worker_index]
+
+            if stopping:
+                continue
+
+            logging.warning(
+                "Worker %s exited with code %s, restarting",
+                worker_index,
+                process.exitcode,
+            )
+            sleep(WORKER_RESTART_DELAY)
+
+            if not stopping:
+                start_worker(worker_index=worker_index)
+
+
+def main() -> None:
+    settings = get_settings()
+
+    if settings.poll_type == PollType.WEBHOOK:
+        if settings.workers > 1:
+            run_webhook_workers()
+        else:
+            run_webhook(worker_index=0)
 
     if settings.poll_type == PollType.POLLING:
+        if settings.workers > 1:
+            logging.warning("WORKERS is ignored in polling mode")
+
+        bot, dp = create_dispatcher()
         dp.run_polling(bot, skip_updates=True)
 
 
@@ -1,7 +1,19 @@
 from datetime import datetime
 from enum import Enum
+from typing import Any
 
-from sqlalchemy import func, TIMESTAMP, String, ForeignKey, Enum as EnumType
+from sqlalchemy import (
+    func,
+    text,
+    TIMESTAMP,
+    String,
+    ForeignKey,
+    Enum as EnumType,
+    BigInteger,
+    UniqueConstraint,
+    Index,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, mapped_column, Mapped, relationship
 
 
@@ -17,9 +29,11 @@ class UserModel(Base):
         TIMESTAMP(timezone=True), server_default=func.now()
     )
 
-    telegram_id: Mapped[str] = mapped_column(String(512), unique=True)
+    telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True)
 
-    sticker_sets: Mapped[list["StickerSetModel"]] = relationship(back_populates="user")
+    sticker_sets: Mapped[list["StickerSetModel"]] = relationship(
+        back_populates="user", lazy="raise"
+    )
 
 
 class StickerSetType(Enum):
@@ -30,6 +44,15 @@ class StickerSetType(Enum):
 
 class StickerSetModel(Base):
     __tablename__ = "sticker_set"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id",
+            "sticker_set_type",
+            "position",
+            name="uq_sticker_set_user_id_sticker_set_type_position",
+        ),
+    )
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True)  # noqa: A003, VNE003
     created_at: Mapped[datetime] = mapped_column(
@@ -41,6 +64,137 @@ class StickerSetModel(Base):
     sticker_set_type: Mapped[StickerSetType] = mapped_column(
         EnumType(StickerSetType, name="sticker_set_type")
     )
+    position: Mapped[int] = mapped_column(server_default="0")
+    sticker_count: Mapped[int] = mapped_column(server_default="0")
 
     user_id: Mapped[int] = mapped_column(ForeignKey("user.id"))
-    user: Mapped["UserModel"] = relationship(back_populates="sticker_sets")
+    user: Mapped["UserModel"] = relationship(
+        back_populates="sticker_sets", lazy="raise"
+    )
+
+    stickers: Mapped[list["StickerModel"]] = relationship(
+        back_populates="sticker_set", order_by="StickerModel.position", lazy="raise"
+    )
+
+
+class StickerModel(Base):
+    __tablename__ = "sticker"
+    __table_args__ = (
+        UniqueConstraint(
+            "sticker_set_id",
+            "file_unique_id",
+            name="uq_sticker_sticker_set_id_file_unique_id",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)  # noqa: A003, VNE003
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
+
+    file_unique_id: Mapped[str] = mapped_column(String(64), index=True)
+    emoji: Mapped[str] = mapped_column(String(256))
+    position: Mapped[int]
+
+    sticker_set_id: Mapped[int] = mapped_column(ForeignKey("sticker_set.id"))
+    sticker_set: Mapped["StickerSetModel"] = relationship(
+        back_populates="stickers", lazy="raise"
+    )
+
+
+class ProcessedUpdateModel(Base):
+    __tablename__ = "processed_update"
+
+    update_id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=False
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), index=True
+    )
+
+
+class PendingUpdateModel(Base):
+    __tablename__ = "pending_update"
+
+    update_id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=False
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
+
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB)
+
+
+class CloneJobModel(Base):
+    __tablename__ = "clone_job"
+
+    id: Mapped[int] = mapped_column(primary_key=True)  # noqa: A003, VNE003
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
+    completed_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True))
+
+    source_name: Mapped[str] = mapped_column(String(256))
+    sticker_set_type: Mapped[StickerSetType] = mapped_column(
+        EnumType(StickerSetType, name="sticker_set_type")
+    )
+    telegram_user_username: Mapped[str] = mapped_column(String(256))
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    progress_message_id: Mapped[int]
+
+    total: Mapped[int]
+    next_index: Mapped[int] = mapped_column(default=0)
+    added: Mapped[int] = mapped_column(default=0)
+    failed: Mapped[int] = mapped_column(default=0)
+    locked_until: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True))
+    locked_by: Mapped[str | None] = mapped_column(String(32))
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), index=True)
+    user: Mapped["UserModel"] = relationship(lazy="raise")
+
+
+class UploadJobSource(Enum):
+    STICKER = 1
+    PICTURE = 2
+
+
+class UploadJobModel(Base):
+    __tablename__ = "upload_job"
+    __table_args__ = (
+        Index(
+            "ix_upload_job_next_attempt_at_pending",
+            "next_attempt_at",
+            postgresql_where=text("completed_at IS NULL"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)  # noqa: A003, VNE003
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
+    completed_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True))
+
+    idempotency_key: Mapped[str] = mapped_column(String(128), unique=True)
+    source: Mapped[UploadJobSource] = mapped_column(
+        EnumType(UploadJobSource, name="upload_job_source")
+    )
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB)
+    sticker_set_type: Mapped[StickerSetType] = mapped_column(
+        EnumType(StickerSetType, name="sticker_set_type")
+    )
+    emojis: Mapped[str] = mapped_column(String(256))
+    file_unique_id: Mapped[str] = mapped_column(String(64))
+    telegram_user_username: Mapped[str] = mapped_column(String(256))
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    message_id: Mapped[int]
+
+    attempts: Mapped[int] = mapped_column(server_default="0")
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
+    locked_until: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True))
+    last_error: Mapped[str | None] = mapped_column(String(1024))
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), index=True)
+    user: Mapped["UserModel"] = relationship(lazy="raise")
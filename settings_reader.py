@@ -1,4 +1,6 @@
 from enum import Enum
+from functools import cache
+from typing import Any
 
 from pydantic import BaseSettings, Field, validator
 
@@ -8,14 +10,85 @@ class PollType(Enum):
     POLLING = "POLLING"
 
 
+class ImageExecutorType(Enum):
+    PROCESS = "PROCESS"
+    THREAD = "THREAD"
+
+
 class Settings(BaseSettings):
     api_token: str = Field(env="API_TOKEN")
     admin_username: str = Field(env="ADMIN_USERNAME")
     database_url: str = Field(env="DATABASE_URL")
+    database_pool_size: int = Field(20, env="DATABASE_POOL_SIZE")
+    database_max_overflow: int = Field(10, env="DATABASE_MAX_OVERFLOW")
+    database_pool_timeout: float = Field(30.0, env="DATABASE_POOL_TIMEOUT")
+    database_pool_recycle: float = Field(1800.0, env="DATABASE_POOL_RECYCLE")
+    database_pool_pre_ping: bool = Field(False, env="DATABASE_POOL_PRE_PING")
+    database_statement_cache_size: int = Field(100, env="DATABASE_STATEMENT_CACHE_SIZE")
     domain: str = Field(env="DOMAIN")
     port: int = Field(env="PORT")
     poll_type: PollType = Field(env="POLL_TYPE")
     main_bot_path: str = "/webhook/main"
+    workers: int = Field(1, env="WORKERS")
+    postgres_coordination: bool = Field(False, env="POSTGRES_COORDINATION")
+    webhook_queue_enabled: bool = Field(False, env="WEBHOOK_QUEUE_ENABLED")
+    webhook_queue_size: int = Field(1000, env="WEBHOOK_QUEUE_SIZE")
+    webhook_queue_workers: int = Field(20, env="WEBHOOK_QUEUE_WORKERS")
+    sticker_batch_window: float = Field(0.0, env="STICKER_BATCH_WINDOW")
+    sticker_batch_max_size: int = Field(50, env="STICKER_BATCH_MAX_SIZE")
+    sticker_batch_concurrency: int = Field(4, env="STICKER_BATCH_CONCURRENCY")
+    upload_jobs_enabled: bool = Field(False, env="UPLOAD_JOBS_ENABLED")
+    upload_job_concurrency: int = Field(4, env="UPLOAD_JOB_CONCURRENCY")
+    upload_job_poll_interval: float = Field(1.0, env="UPLOAD_JOB_POLL_INTERVAL")
+    upload_job_lease: float = Field(300.0, env="UPLOAD_JOB_LEASE")
+    upload_job_max_attempts: int = Field(5, env="UPLOAD_JOB_MAX_ATTEMPTS")
+    upload_job_retry_delay: float = Field(2.0, env="UPLOAD_JOB_RETRY_DELAY")
+    upload_job_max_retry_delay: float = Field(300.0, env="UPLOAD_JOB_MAX_RETRY_DELAY")
+    upload_job_retention: float = Field(604800.0, env="UPLOAD_JOB_RETENTION")
+    clone_concurrency: int = Field(4, env="CLONE_CONCURRENCY")
+    clone_progress_interval: float = Field(5.0, env="CLONE_PROGRESS_INTERVAL")
+    clone_lease: float = Field(300.0, env="CLONE_LEASE")
+    processed_update_retention: float = Field(86400.0, env="PROCESSED_UPDATE_RETENTION")
+    processed_update_prune_interval: float = Field(
+        3600.0, env="PROCESSED_UPDATE_PRUNE_INTERVAL"
+    )
+    image_executor_type: ImageExecutorType = Field(
+        ImageExecutorType.PROCESS, env="IMAGE_EXECUTOR_TYPE"
+    )
+    image_executor_workers: int = Field(2, env="IMAGE_EXECUTOR_WORKERS")
+    image_executor_queue_size: int = Field(16, env="IMAGE_EXECUTOR_QUEUE_SIZE")
+    cache_max_size: int = Field(10_000, env="CACHE_MAX_SIZE")
+    cache_ttl: float = Field(300.0, env="CACHE_TTL")
+    sticker_file_cache_max_bytes: int = Field(
+        64 * 1024 * 1024, env="STICKER_FILE_CACHE_MAX_BYTES"
+    )
+    image_cache_max_bytes: int = Field(32 * 1024 * 1024, env="IMAGE_CACHE_MAX_BYTES")
+    image_cache_dir: str | None = Field(None, env="IMAGE_CACHE_DIR")
+    image_cache_disk_max_bytes: int = Field(
+        512 * 1024 * 1024, env="IMAGE_CACHE_DISK_MAX_BYTES"
+    )
+    update_max_concurrency: int = Field(None, env="UPDATE_MAX_CONCURRENCY")
+    update_max_pending_per_user: int = Field(100, env="UPDATE_MAX_PENDING_PER_USER")
+    telegram_global_rate: float = Field(30.0, env="TELEGRAM_GLOBAL_RATE")
+    telegram_chat_rate: float = Field(1.0, env="TELEGRAM_CHAT_RATE")
+    telegram_chat_burst: int = Field(3, env="TELEGRAM_CHAT_BURST")
+    telegram_max_retries: int = Field(3, env="TELEGRAM_MAX_RETRIES")
+    telegram_api_url: str | None = Field(None, env="TELEGRAM_API_URL")
+    telegram_connection_limit: int = Field(100, env="TELEGRAM_CONNECTION_LIMIT")
+    telegram_connection_limit_per_host: int = Field(
+        0, env="TELEGRAM_CONNECTION_LIMIT_PER_HOST"
+    )
+    telegram_keepalive_timeout: float = Field(60.0, env="TELEGRAM_KEEPALIVE_TIMEOUT")
+    telegram_dns_cache_ttl: int = Field(300, env="TELEGRAM_DNS_CACHE_TTL")
+    telegram_request_timeout: float = Field(60.0, env="TELEGRAM_REQUEST_TIMEOUT")
+    telegram_connect_timeout: float = Field(10.0, env="TELEGRAM_CONNECT_TIMEOUT")
+    telegram_read_timeout: float = Field(30.0, env="TELEGRAM_READ_TIMEOUT")
+    warm_up_database_connections: int = Field(5, env="WARM_UP_DATABASE_CONNECTIONS")
+    tracing_sample_rate: float = Field(0.0, env="TRACING_SAMPLE_RATE")
+    tracing_file: str | None = Field(None, env="TRACING_FILE")
+    tracing_otlp_endpoint: str | None = Field(None, env="TRACING_OTLP_ENDPOINT")
+    tracing_flush_interval: float = Field(5.0, env="TRACING_FLUSH_INTERVAL")
+    tracing_max_queue_size: int = Field(10_000, env="TRACING_MAX_QUEUE_SIZE")
 
     @property
     def async_database_url(self: "Settings") -> str:
@@ -27,6 +100,18 @@ class Settings(BaseSettings):
         ), "DATABASE_URL must start with postgresql+asyncpg://"
         return async_database_url
 
+    @property
+    def coordinate_via_postgres(self: "Settings") -> bool:
+        return self.postgres_coordination or (
+            self.poll_type == PollType.WEBHOOK and self.workers > 1
+        )
+
+    @property
+    def deduplicate_updates(self: "Settings") -> bool:
+        return self.coordinate_via_postgres or (
+            self.poll_type == PollType.WEBHOOK and self.webhook_queue_enabled
+        )
+
     @property
     def webhook_url(self: "Settings") -> str:
         return f"https://{self.domain}{self.main_bot_path}"
@@ -40,5 +125,32 @@ class Settings(BaseSettings):
         assert not v.startswith("http"), "DOMAIN must not start with http or https"
         return v
 
+    @validator("update_max_concurrency", pre=True, always=True)
+    def update_max_concurrency_must_fit_database_pool(
+        cls: "Settings",  # noqa: N805
+        v: int | str | None,  # noqa: VNE001
+        values: dict[str, Any],
+    ) -> int:
+        database_connections = (
+            values["database_pool_size"] + values["database_max_overflow"]
+        )
+
+        if v is None:
+            return int(values["database_pool_size"])
+
+        assert (
+            int(v) <= database_connections
+        ), "UPDATE_MAX_CONCURRENCY must not exceed DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW"  # noqa: E501
+        return int(v)
+
+
+@cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+def __getattr__(name: str) -> Settings:
+    if name == "settings":
+        return get_settings()
 
-settings = Settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
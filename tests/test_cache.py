@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from util import cache
+from util.cache import BytesCache, TTLCache
+from util.image_cache import DiskCache
+
+
+class Clock:
+    def __init__(self: "Clock") -> None:
+        self.now = 0.0
+
+    def __call__(self: "Clock") -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache, "monotonic", clock)
+    return clock
+
+
+def test_ttl_cache_counts_hits_and_misses() -> None:
+    ttl_cache = TTLCache[str, int](max_size=10, ttl=60.0)
+
+    assert ttl_cache.get("a") is None
+    ttl_cache.set("a", 1)
+    assert ttl_cache.get("a") == 1
+
+    assert ttl_cache.stats() == {"size": 1, "hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_ttl_cache_expires_entries(clock: Clock) -> None:
+    ttl_cache = TTLCache[str, int](max_size=10, ttl=60.0)
+    ttl_cache.set("a", 1)
+
+    clock.now = 60.0
+    assert ttl_cache.get("a") == 1
+
+    clock.now = 60.1
+    assert ttl_cache.get("a") is None
+    assert len(ttl_cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    ttl_cache = TTLCache[str, int](max_size=2, ttl=60.0)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+
+    assert ttl_cache.get("a") == 1
+    ttl_cache.set("c", 3)
+
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("a") == 1
+    assert ttl_cache.get("c") == 3
+
+
+def test_ttl_cache_set_refreshes_expiry(clock: Clock) -> None:
+    ttl_cache = TTLCache[str, int](max_size=10, ttl=60.0)
+    ttl_cache.set("a", 1)
+
+    clock.now = 50.0
+    ttl_cache.set("a", 2)
+
+    clock.now = 100.0
+    assert ttl_cache.get("a") == 2
+
+
+def test_ttl_cache_without_size_stores_nothing() -> None:
+    ttl_cache = TTLCache[str, int](max_size=0, ttl=60.0)
+    ttl_cache.set("a", 1)
+
+    assert ttl_cache.get("a") is None
+    assert len(ttl_cache) == 0
+
+
+def test_ttl_cache_invalidate_and_clear() -> None:
+    ttl_cache = TTLCache[str, int](max_size=10, ttl=60.0)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+
+    ttl_cache.invalidate("a")
+    ttl_cache.invalidate("missing")
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.get("b") == 2
+
+    ttl_cache.clear()
+    assert len(ttl_cache) == 0
+
+
+def test_bytes_cache_evicts_by_size() -> None:
+    bytes_cache = BytesCache[str](max_bytes=10)
+    bytes_cache.set("a", b"1234")
+    bytes_cache.set("b", b"1234")
+
+    assert bytes_cache.get("a") == b"1234"
+    bytes_cache.set("c", b"1234")
+
+    assert bytes_cache.get("b") is None
+    assert bytes_cache.get("a") == b"1234"
+    assert bytes_cache.get("c") == b"1234"
+    assert bytes_cache.current_bytes == 8
+
+
+def test_bytes_cache_skips_values_larger_than_the_cache() -> None:
+    bytes_cache = BytesCache[str](max_bytes=4)
+    bytes_cache.set("a", b"1234")
+    bytes_cache.set("b", b"12345")
+
+    assert bytes_cache.get("b") is None
+    assert bytes_cache.get("a") == b"1234"
+
+
+def test_bytes_cache_replaces_values() -> None:
+    bytes_cache = BytesCache[str](max_bytes=10)
+    bytes_cache.set("a", b"1234")
+    bytes_cache.set("a", b"12")
+
+    assert bytes_cache.get("a") == b"12"
+    assert bytes_cache.current_bytes == 2
+
+    bytes_cache.invalidate("a")
+    assert bytes_cache.current_bytes == 0
+    assert len(bytes_cache) == 0
+
+
+def test_bytes_cache_stats() -> None:
+    bytes_cache = BytesCache[str](max_bytes=10)
+    bytes_cache.set("a", b"1234")
+
+    bytes_cache.get("a")
+    bytes_cache.get("a")
+    bytes_cache.get("b")
+
+    assert bytes_cache.stats() == {
+        "size": 1,
+        "bytes": 4,
+        "hits": 2,
+        "misses": 1,
+        "hit_ratio": 2 / 3,
+        "bytes_saved": 8,
+    }
+
+
+def test_disk_cache_tracks_size_across_threads(tmp_path: Path) -> None:
+    disk_cache = DiskCache(path=tmp_path, max_bytes=64)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for index in range(200):
+            executor.submit(disk_cache.set, str(index % 20), b"x" * (index % 7 + 1))
+
+    entries_bytes = sum(entry.stat().st_size for entry in tmp_path.iterdir())
+    assert disk_cache.current_bytes == entries_bytes
+    assert disk_cache.current_bytes <= 64
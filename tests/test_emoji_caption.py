@@ -0,0 +1,67 @@
+import pytest
+
+from util.emoji_caption import (
+    MAX_SCANNED_EMOJIS,
+    build_char_class_pattern,
+    build_emoji_trie,
+    build_emoji_trie_pattern,
+    get_emojis,
+    get_first_emoji,
+    iter_emojis,
+)
+
+
+def test_build_emoji_trie_marks_complete_sequences() -> None:
+    trie = build_emoji_trie(emojis=["ab", "a", "c"])
+
+    assert trie == {"a": {"b": {"": {}}, "": {}}, "c": {"": {}}}
+
+
+def test_build_emoji_trie_pattern_makes_prefixes_optional() -> None:
+    trie = build_emoji_trie(emojis=["ab", "a", "c"])
+
+    assert build_emoji_trie_pattern(trie=trie) == "(?:a(?:b)?|c)"
+
+
+def test_build_char_class_pattern_collapses_ranges() -> None:
+    chars = ["a", "b", "c", "x", "z", "y", "m"]
+
+    assert build_char_class_pattern(chars=chars) == "[a-cmx-z]"
+
+
+@pytest.mark.parametrize(
+    ("text", "emojis"),
+    [
+        ("", []),
+        ("hello", []),
+        ("123 #*", []),
+        ("a😀b🥰", ["😀", "🥰"]),
+        ("😀😀", ["😀", "😀"]),
+        ("❤", ["❤"]),
+        ("❤️", ["❤️"]),
+        ("👍🏽👍", ["👍🏽", "👍"]),
+        ("1️⃣", ["1️⃣"]),
+        ("🇯🇵🇺🇸", ["🇯🇵", "🇺🇸"]),
+        ("👨‍👩‍👧 family", ["👨‍👩‍👧"]),
+        ("🏳️‍🌈", ["🏳️‍🌈"]),
+    ],
+)
+def test_iter_emojis(text: str, emojis: list[str]) -> None:
+    assert list(iter_emojis(text=text)) == emojis
+
+
+def test_get_first_emoji() -> None:
+    assert get_first_emoji(text="x🥰😀") == "🥰"
+    assert get_first_emoji(text="no emoji") is None
+
+
+def test_get_emojis_removes_duplicates() -> None:
+    assert get_emojis(text="😀😀🥰😀") == ["😀", "🥰"]
+
+
+def test_get_emojis_stops_at_limit() -> None:
+    assert get_emojis(text="😀🥰😎", limit=2) == ["😀", "🥰"]
+
+
+def test_get_emojis_scans_a_bounded_number_of_emojis() -> None:
+    assert get_emojis(text="😀" * MAX_SCANNED_EMOJIS + "🥰") == ["😀"]
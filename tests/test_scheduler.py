@@ -0,0 +1,89 @@
+import asyncio
+from time import monotonic
+from typing import Any
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AddStickerToSet, GetFile, SendMessage, TelegramMethod
+
+from util.scheduler import RequestScheduler
+
+
+def create_request_scheduler() -> RequestScheduler:
+    return RequestScheduler(
+        global_rate=100.0, chat_rate=100.0, chat_burst=10, max_retries=1
+    )
+
+
+def create_add_sticker_to_set(user_id: int) -> AddStickerToSet:
+    return AddStickerToSet(
+        user_id=user_id,
+        name="pack_by_bot",
+        emojis="😀",
+        png_sticker="file",
+    )
+
+
+class FloodedOnce:
+    def __init__(self: "FloodedOnce") -> None:
+        self.flooded = False
+        self.finished_at: dict[str, float] = {}
+
+    async def __call__(self: "FloodedOnce", _: Any, method: TelegramMethod[Any]) -> Any:
+        name = type(method).__name__
+
+        if name != SendMessage.__name__ and not self.flooded:
+            self.flooded = True
+            raise TelegramRetryAfter(method=method, message="", retry_after=1)
+
+        self.finished_at[name] = monotonic()
+        return True
+
+
+def test_user_flood_control_does_not_pause_other_chats() -> None:
+    async def run() -> tuple[float, dict[str, float]]:
+        request_scheduler = create_request_scheduler()
+        make_request = FloodedOnce()
+        started_at = monotonic()
+
+        add_sticker = asyncio.create_task(
+            request_scheduler(
+                make_request, None, create_add_sticker_to_set(user_id=1)  # type: ignore
+            )
+        )
+        await asyncio.sleep(0.1)
+        await request_scheduler(
+            make_request, None, SendMessage(chat_id=2, text="hi")  # type: ignore
+        )
+        await add_sticker
+
+        assert request_scheduler.stats()["paused_users"] == 0
+        return started_at, make_request.finished_at
+
+    started_at, finished_at = asyncio.run(run())
+
+    assert finished_at["SendMessage"] - started_at < 0.5
+    assert finished_at["AddStickerToSet"] - started_at >= 1.0
+
+
+def test_flood_control_without_chat_or_user_pauses_globally() -> None:
+    async def run() -> tuple[float, dict[str, float]]:
+        request_scheduler = create_request_scheduler()
+        make_request = FloodedOnce()
+        started_at = monotonic()
+
+        get_file = asyncio.create_task(
+            request_scheduler(
+                make_request, None, GetFile(file_id="file")  # type: ignore
+            )
+        )
+        await asyncio.sleep(0.1)
+        await request_scheduler(
+            make_request, None, SendMessage(chat_id=2, text="hi")  # type: ignore
+        )
+        await get_file
+
+        return started_at, make_request.finished_at
+
+    started_at, finished_at = asyncio.run(run())
+
+    assert finished_at["SendMessage"] - started_at >= 1.0
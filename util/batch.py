@@ -0,0 +1,416 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import TypedDict
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, User as TelegramUser
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from model.models import StickerSetModel, StickerSetType
+from util.bot_identity import BotIdentity
+from util.isolation import UpdateExecutor
+from util.metrics import stickers_added
+from util.query.sticker_set import (
+    get_sticker_set_for_user_by_type,
+    get_sticker_set_limit,
+    mark_sticker_set_full,
+    update_sticker_count,
+)
+from util.query.sticker import create_sticker, get_user_file_unique_ids
+from util.query.user import get_user_with_sticker_set_by_telegram_id
+from util.sticker import (
+    StickerFileInput,
+    is_sticker_set_full_error,
+    register_new_sticker_set,
+)
+from util.webhook import UpdateAcknowledgement
+
+
+class StickerBatcherStats(TypedDict):
+    pending_users: int
+    pending_items: int
+    batches: int
+    added: int
+    failed: int
+
+
+@dataclass
+class StickerBatchItem:
+    message: Message
+    sticker_set_type: StickerSetType
+    emojis: str | None
+    file_unique_id: str
+    get_sticker_file_input: Callable[[], Awaitable[StickerFileInput]]
+    update_acknowledgement: UpdateAcknowledgement | None = None
+
+
+@dataclass
+class StickerBatch:
+    bot: Bot
+    telegram_user: TelegramUser
+    telegram_user_username: str
+    items: list[StickerBatchItem] = field(default_factory=list)
+    flush_handle: asyncio.TimerHandle | None = None
+
+
+@dataclass
+class StickerBatchResult:
+    sticker_set_name: str | None = None
+    sticker_set_title: str | None = None
+    created: bool = False
+    added: int = 0
+    failed: int = 0
+    duplicates: int = 0
+
+
+def resolve_media_group_emojis(items: list[StickerBatchItem]) -> None:
+    media_group_emojis = {
+        item.message.media_group_id: item.emojis
+        for item in items
+        if item.message.media_group_id and item.emojis
+    }
+
+    for item in items:
+        if not item.emojis and item.message.media_group_id:
+            item.emojis = media_group_emojis.get(item.message.media_group_id)
+
+
+def build_summary_text(results: dict[StickerSetType, StickerBatchResult]) -> str:
+    lines: list[str] = []
+
+    for result in results.values():
+        if result.sticker_set_name:
+            action = "Sticker pack created" if result.created else "Stickers added"
+            lines.append(
+                f"{action}: {result.added} added.\n"
+                f"Link: <a href='https://t.me/addstickers/{result.sticker_set_name}'>{result.sticker_set_title}</a>"  # noqa: E501
+            )
+
+        if result.duplicates:
+            lines.append(f"{result.duplicates} stickers were already in your pack.")
+
+        if result.failed:
+            lines.append(f"{result.failed} stickers could not be added.")
+
+    return "\n\n".join(lines)
+
+
+class StickerBatcher:
+    def __init__(
+        self: "StickerBatcher",
+        async_engine: AsyncEngine,
+        bot_identity: BotIdentity,
+        update_executor: UpdateExecutor,
+        window: float,
+        max_size: int,
+        concurrency: int,
+    ) -> None:
+        self.async_engine = async_engine
+        self.bot_identity = bot_identity
+        self.update_executor = update_executor
+        self.window = window
+        self.max_size = max_size
+        self.concurrency = concurrency
+
+        self._batches: dict[int, StickerBatch] = {}
+        self._flush_tasks: set[asyncio.Task[None]] = set()
+
+        self.batches = 0
+        self.added = 0
+        self.failed = 0
+
+    def add(
+        self: "StickerBatcher",
+        bot: Bot,
+        telegram_user: TelegramUser,
+        telegram_user_username: str,
+        item: StickerBatchItem,
+    ) -> None:
+        batch = self._batches.setdefault(
+            telegram_user.id,
+            StickerBatch(
+                bot=bot,
+                telegram_user=telegram_user,
+                telegram_user_username=telegram_user_username,
+            ),
+        )
+        batch.items.append(item)
+
+        if item.update_acknowledgement:
+            item.update_acknowledgement.defer()
+
+        if batch.flush_handle:
+            batch.flush_handle.cancel()
+
+        if len(batch.items) >= self.max_size:
+            self._start_flush(telegram_id=telegram_user.id)
+            return
+
+        batch.flush_handle = asyncio.get_running_loop().call_later(
+            self.window, self._start_flush, telegram_user.id
+        )
+
+    def _start_flush(self: "StickerBatcher", telegram_id: int) -> None:
+        batch = self._batches.pop(telegram_id, None)
+
+        if not batch:
+            return
+
+        if batch.flush_handle:
+            batch.flush_handle.cancel()
+
+        flush_task = asyncio.create_task(self._flush(batch=batch))
+        self._flush_tasks.add(flush_task)
+        flush_task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self: "StickerBatcher", batch: StickerBatch) -> None:
+        async with self.update_executor.lock_user(
+            bot_id=batch.bot.id, user_id=batch.telegram_user.id
+        ):
+            try:
+                await self._flush_batch(batch=batch)
+            except Exception as exception:
+                self.failed += len(batch.items)
+                logging.exception("Can't flush sticker batch: %s", exception)
+                await batch.items[-1].message.reply(
+                    "An error occurred. Please try again."
+                )
+
+            await self._complete_update_acknowledgements(batch=batch)
+
+    async def _complete_update_acknowledgements(
+        self: "StickerBatcher", batch: StickerBatch
+    ) -> None:
+        update_acknowledgements = [
+            item.update_acknowledgement
+            for item in batch.items
+            if item.update_acknowledgement
+        ]
+
+        if not update_acknowledgements:
+            return
+
+        async with AsyncSession(bind=self.async_engine) as async_session:
+            async with async_session.begin():
+                for update_acknowledgement in update_acknowledgements:
+                    await update_acknowledgement.complete(async_session=async_session)
+
+    async def _flush_batch(self: "StickerBatcher", batch: StickerBatch) -> None:
+        token = Bot.set_current(batch.bot)
+
+        try:
+            resolve_media_group_emojis(items=batch.items)
+            results: dict[StickerSetType, StickerBatchResult] = {}
+
+            async with AsyncSession(
+                bind=self.async_engine, expire_on_commit=False
+            ) as async_session:
+                for sticker_set_type in StickerSetType:
+                    items = [
+                        item
+                        for item in batch.items
+                        if item.sticker_set_type == sticker_set_type
+                    ]
+
+                    if items:
+                        result = await self._add_items(
+                            async_session=async_session,
+                            batch=batch,
+                            sticker_set_type=sticker_set_type,
+                            items=items,
+                        )
+                        results[sticker_set_type] = result
+
+                        self.added += result.added
+                        self.failed += result.failed
+        finally:
+            Bot.reset_current(token)
+
+        self.batches += 1
+
+        await batch.items[-1].message.reply(
+            build_summary_text(results=results), parse_mode="HTML"
+        )
+
+    async def _add_items(
+        self: "StickerBatcher",
+        async_session: AsyncSession,
+        batch: StickerBatch,
+        sticker_set_type: StickerSetType,
+        items: list[StickerBatchItem],
+    ) -> StickerBatchResult:
+        result = StickerBatchResult()
+
+        pending = [item for item in items if item.emojis]
+        result.failed = len(items) - len(pending)
+
+        sticker_set: StickerSetModel | None
+        async with async_session.begin():
+            user, sticker_set = await get_user_with_sticker_set_by_telegram_id(
+                async_session=async_session,
+                telegram_id=batch.telegram_user.id,
+                sticker_set_type=sticker_set_type,
+            )
+            seen_file_unique_ids = (
+                await get_user_file_unique_ids(
+                    async_session=async_session,
+                    user=user,
+                    file_unique_ids=[item.file_unique_id for item in pending],
+                )
+                if user
+                else set()
+            )
+
+        if not user:
+            result.failed = len(items)
+            return result
+
+        unique_pending: list[StickerBatchItem] = []
+
+        for item in pending:
+            if item.file_unique_id in seen_file_unique_ids:
+                result.duplicates += 1
+                continue
+
+            seen_file_unique_ids.add(item.file_unique_id)
+            unique_pending.append(item)
+
+        pending = unique_pending
+
+        while pending:
+            if not sticker_set:
+                first_item = pending.pop(0)
+                sticker_set = await register_new_sticker_set(
+                    bot=batch.bot,
+                    bot_identity=self.bot_identity,
+                    sticker_set_type=sticker_set_type,
+                    async_session=async_session,
+                    telegram_id=batch.telegram_user.id,
+                    telegram_user_username=batch.telegram_user_username,
+                    user=user,
+                    emojis=first_item.emojis or "",
+                    file_unique_id=first_item.file_unique_id,
+                    sticker_file_input=await first_item.get_sticker_file_input(),
+                )
+                result.created = True
+                result.added += 1
+
+            result.sticker_set_name = sticker_set.name
+            result.sticker_set_title = sticker_set.title
+
+            if not pending:
+                break
+
+            capacity = (
+                get_sticker_set_limit(sticker_set_type=sticker_set_type)
+                - sticker_set.sticker_count
+            )
+            chunk, pending = pending[:capacity], pending[capacity:]
+            overflow = await self._add_chunk(
+                async_session=async_session,
+                batch=batch,
+                sticker_set=sticker_set,
+                items=chunk,
+                result=result,
+            )
+
+            if overflow or not chunk:
+                async with async_session.begin():
+                    await mark_sticker_set_full(
+                        async_session=async_session, sticker_set=sticker_set
+                    )
+                pending = overflow + pending
+
+            if pending:
+                async with async_session.begin():
+                    sticker_set = await get_sticker_set_for_user_by_type(
+                        async_session=async_session,
+                        user=user,
+                        sticker_set_type=sticker_set_type,
+                    )
+
+        return result
+
+    async def _add_chunk(
+        self: "StickerBatcher",
+        async_session: AsyncSession,
+        batch: StickerBatch,
+        sticker_set: StickerSetModel,
+        items: list[StickerBatchItem],
+        result: StickerBatchResult,
+    ) -> list[StickerBatchItem]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        sticker_set_name = sticker_set.name
+
+        added_items: list[StickerBatchItem] = []
+
+        async def add_item(item: StickerBatchItem) -> None:
+            async with semaphore:
+                await batch.bot.add_sticker_to_set(
+                    user_id=batch.telegram_user.id,
+                    name=sticker_set_name,
+                    emojis=item.emojis or "",
+                    **await item.get_sticker_file_input(),
+                )
+                added_items.append(item)
+
+        outcomes = await asyncio.gather(
+            *[add_item(item=item) for item in items], return_exceptions=True
+        )
+
+        overflow: list[StickerBatchItem] = []
+
+        for item, outcome in zip(items, outcomes):
+            if outcome is None:
+                continue
+
+            if isinstance(outcome, TelegramBadRequest) and is_sticker_set_full_error(
+                outcome
+            ):
+                overflow.append(item)
+            else:
+                logging.warning("Can't add batched sticker: %s", outcome)
+                result.failed += 1
+
+        if added_items:
+            async with async_session.begin():
+                for position, item in enumerate(
+                    added_items, start=sticker_set.sticker_count
+                ):
+                    await create_sticker(
+                        async_session=async_session,
+                        sticker_set=sticker_set,
+                        file_unique_id=item.file_unique_id,
+                        emoji=item.emojis or "",
+                        position=position,
+                    )
+
+                await update_sticker_count(
+                    async_session=async_session,
+                    sticker_set=sticker_set,
+                    delta=len(added_items),
+                )
+
+        stickers_added.inc(
+            len(added_items), sticker_set_type=sticker_set.sticker_set_type.name
+        )
+        result.added += len(added_items)
+        return overflow
+
+    async def close(self: "StickerBatcher") -> None:
+        for telegram_id in list(self._batches):
+            self._start_flush(telegram_id=telegram_id)
+
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+
+    def stats(self: "StickerBatcher") -> StickerBatcherStats:
+        return StickerBatcherStats(
+            pending_users=len(self._batches),
+            pending_items=sum(len(batch.items) for batch in self._batches.values()),
+            batches=self.batches,
+            added=self.added,
+            failed=self.failed,
+        )
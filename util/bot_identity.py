@@ -0,0 +1,25 @@
+from aiogram import Bot
+from aiogram.types import User as TelegramUser
+
+
+class BotIdentity:
+    def __init__(self: "BotIdentity") -> None:
+        self._bot_user: TelegramUser | None = None
+
+    async def refresh(self: "BotIdentity", bot: Bot) -> TelegramUser:
+        self._bot_user = await bot.get_me()
+        return self._bot_user
+
+    async def get(self: "BotIdentity", bot: Bot) -> TelegramUser:
+        if self._bot_user is None:
+            return await self.refresh(bot=bot)
+
+        return self._bot_user
+
+    async def get_username(self: "BotIdentity", bot: Bot) -> str:
+        bot_user = await self.get(bot=bot)
+
+        if not bot_user.username:
+            raise ValueError("Bot username is not set!")
+
+        return bot_user.username
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from collections.abc import Hashable
+from time import monotonic
+from typing import Generic, TypedDict, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class CacheStats(TypedDict):
+    size: int
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class TTLCache(Generic[K, V]):
+    def __init__(self: "TTLCache[K, V]", max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self: "TTLCache[K, V]") -> int:
+        return len(self._entries)
+
+    def get(self: "TTLCache[K, V]", key: K) -> V | None:
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+
+        if expires_at < monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self: "TTLCache[K, V]", key: K, value: V) -> None:  # noqa: A003
+        if self.max_size <= 0:
+            return
+
+        self._entries[key] = (monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self: "TTLCache[K, V]", key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self: "TTLCache[K, V]") -> None:
+        self._entries.clear()
+
+    @property
+    def hit_ratio(self: "TTLCache[K, V]") -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self: "TTLCache[K, V]") -> CacheStats:
+        return CacheStats(
+            size=len(self),
+            hits=self.hits,
+            misses=self.misses,
+            hit_ratio=self.hit_ratio,
+        )
+
+
+class BytesCacheStats(TypedDict):
+    size: int
+    bytes: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    bytes_saved: int
+
+
+class BytesCache(Generic[K]):
+    def __init__(self: "BytesCache[K]", max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: OrderedDict[K, bytes] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def __len__(self: "BytesCache[K]") -> int:
+        return len(self._entries)
+
+    def get(self: "BytesCache[K]", key: K) -> bytes | None:
+        value = self._entries.get(key)
+
+        if value is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.bytes_saved += len(value)
+        return value
+
+    def set(self: "BytesCache[K]", key: K, value: bytes) -> None:  # noqa: A003
+        if len(value) > self.max_bytes:
+            return
+
+        self.invalidate(key)
+        self._entries[key] = value
+        self.current_bytes += len(value)
+
+        while self.current_bytes > self.max_bytes:
+            _, evicted_value = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted_value)
+
+    def invalidate(self: "BytesCache[K]", key: K) -> None:
+        value = self._entries.pop(key, None)
+
+        if value is not None:
+            self.current_bytes -= len(value)
+
+    @property
+    def hit_ratio(self: "BytesCache[K]") -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self: "BytesCache[K]") -> BytesCacheStats:
+        return BytesCacheStats(
+            size=len(self),
+            bytes=self.current_bytes,
+            hits=self.hits,
+            misses=self.misses,
+            hit_ratio=self.hit_ratio,
+            bytes_saved=self.bytes_saved,
+        )
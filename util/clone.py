@@ -0,0 +1,547 @@
+import asyncio
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from datetime import timedelta
+from time import monotonic
+from typing import TypedDict
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, Sticker, StickerSet
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from model.models import StickerSetType, UserModel
+from util.bot_identity import BotIdentity
+from util.cache import BytesCache
+from util.isolation import UpdateExecutor
+from util.query.clone_job import (
+    get_unfinished_clone_job,
+    get_claimable_clone_job_ids,
+    get_clone_job,
+    claim_clone_job,
+    checkpoint_clone_job,
+    complete_clone_job,
+    release_clone_job,
+    create_clone_job,
+)
+from util.query.sticker import get_user_sticker_set_by_file_unique_id
+from util.query.sticker_set import (
+    get_sticker_set_for_user_by_type,
+    get_sticker_set_type_from_sticker_set,
+)
+from util.random import random_letter_string
+from util.sticker import (
+    StickerFileInput,
+    add_sticker_to_user_sticker_set,
+    get_sticker_file_input_from_sticker,
+)
+
+STICKER_SET_LINK_PATTERN = re.compile(
+    r"^(?:https?://)?(?:t|telegram)\.me/addstickers/(\w{1,64})/?$"
+)
+STICKER_SET_NAME_PATTERN = re.compile(r"^\w{1,64}$")
+
+
+class CloneLeaseLostError(Exception):
+    pass
+
+
+class StickerAlreadyInPackError(ValueError):
+    pass
+
+
+class StickerSetClonerStats(TypedDict):
+    running: int
+    started: int
+    resumed: int
+    completed: int
+    added: int
+    failed: int
+
+
+@dataclass
+class CloneProgress:
+    job_id: int
+    lock_token: str
+    user_id: int
+    telegram_id: int
+    source_name: str
+    sticker_set_type: StickerSetType
+    telegram_user_username: str
+    chat_id: int
+    progress_message_id: int
+    total: int
+    next_index: int
+    added: int
+    failed: int
+    resumed_index: int | None = None
+    sticker_set_name: str | None = None
+    sticker_set_title: str | None = None
+
+
+def get_sticker_set_name(text: str | None) -> str | None:
+    if not text:
+        return None
+
+    text = text.strip()
+
+    if link_match := STICKER_SET_LINK_PATTERN.match(text):
+        return link_match.group(1)
+
+    if STICKER_SET_NAME_PATTERN.match(text):
+        return text
+
+    return None
+
+
+def build_progress_text(progress: CloneProgress) -> str:
+    return (
+        f"Cloning <b>{progress.source_name}</b>: "
+        f"{progress.next_index}/{progress.total} stickers processed."
+    )
+
+
+class StickerSetCloner:
+    def __init__(
+        self: "StickerSetCloner",
+        async_engine: AsyncEngine,
+        update_executor: UpdateExecutor,
+        bot_identity: BotIdentity,
+        sticker_file_cache: BytesCache[str],
+        concurrency: int,
+        progress_interval: float,
+        lease: float,
+    ) -> None:
+        self.async_engine = async_engine
+        self.update_executor = update_executor
+        self.bot_identity = bot_identity
+        self.sticker_file_cache = sticker_file_cache
+        self.concurrency = concurrency
+        self.progress_interval = progress_interval
+        self.lease = lease
+
+        self._tasks: dict[int, asyncio.Task[None]] = {}
+
+        self.started = 0
+        self.resumed = 0
+        self.completed = 0
+        self.added = 0
+        self.failed = 0
+
+    async def start(
+        self: "StickerSetCloner",
+        bot: Bot,
+        message: Message,
+        user_id: int,
+        telegram_user_username: str,
+        source_sticker_set: StickerSet,
+    ) -> bool:
+        lock_token = random_letter_string(length=32)
+
+        async with AsyncSession(
+            bind=self.async_engine, expire_on_commit=False
+        ) as async_session:
+            async with async_session.begin():
+                clone_job = await get_unfinished_clone_job(
+                    async_session=async_session,
+                    user_id=user_id,
+                    source_name=source_sticker_set.name,
+                )
+
+                if clone_job:
+                    clone_job = await claim_clone_job(
+                        async_session=async_session,
+                        job_id=clone_job.id,
+                        lease=timedelta(seconds=self.lease),
+                        lock_token=lock_token,
+                    )
+
+                    if not clone_job:
+                        return False
+
+            resumed = clone_job is not None
+
+            if not clone_job:
+                progress_message = await message.reply(
+                    f"Cloning <b>{source_sticker_set.name}</b>...",
+                    parse_mode="HTML",
+                )
+
+                async with async_session.begin():
+                    clone_job = await create_clone_job(
+                        async_session=async_session,
+                        user_id=user_id,
+                        source_name=source_sticker_set.name,
+                        sticker_set_type=get_sticker_set_type_from_sticker_set(
+                            sticker_set=source_sticker_set
+                        ),
+                        telegram_user_username=telegram_user_username,
+                        chat_id=message.chat.id,
+                        progress_message_id=progress_message.message_id,
+                        total=len(source_sticker_set.stickers),
+                        lease=timedelta(seconds=self.lease),
+                        lock_token=lock_token,
+                    )
+
+            job_id = clone_job.id
+
+        self.started += 1
+        self._spawn(bot=bot, job_id=job_id, lock_token=lock_token, resumed=resumed)
+        return True
+
+    async def resume(self: "StickerSetCloner", bot: Bot) -> None:
+        async with AsyncSession(bind=self.async_engine) as async_session:
+            job_ids = await get_claimable_clone_job_ids(async_session=async_session)
+
+        resumed = 0
+
+        for job_id in job_ids:
+            lock_token = random_letter_string(length=32)
+
+            async with AsyncSession(bind=self.async_engine) as async_session:
+                async with async_session.begin():
+                    clone_job = await claim_clone_job(
+                        async_session=async_session,
+                        job_id=job_id,
+                        lease=timedelta(seconds=self.lease),
+                        lock_token=lock_token,
+                    )
+
+            if clone_job:
+                resumed += 1
+                self._spawn(bot=bot, job_id=job_id, lock_token=lock_token, resumed=True)
+
+        self.resumed += resumed
+
+        if resumed:
+            logging.info("Resumed %s clone jobs", resumed)
+
+    def _spawn(
+        self: "StickerSetCloner", bot: Bot, job_id: int, lock_token: str, resumed: bool
+    ) -> None:
+        clone_task = asyncio.create_task(
+            self._run(bot=bot, job_id=job_id, lock_token=lock_token, resumed=resumed)
+        )
+        self._tasks[job_id] = clone_task
+        clone_task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(
+        self: "StickerSetCloner", bot: Bot, job_id: int, lock_token: str, resumed: bool
+    ) -> None:
+        token = Bot.set_current(bot)
+        progress: CloneProgress | None = None
+
+        try:
+            async with AsyncSession(bind=self.async_engine) as async_session:
+                clone_job = await get_clone_job(
+                    async_session=async_session, job_id=job_id
+                )
+                user = await async_session.get(UserModel, clone_job.user_id)
+
+                if not user:
+                    raise ValueError(f"User {clone_job.user_id} does not exist")
+
+                progress = CloneProgress(
+                    job_id=clone_job.id,
+                    lock_token=lock_token,
+                    user_id=clone_job.user_id,
+                    telegram_id=user.telegram_id,
+                    source_name=clone_job.source_name,
+                    sticker_set_type=clone_job.sticker_set_type,
+                    telegram_user_username=clone_job.telegram_user_username,
+                    chat_id=clone_job.chat_id,
+                    progress_message_id=clone_job.progress_message_id,
+                    total=clone_job.total,
+                    next_index=clone_job.next_index,
+                    added=clone_job.added,
+                    failed=clone_job.failed,
+                    resumed_index=clone_job.next_index if resumed else None,
+                )
+
+            await self._clone(bot=bot, progress=progress)
+        except CloneLeaseLostError as clone_lease_lost_error:
+            logging.warning(
+                "Clone job %s lost its lease: %s", job_id, clone_lease_lost_error
+            )
+        except Exception as exception:
+            logging.exception("Clone job %s failed: %s", job_id, exception)
+
+            if progress:
+                await self._report(
+                    bot=bot,
+                    progress=progress,
+                    text=f"{build_progress_text(progress)}\n\n"
+                    "Cloning was interrupted. "
+                    "Send the same /clone command again to continue.",
+                )
+        finally:
+            await self._release(job_id=job_id, lock_token=lock_token)
+            Bot.reset_current(token)
+
+    async def _release(self: "StickerSetCloner", job_id: int, lock_token: str) -> None:
+        try:
+            async with AsyncSession(bind=self.async_engine) as async_session:
+                async with async_session.begin():
+                    await release_clone_job(
+                        async_session=async_session,
+                        job_id=job_id,
+                        lock_token=lock_token,
+                    )
+        except Exception as exception:
+            logging.error("Can't release clone job %s: %s", job_id, exception)
+
+    async def _clone(
+        self: "StickerSetCloner", bot: Bot, progress: CloneProgress
+    ) -> None:
+        try:
+            source_sticker_set = await bot.get_sticker_set(name=progress.source_name)
+        except TelegramBadRequest as telegram_bad_request:
+            logging.warning(
+                "Can't fetch sticker set %s: %s",
+                progress.source_name,
+                telegram_bad_request.message,
+            )
+            source_sticker_set = None
+
+        stickers = source_sticker_set.stickers if source_sticker_set else []
+        progress.total = min(progress.total, len(stickers))
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def prepare(sticker: Sticker) -> StickerFileInput:
+            async with semaphore:
+                return await get_sticker_file_input_from_sticker(
+                    bot=bot,
+                    sticker_set_type=progress.sticker_set_type,
+                    sticker=sticker,
+                    sticker_file_cache=self.sticker_file_cache,
+                )
+
+        upcoming = islice(stickers, progress.next_index, progress.total)
+        prepared: deque[tuple[Sticker, asyncio.Task[StickerFileInput]]] = deque()
+
+        def prefetch() -> None:
+            while len(prepared) < self.concurrency:
+                sticker = next(upcoming, None)
+
+                if sticker is None:
+                    return
+
+                prepared.append((sticker, asyncio.create_task(prepare(sticker))))
+
+        reported_at = monotonic()
+
+        try:
+            prefetch()
+
+            while prepared:
+                sticker, prepare_task = prepared.popleft()
+                prefetch()
+
+                await self._add_sticker(
+                    bot=bot,
+                    progress=progress,
+                    sticker=sticker,
+                    prepare_task=prepare_task,
+                )
+
+                if monotonic() - reported_at >= self.progress_interval:
+                    reported_at = monotonic()
+                    await self._report(
+                        bot=bot, progress=progress, text=build_progress_text(progress)
+                    )
+        finally:
+            for _, prepare_task in prepared:
+                prepare_task.cancel()
+
+            await asyncio.gather(
+                *(prepare_task for _, prepare_task in prepared), return_exceptions=True
+            )
+
+        await self._complete(bot=bot, progress=progress)
+
+    async def _add_sticker(
+        self: "StickerSetCloner",
+        bot: Bot,
+        progress: CloneProgress,
+        sticker: Sticker,
+        prepare_task: asyncio.Task[StickerFileInput],
+    ) -> None:
+        try:
+            async with self.update_executor.lock_user(
+                bot_id=bot.id, user_id=progress.telegram_id
+            ):
+                await self._add_sticker_with_checkpoint(
+                    bot=bot,
+                    progress=progress,
+                    sticker=sticker,
+                    prepare_task=prepare_task,
+                )
+        finally:
+            prepare_task.cancel()
+            await asyncio.gather(prepare_task, return_exceptions=True)
+
+    async def _add_sticker_with_checkpoint(
+        self: "StickerSetCloner",
+        bot: Bot,
+        progress: CloneProgress,
+        sticker: Sticker,
+        prepare_task: asyncio.Task[StickerFileInput],
+    ) -> None:
+        async with AsyncSession(
+            bind=self.async_engine, expire_on_commit=False
+        ) as async_session:
+            try:
+                if not sticker.emoji:
+                    raise ValueError("Sticker has no emoji")
+
+                await self._add_sticker_to_user_set(
+                    bot=bot,
+                    async_session=async_session,
+                    progress=progress,
+                    sticker=sticker,
+                    emojis=sticker.emoji,
+                    prepare_task=prepare_task,
+                )
+                progress.added += 1
+                self.added += 1
+            except StickerAlreadyInPackError:
+                if progress.next_index == progress.resumed_index:
+                    progress.added += 1
+                else:
+                    progress.failed += 1
+                    self.failed += 1
+            except (TelegramBadRequest, ValueError) as exception:
+                logging.warning(
+                    "Can't clone sticker %s from %s: %s",
+                    sticker.file_unique_id,
+                    progress.source_name,
+                    exception,
+                )
+                progress.failed += 1
+                self.failed += 1
+
+            progress.next_index += 1
+
+            async with async_session.begin():
+                if not await checkpoint_clone_job(
+                    async_session=async_session,
+                    job_id=progress.job_id,
+                    lease=timedelta(seconds=self.lease),
+                    lock_token=progress.lock_token,
+                    next_index=progress.next_index,
+                    added=progress.added,
+                    failed=progress.failed,
+                ):
+                    raise CloneLeaseLostError(
+                        f"Clone job {progress.job_id} is leased by another worker"
+                    )
+
+    async def _add_sticker_to_user_set(
+        self: "StickerSetCloner",
+        bot: Bot,
+        async_session: AsyncSession,
+        progress: CloneProgress,
+        sticker: Sticker,
+        emojis: str,
+        prepare_task: asyncio.Task[StickerFileInput],
+    ) -> None:
+        async with async_session.begin():
+            user = await async_session.get(UserModel, progress.user_id)
+
+            if not user:
+                raise ValueError(f"User {progress.user_id} does not exist")
+
+            if await get_user_sticker_set_by_file_unique_id(
+                async_session=async_session,
+                user=user,
+                file_unique_id=sticker.file_unique_id,
+            ):
+                raise StickerAlreadyInPackError("Sticker is already in the pack")
+
+            sticker_set = await get_sticker_set_for_user_by_type(
+                async_session=async_session,
+                user=user,
+                sticker_set_type=progress.sticker_set_type,
+            )
+
+        sticker_set, _ = await add_sticker_to_user_sticker_set(
+            bot=bot,
+            bot_identity=self.bot_identity,
+            async_session=async_session,
+            telegram_id=user.telegram_id,
+            telegram_user_username=progress.telegram_user_username,
+            user=user,
+            sticker_set_type=progress.sticker_set_type,
+            sticker_set=sticker_set,
+            emojis=emojis,
+            file_unique_id=sticker.file_unique_id,
+            sticker_file_input=await prepare_task,
+        )
+
+        progress.sticker_set_name = sticker_set.name
+        progress.sticker_set_title = sticker_set.title
+
+    async def _complete(
+        self: "StickerSetCloner", bot: Bot, progress: CloneProgress
+    ) -> None:
+        async with AsyncSession(bind=self.async_engine) as async_session:
+            async with async_session.begin():
+                if not await complete_clone_job(
+                    async_session=async_session,
+                    job_id=progress.job_id,
+                    lock_token=progress.lock_token,
+                ):
+                    raise CloneLeaseLostError(
+                        f"Clone job {progress.job_id} is leased by another worker"
+                    )
+
+        text = f"Cloned {progress.added} stickers from <b>{progress.source_name}</b>."
+
+        if progress.sticker_set_name:
+            text += (
+                "\n\n"
+                f"Link: <a href='https://t.me/addstickers/{progress.sticker_set_name}'>{progress.sticker_set_title}</a>"  # noqa: E501
+            )
+
+        if progress.failed:
+            text += f"\n\n{progress.failed} stickers could not be added."
+
+        self.completed += 1
+        await self._report(bot=bot, progress=progress, text=text)
+
+    async def _report(
+        self: "StickerSetCloner", bot: Bot, progress: CloneProgress, text: str
+    ) -> None:
+        try:
+            await bot.edit_message_text(
+                text=text,
+                chat_id=progress.chat_id,
+                message_id=progress.progress_message_id,
+                parse_mode="HTML",
+            )
+        except TelegramBadRequest as telegram_bad_request:
+            logging.warning(
+                "Can't report clone progress: %s", telegram_bad_request.message
+            )
+
+    async def close(self: "StickerSetCloner") -> None:
+        clone_tasks = list(self._tasks.values())
+
+        for clone_task in clone_tasks:
+            clone_task.cancel()
+
+        await asyncio.gather(*clone_tasks, return_exceptions=True)
+
+    def stats(self: "StickerSetCloner") -> StickerSetClonerStats:
+        return StickerSetClonerStats(
+            running=len(self._tasks),
+            started=self.started,
+            resumed=self.resumed,
+            completed=self.completed,
+            added=self.added,
+            failed=self.failed,
+        )
@@ -0,0 +1,109 @@
+from time import monotonic
+from typing import Any, TypedDict
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+
+class DatabasePoolStats(TypedDict):
+    size: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    overflow_connects: int
+    timeouts: int
+    connects: int
+    invalidations: int
+    total_checkout_wait_seconds: float
+    max_checkout_wait_seconds: float
+
+
+class MonitoredAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    def __init__(
+        self: "MonitoredAsyncAdaptedQueuePool", *args: Any, **kwargs: Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+
+        self.checkouts = 0
+        self.overflow_connects = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.total_checkout_wait_seconds = 0.0
+        self.max_checkout_wait_seconds = 0.0
+
+        event.listen(self, "connect", self._on_connect)
+        event.listen(self, "checkout", self._on_checkout)
+        event.listen(self, "invalidate", self._on_invalidate)
+
+    def _on_connect(self: "MonitoredAsyncAdaptedQueuePool", *_: Any) -> None:
+        self.connects += 1
+
+        if self.overflow() > 0:
+            self.overflow_connects += 1
+
+    def _on_checkout(self: "MonitoredAsyncAdaptedQueuePool", *_: Any) -> None:
+        self.checkouts += 1
+
+    def _on_invalidate(self: "MonitoredAsyncAdaptedQueuePool", *_: Any) -> None:
+        self.invalidations += 1
+
+    def connect(self: "MonitoredAsyncAdaptedQueuePool") -> PoolProxiedConnection:
+        started_at = monotonic()
+
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            checkout_wait_seconds = monotonic() - started_at
+            self.total_checkout_wait_seconds += checkout_wait_seconds
+            self.max_checkout_wait_seconds = max(
+                self.max_checkout_wait_seconds, checkout_wait_seconds
+            )
+
+    def stats(self: "MonitoredAsyncAdaptedQueuePool") -> DatabasePoolStats:
+        return DatabasePoolStats(
+            size=self.size(),
+            checked_out=self.checkedout(),
+            overflow=max(self.overflow(), 0),
+            checkouts=self.checkouts,
+            overflow_connects=self.overflow_connects,
+            timeouts=self.timeouts,
+            connects=self.connects,
+            invalidations=self.invalidations,
+            total_checkout_wait_seconds=self.total_checkout_wait_seconds,
+            max_checkout_wait_seconds=self.max_checkout_wait_seconds,
+        )
+
+
+def create_database_engine(  # noqa: CFQ002
+    url: str,
+    pool_size: int,
+    max_overflow: int,
+    pool_timeout: float,
+    pool_recycle: float,
+    pool_pre_ping: bool,
+    statement_cache_size: int,
+) -> AsyncEngine:
+    return create_async_engine(
+        url=url,
+        poolclass=MonitoredAsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=int(pool_recycle),
+        pool_pre_ping=pool_pre_ping,
+        connect_args={"prepared_statement_cache_size": statement_cache_size},
+    )
+
+
+def get_database_pool_stats(async_engine: AsyncEngine) -> DatabasePoolStats | None:
+    pool = async_engine.pool
+
+    if not isinstance(pool, MonitoredAsyncAdaptedQueuePool):
+        return None
+
+    return pool.stats()
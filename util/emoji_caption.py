@@ -0,0 +1,109 @@
+import re
+from collections.abc import Iterator
+from functools import cache
+from itertools import islice
+from typing import Any
+
+MAX_STICKER_EMOJIS = 20
+MAX_SCANNED_EMOJIS = 100
+
+EmojiTrie = dict[str, Any]
+
+
+def build_emoji_trie(emojis: list[str]) -> EmojiTrie:
+    trie: EmojiTrie = {}
+
+    for emoji in emojis:
+        node = trie
+
+        for char in emoji:
+            node = node.setdefault(char, {})
+
+        node[""] = {}
+
+    return trie
+
+
+def build_emoji_trie_pattern(trie: EmojiTrie) -> str:
+    branches = [
+        re.escape(char) + build_emoji_trie_pattern(trie=child)
+        for char, child in sorted(trie.items())
+        if char
+    ]
+
+    if not branches:
+        return ""
+
+    pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+    if "" in trie:
+        return f"(?:{pattern})?"
+
+    return pattern
+
+
+def build_char_class_pattern(chars: list[str]) -> str:
+    ranges: list[list[int]] = []
+
+    for code_point in sorted(map(ord, chars)):
+        if ranges and code_point == ranges[-1][1] + 1:
+            ranges[-1][1] = code_point
+        else:
+            ranges.append([code_point, code_point])
+
+    char_ranges = "".join(
+        re.escape(chr(first))
+        if first == last
+        else f"{re.escape(chr(first))}-{re.escape(chr(last))}"
+        for first, last in ranges
+    )
+    return f"[{char_ranges}]"
+
+
+@cache
+def get_emoji_patterns() -> tuple[re.Pattern[str], dict[str, re.Pattern[str]]]:
+    from emoji import EMOJI_DATA
+
+    trie = build_emoji_trie(emojis=list(EMOJI_DATA))
+    start_pattern = re.compile(
+        build_char_class_pattern(chars=[char for char in trie if char])
+    )
+    tail_patterns = {
+        char: re.compile(build_emoji_trie_pattern(trie=child))
+        for char, child in trie.items()
+    }
+
+    return start_pattern, tail_patterns
+
+
+def iter_emojis(text: str) -> Iterator[str]:
+    start_pattern, tail_patterns = get_emoji_patterns()
+    position = 0
+
+    while start_match := start_pattern.search(text, position):
+        start = start_match.start()
+        tail_match = tail_patterns[text[start]].match(text, start + 1)
+
+        if not tail_match:
+            position = start + 1
+            continue
+
+        position = tail_match.end()
+        yield text[start:position]
+
+
+def get_first_emoji(text: str) -> str | None:
+    return next(iter_emojis(text=text), None)
+
+
+def get_emojis(text: str, limit: int = MAX_STICKER_EMOJIS) -> list[str]:
+    emojis: list[str] = []
+
+    for emoji in islice(iter_emojis(text=text), MAX_SCANNED_EMOJIS):
+        if emoji not in emojis:
+            emojis.append(emoji)
+
+            if len(emojis) >= limit:
+                break
+
+    return emojis
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import perf_counter
+from typing import Any, TypedDict, TypeVar
+
+from settings_reader import ImageExecutorType
+from util.metrics import image_processing_duration
+from util.tracing import tracer
+
+T = TypeVar("T")
+
+
+class ImageExecutorBusyError(Exception):
+    pass
+
+
+class ImageExecutorStats(TypedDict):
+    executor_type: str
+    workers: int
+    queue_size: int
+    pending: int
+    completed: int
+    rejected: int
+    failed: int
+    total_wait_seconds: float
+    total_run_seconds: float
+    max_run_seconds: float
+
+
+def timed_call(func: Callable[..., T], *args: Any) -> tuple[T, float]:
+    started_at = perf_counter()
+    result = func(*args)
+    return result, perf_counter() - started_at
+
+
+def create_executor(executor_type: ImageExecutorType, workers: int) -> Executor:
+    if executor_type == ImageExecutorType.PROCESS:
+        try:
+            return ProcessPoolExecutor(max_workers=workers)
+        except (OSError, NotImplementedError, ImportError) as exception:
+            logging.warning(
+                "Process pool is not available, falling back to threads: %s",
+                exception,
+            )
+
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image")
+
+
+class ImageExecutor:
+    def __init__(
+        self: "ImageExecutor",
+        executor_type: ImageExecutorType,
+        workers: int,
+        queue_size: int,
+    ) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = create_executor(executor_type=executor_type, workers=workers)
+
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+    @property
+    def executor_type(self: "ImageExecutor") -> ImageExecutorType:
+        if isinstance(self._executor, ProcessPoolExecutor):
+            return ImageExecutorType.PROCESS
+
+        return ImageExecutorType.THREAD
+
+    @property
+    def capacity(self: "ImageExecutor") -> int:
+        return self.workers + self.queue_size
+
+    async def run(self: "ImageExecutor", func: Callable[..., T], *args: Any) -> T:
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise ImageExecutorBusyError(
+                f"Image executor is full ({self.pending} jobs pending)"
+            )
+
+        self.pending += 1
+        submitted_at = perf_counter()
+        with tracer.span("image", func=getattr(func, "__name__", str(func))) as span:
+            try:
+                result, run_seconds = await self._submit(func, *args)
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.pending -= 1
+
+            total_seconds = perf_counter() - submitted_at
+            wait_seconds = max(total_seconds - run_seconds, 0.0)
+
+            if span:
+                span.set_attribute("run_seconds", run_seconds)
+                span.set_attribute("wait_seconds", wait_seconds)
+
+        self.completed += 1
+        self.total_wait_seconds += wait_seconds
+        self.total_run_seconds += run_seconds
+        self.max_run_seconds = max(self.max_run_seconds, run_seconds)
+        image_processing_duration.observe(run_seconds)
+
+        logging.debug(
+            "Image job %s took %.3fs (waited %.3fs)",
+            getattr(func, "__name__", func),
+            run_seconds,
+            wait_seconds,
+        )
+
+        return result
+
+    async def _submit(
+        self: "ImageExecutor", func: Callable[..., T], *args: Any
+    ) -> tuple[T, float]:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, timed_call, func, *args)
+        except BrokenProcessPool:
+            logging.error("Process pool is broken, falling back to threads")
+            self._executor.shutdown(wait=False)
+            self._executor = create_executor(
+                executor_type=ImageExecutorType.THREAD, workers=self.workers
+            )
+            return await loop.run_in_executor(self._executor, timed_call, func, *args)
+
+    async def warm_up(self: "ImageExecutor", func: Callable[[], Any]) -> None:
+        await asyncio.gather(*[self._submit(func) for _ in range(self.workers)])
+
+    def stats(self: "ImageExecutor") -> ImageExecutorStats:
+        return ImageExecutorStats(
+            executor_type=self.executor_type.value,
+            workers=self.workers,
+            queue_size=self.queue_size,
+            pending=self.pending,
+            completed=self.completed,
+            rejected=self.rejected,
+            failed=self.failed,
+            total_wait_seconds=self.total_wait_seconds,
+            total_run_seconds=self.total_run_seconds,
+            max_run_seconds=self.max_run_seconds,
+        )
+
+    def shutdown(self: "ImageExecutor") -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
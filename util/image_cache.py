@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+import threading
+from hashlib import sha256
+from tempfile import mkstemp
+from pathlib import Path
+from typing import TypedDict
+
+from util.cache import BytesCache
+
+
+class ImageCacheStats(TypedDict):
+    hits: int
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    hit_ratio: float
+    bytes_saved: int
+    memory_bytes: int
+    disk_bytes: int
+
+
+class DiskCache:
+    def __init__(self: "DiskCache", path: Path, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.current_bytes = sum(
+            entry.stat().st_size for entry in self._get_entry_paths()
+        )
+
+    def _get_entry_paths(self: "DiskCache") -> list[Path]:
+        return [
+            entry
+            for entry in self.path.iterdir()
+            if entry.is_file() and entry.suffix != ".tmp"
+        ]
+
+    def _get_entry_path(self: "DiskCache", key: str) -> Path:
+        return self.path / sha256(key.encode()).hexdigest()
+
+    def get(self: "DiskCache", key: str) -> bytes | None:
+        entry_path = self._get_entry_path(key=key)
+
+        try:
+            value = entry_path.read_bytes()
+            os.utime(entry_path)
+        except FileNotFoundError:
+            return None
+
+        return value
+
+    def set(self: "DiskCache", key: str, value: bytes) -> None:  # noqa: A003
+        if len(value) > self.max_bytes:
+            return
+
+        entry_path = self._get_entry_path(key=key)
+
+        file_descriptor, temporary_path = mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(file_descriptor, "wb") as temporary_file:
+            temporary_file.write(value)
+
+        with self.lock:
+            previous_size = entry_path.stat().st_size if entry_path.exists() else 0
+            os.replace(temporary_path, entry_path)
+
+            self.current_bytes += len(value) - previous_size
+
+            if self.current_bytes > self.max_bytes:
+                self._evict()
+
+    def evict(self: "DiskCache") -> None:
+        with self.lock:
+            self._evict()
+
+    def _evict(self: "DiskCache") -> None:
+        entries = [(entry.stat(), entry) for entry in self._get_entry_paths()]
+        self.current_bytes = sum(entry_stat.st_size for entry_stat, _ in entries)
+
+        for entry_stat, entry in sorted(entries, key=lambda item: item[0].st_mtime):
+            if self.current_bytes <= self.max_bytes:
+                break
+
+            entry.unlink(missing_ok=True)
+            self.current_bytes -= entry_stat.st_size
+
+
+class ProcessedImageCache:
+    def __init__(
+        self: "ProcessedImageCache",
+        memory_max_bytes: int,
+        disk_path: str | None,
+        disk_max_bytes: int,
+    ) -> None:
+        self.memory = BytesCache[str](max_bytes=memory_max_bytes)
+        self.disk = (
+            DiskCache(path=Path(disk_path), max_bytes=disk_max_bytes)
+            if disk_path
+            else None
+        )
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    async def get(
+        self: "ProcessedImageCache", key: str, source_size: int | None = None
+    ) -> bytes | None:
+        value = self.memory.get(key)
+
+        if value is not None:
+            self.memory_hits += 1
+        elif self.disk:
+            value = await asyncio.to_thread(self.disk.get, key)
+
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.set(key, value)
+
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.bytes_saved += source_size or len(value)
+        return value
+
+    async def set(  # noqa: A003
+        self: "ProcessedImageCache", key: str, value: bytes
+    ) -> None:
+        self.memory.set(key, value)
+
+        if not self.disk:
+            return
+
+        try:
+            await asyncio.to_thread(self.disk.set, key, value)
+        except OSError as exception:
+            logging.warning("Can't write image to disk cache: %s", exception)
+
+    @property
+    def hits(self: "ProcessedImageCache") -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_ratio(self: "ProcessedImageCache") -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self: "ProcessedImageCache") -> ImageCacheStats:
+        return ImageCacheStats(
+            hits=self.hits,
+            memory_hits=self.memory_hits,
+            disk_hits=self.disk_hits,
+            misses=self.misses,
+            hit_ratio=self.hit_ratio,
+            bytes_saved=self.bytes_saved,
+            memory_bytes=self.memory.current_bytes,
+            disk_bytes=self.disk.current_bytes if self.disk else 0,
+        )
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import TypedDict
+
+from aiogram import Bot
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+
+class UpdateShedError(Exception):
+    pass
+
+
+class UpdateExecutorStats(TypedDict):
+    in_flight: int
+    queued: int
+    users: int
+    completed: int
+    shed: int
+    total_queue_wait_seconds: float
+    max_queue_wait_seconds: float
+
+
+class AdvisoryLocksStats(TypedDict):
+    held: int
+    acquired: int
+    contended: int
+    connects: int
+
+
+@dataclass
+class UserLane:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    pending: int = 0
+
+
+class UpdateExecutor(BaseEventIsolation):
+    def __init__(
+        self: "UpdateExecutor", max_concurrency: int, max_pending_per_user: int
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_pending_per_user = max_pending_per_user
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lanes: dict[tuple[int, int], UserLane] = {}
+
+        self.in_flight = 0
+        self.pending = 0
+        self.completed = 0
+        self.shed = 0
+        self.total_queue_wait_seconds = 0.0
+        self.max_queue_wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def lock(
+        self: "UpdateExecutor", bot: Bot, key: StorageKey
+    ) -> AsyncGenerator[None, None]:
+        lane = self._lanes.get((key.bot_id, key.user_id))
+
+        if lane and lane.pending >= self.max_pending_per_user:
+            self.shed += 1
+            raise UpdateShedError(
+                f"User {key.user_id} has {lane.pending} updates pending"
+            )
+
+        async with self.lock_user(bot_id=key.bot_id, user_id=key.user_id):
+            yield
+
+    @asynccontextmanager
+    async def lock_user(
+        self: "UpdateExecutor", bot_id: int, user_id: int
+    ) -> AsyncGenerator[None, None]:
+        lane_key = (bot_id, user_id)
+        lane = self._lanes.setdefault(lane_key, UserLane())
+
+        lane.pending += 1
+        self.pending += 1
+        queued_at = monotonic()
+
+        try:
+            async with lane.lock, self._hold_user(user_id=user_id), self._semaphore:
+                queue_wait_seconds = monotonic() - queued_at
+                self.total_queue_wait_seconds += queue_wait_seconds
+                self.max_queue_wait_seconds = max(
+                    self.max_queue_wait_seconds, queue_wait_seconds
+                )
+
+                self.in_flight += 1
+                try:
+                    yield
+                finally:
+                    self.in_flight -= 1
+                    self.completed += 1
+        finally:
+            lane.pending -= 1
+            self.pending -= 1
+
+            if not lane.pending:
+                self._lanes.pop(lane_key, None)
+
+    @asynccontextmanager
+    async def _hold_user(
+        self: "UpdateExecutor", user_id: int
+    ) -> AsyncGenerator[None, None]:
+        yield
+
+    @property
+    def queued(self: "UpdateExecutor") -> int:
+        return self.pending - self.in_flight
+
+    def stats(self: "UpdateExecutor") -> UpdateExecutorStats:
+        return UpdateExecutorStats(
+            in_flight=self.in_flight,
+            queued=self.queued,
+            users=len(self._lanes),
+            completed=self.completed,
+            shed=self.shed,
+            total_queue_wait_seconds=self.total_queue_wait_seconds,
+            max_queue_wait_seconds=self.max_queue_wait_seconds,
+        )
+
+    async def close(self: "UpdateExecutor") -> None:
+        pass
+
+
+class AdvisoryLocks:
+    def __init__(
+        self: "AdvisoryLocks",
+        async_engine: AsyncEngine,
+        retry_delay: float = 0.01,
+        max_retry_delay: float = 0.2,
+    ) -> None:
+        self.async_engine = create_async_engine(
+            async_engine.url, poolclass=NullPool, isolation_level="AUTOCOMMIT"
+        )
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self._connection: AsyncConnection | None = None
+        self._connection_lock = asyncio.Lock()
+
+        self.held = 0
+        self.acquired = 0
+        self.contended = 0
+        self.connects = 0
+
+    async def _execute(self: "AdvisoryLocks", statement: str, key: int) -> bool:
+        async with self._connection_lock:
+            if self._connection is None:
+                self._connection = await self.async_engine.connect()
+                self.connects += 1
+
+            try:
+                result = await self._connection.execute(text(statement), {"key": key})
+            except DBAPIError:
+                connection, self._connection = self._connection, None
+                await connection.invalidate()
+
+                if self.held:
+                    logging.error(
+                        "Lost the advisory lock connection with %s locks held",
+                        self.held,
+                    )
+
+                raise
+
+            return bool(result.scalar())
+
+    async def _try_lock(self: "AdvisoryLocks", key: int) -> bool:
+        try_lock = asyncio.ensure_future(
+            self._execute("SELECT pg_try_advisory_lock(:key)", key)
+        )
+
+        try:
+            return await asyncio.shield(try_lock)
+        except asyncio.CancelledError:
+            if await try_lock:
+                await self._unlock(key=key)
+
+            raise
+
+    async def _unlock(self: "AdvisoryLocks", key: int) -> None:
+        try:
+            await asyncio.shield(self._execute("SELECT pg_advisory_unlock(:key)", key))
+        except DBAPIError as exception:
+            logging.error("Can't release advisory lock %s: %s", key, exception)
+
+    @asynccontextmanager
+    async def hold(self: "AdvisoryLocks", key: int) -> AsyncGenerator[None, None]:
+        retry_delay = self.retry_delay
+
+        while not await self._try_lock(key=key):
+            self.contended += 1
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, self.max_retry_delay)
+
+        self.acquired += 1
+        self.held += 1
+
+        try:
+            yield
+        finally:
+            self.held -= 1
+            await self._unlock(key=key)
+
+    async def close(self: "AdvisoryLocks") -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+        await self.async_engine.dispose()
+
+    def stats(self: "AdvisoryLocks") -> AdvisoryLocksStats:
+        return AdvisoryLocksStats(
+            held=self.held,
+            acquired=self.acquired,
+            contended=self.contended,
+            connects=self.connects,
+        )
+
+
+class AdvisoryLockUpdateExecutor(UpdateExecutor):
+    def __init__(
+        self: "AdvisoryLockUpdateExecutor",
+        advisory_locks: AdvisoryLocks,
+        max_concurrency: int,
+        max_pending_per_user: int,
+    ) -> None:
+        super().__init__(
+            max_concurrency=max_concurrency,
+            max_pending_per_user=max_pending_per_user,
+        )
+        self.advisory_locks = advisory_locks
+
+    @asynccontextmanager
+    async def _hold_user(
+        self: "AdvisoryLockUpdateExecutor", user_id: int
+    ) -> AsyncGenerator[None, None]:
+        async with self.advisory_locks.hold(key=user_id):
+            yield
@@ -0,0 +1,278 @@
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable, Mapping
+from functools import wraps
+from time import monotonic
+from typing import Any, ParamSpec, TypeVar, TYPE_CHECKING
+
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import TelegramMethod, Response
+from aiogram.methods.base import TelegramType
+from aiogram.types import BufferedInputFile, Message
+
+from util.tracing import tracer
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+METRIC_PREFIX = "sutekkapakku"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = tuple[str, ...]
+
+
+def format_labels(label_names: tuple[str, ...], label_values: LabelValues) -> str:
+    if not label_names:
+        return ""
+
+    labels = ",".join(
+        f'{name}="{value}"' for name, value in zip(label_names, label_values)
+    )
+    return f"{{{labels}}}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(
+        self: "Counter",
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+    ) -> None:
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.documentation = documentation
+        self.label_names = label_names
+
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self: "Counter", amount: float = 1.0, **labels: str) -> None:
+        label_values = tuple(labels[name] for name in self.label_names)
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def collect(self: "Counter") -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+
+        for label_values, value in sorted(self._values.items()):
+            labels = format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}{labels} {format_value(value)}")
+
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self: "Histogram",
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = (*buckets, float("inf"))
+
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: dict[LabelValues, float] = {}
+
+    def observe(self: "Histogram", value: float, **labels: str) -> None:
+        label_values = tuple(labels[name] for name in self.label_names)
+        counts = self._counts.setdefault(label_values, [0] * len(self.buckets))
+
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[label_values] = self._sums.get(label_values, 0.0) + value
+
+    def collect(self: "Histogram") -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+
+        for label_values, counts in sorted(self._counts.items()):
+            cumulative_count = 0
+
+            for bucket, count in zip(self.buckets, counts):
+                cumulative_count += count
+                labels = format_labels(
+                    (*self.label_names, "le"), (*label_values, format_value(bucket))
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative_count}")
+
+            labels = format_labels(self.label_names, label_values)
+            lines.append(
+                f"{self.name}_sum{labels} {format_value(self._sums[label_values])}"
+            )
+            lines.append(f"{self.name}_count{labels} {cumulative_count}")
+
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self: "MetricsRegistry") -> None:
+        self._metrics: list[Counter | Histogram] = []
+        self._stats: dict[str, Callable[[], Mapping[str, Any] | None]] = {}
+
+    def counter(
+        self: "MetricsRegistry",
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+    ) -> Counter:
+        counter = Counter(
+            name=name, documentation=documentation, label_names=label_names
+        )
+        self._metrics.append(counter)
+        return counter
+
+    def histogram(
+        self: "MetricsRegistry",
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        histogram = Histogram(
+            name=name,
+            documentation=documentation,
+            label_names=label_names,
+            buckets=buckets,
+        )
+        self._metrics.append(histogram)
+        return histogram
+
+    def register_stats(
+        self: "MetricsRegistry",
+        name: str,
+        get_stats: Callable[[], Mapping[str, Any] | None],
+    ) -> None:
+        self._stats[name] = get_stats
+
+    def _collect_stats(self: "MetricsRegistry") -> list[str]:
+        lines: list[str] = []
+
+        for name, get_stats in self._stats.items():
+            for key, value in (get_stats() or {}).items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+
+                gauge_name = f"{METRIC_PREFIX}_{name}_{key}"
+                lines.append(f"# TYPE {gauge_name} gauge")
+                lines.append(f"{gauge_name} {format_value(value)}")
+
+        return lines
+
+    def render(self: "MetricsRegistry") -> str:
+        lines: list[str] = []
+
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+
+        lines.extend(self._collect_stats())
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+handler_duration = metrics_registry.histogram(
+    "handler_duration_seconds", "Message handling time per router.", ("router",)
+)
+query_duration = metrics_registry.histogram(
+    "query_duration_seconds", "Database query helper time.", ("query",)
+)
+telegram_request_duration = metrics_registry.histogram(
+    "telegram_request_duration_seconds", "Telegram Bot API call time.", ("method",)
+)
+telegram_request_errors = metrics_registry.counter(
+    "telegram_request_errors_total",
+    "Failed Telegram Bot API calls.",
+    ("method", "error"),
+)
+image_processing_duration = metrics_registry.histogram(
+    "image_processing_seconds", "Picture resize time in the image executor."
+)
+downloaded_bytes = metrics_registry.counter(
+    "downloaded_bytes_total", "Bytes downloaded from Telegram."
+)
+uploaded_bytes = metrics_registry.counter(
+    "uploaded_bytes_total", "Bytes uploaded to Telegram."
+)
+stickers_added = metrics_registry.counter(
+    "stickers_added_total", "Stickers added to packs.", ("sticker_set_type",)
+)
+stickers_removed = metrics_registry.counter(
+    "stickers_removed_total", "Stickers removed from packs.", ("sticker_set_type",)
+)
+sticker_sets_created = metrics_registry.counter(
+    "sticker_sets_created_total", "Sticker packs created.", ("sticker_set_type",)
+)
+
+
+def observe_query(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+    @wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        started_at = monotonic()
+
+        try:
+            with tracer.span("query", query=func.__name__):
+                return await func(*args, **kwargs)
+        finally:
+            query_duration.observe(monotonic() - started_at, query=func.__name__)
+
+    return wrapper
+
+
+async def observe_handler_duration(
+    handler: Callable[[Message, dict[str, Any]], Awaitable[Any]],
+    message: Message,
+    data: dict[str, Any],
+) -> Any:
+    started_at = monotonic()
+
+    try:
+        return await handler(message, data)
+    finally:
+        handler_duration.observe(
+            monotonic() - started_at, router=data["event_router"].name
+        )
+
+
+class TelegramRequestMetrics(BaseRequestMiddleware):
+    async def __call__(
+        self: "TelegramRequestMetrics",
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        method_name = type(method).__name__
+
+        for value in method.__dict__.values():
+            if isinstance(value, BufferedInputFile):
+                uploaded_bytes.inc(len(value.data))
+
+        started_at = monotonic()
+
+        try:
+            return await make_request(bot, method)
+        except Exception as exception:
+            telegram_request_errors.inc(
+                method=method_name, error=type(exception).__name__
+            )
+            raise
+        finally:
+            telegram_request_duration.observe(
+                monotonic() - started_at, method=method_name
+            )
@@ -2,17 +2,16 @@ import logging
 from collections.abc import Awaitable, Callable
 from typing import Any
 
-from aiogram.types import Message
-from emoji import distinct_emoji_list
+from aiogram.types import Message, Update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from model.models import UserModel, StickerSetModel
-from util.photo import get_largest_picture
-from util.query.sticker_set import (
-    get_sticker_set_type,
-    get_sticker_set_for_user_by_type,
-)
-from util.query.user import get_user_by_telegram_id
+from util.emoji_caption import get_emojis
+from util.photo import get_suitable_picture
+from util.query.sticker_set import get_sticker_set_type
+from util.query.update import is_update_processed
+from util.query.user import get_user_with_sticker_set_by_telegram_id
+from util.webhook import UpdateAcknowledgement
 
 
 async def get_async_database_session(
@@ -21,10 +20,11 @@ async def get_async_database_session(
     data: dict[str, Any],
 ) -> Any:
     try:
-        async with AsyncSession(bind=data["async_engine"]) as async_session:
-            async with async_session.begin():
-                data["async_session"] = async_session
-                return await handler(message, data)
+        async with AsyncSession(
+            bind=data["async_engine"], expire_on_commit=False
+        ) as async_session:
+            data["async_session"] = async_session
+            return await handler(message, data)
     except Exception as exception:
         logging.error("Error: %s", exception)  # noqa: G200
         await message.reply("An error occurred. Please try again.")
@@ -61,34 +61,32 @@ async def get_user_sticker_set_async_session(  # noqa: CFQ004
     if not message.sticker and not message.photo:
         return None
 
-    async with AsyncSession(bind=data["async_engine"]) as async_session:
+    sticker_set_type = get_sticker_set_type(message=message)
+
+    async with AsyncSession(
+        bind=data["async_engine"], expire_on_commit=False
+    ) as async_session:
+        user: UserModel | None
+        sticker_set: StickerSetModel | None
         async with async_session.begin():
-            user: UserModel | None = await get_user_by_telegram_id(
-                async_session=async_session, telegram_id=message.from_user.id
+            user, sticker_set = await get_user_with_sticker_set_by_telegram_id(
+                async_session=async_session,
+                telegram_id=message.from_user.id,
+                sticker_set_type=sticker_set_type,
             )
 
-            if not user:
-                await message.reply(
-                    "You are not registered yet.\n" "Please use /start command.."
-                )
-                return None
-
-            sticker_set_type = get_sticker_set_type(message=message)
-
-            sticker_set: StickerSetModel | None = (
-                await get_sticker_set_for_user_by_type(
-                    async_session=async_session,
-                    user=user,
-                    sticker_set_type=sticker_set_type,
-                )
+        if not user:
+            await message.reply(
+                "You are not registered yet.\n" "Please use /start command.."
             )
+            return None
 
-            data["async_session"] = async_session
-            data["user"] = user
-            data["sticker_set_type"] = sticker_set_type
-            data["sticker_set"] = sticker_set
+        data["async_session"] = async_session
+        data["user"] = user
+        data["sticker_set_type"] = sticker_set_type
+        data["sticker_set"] = sticker_set
 
-            return await handler(message, data)
+        return await handler(message, data)
 
 
 async def filter_non_sticker(  # noqa: CFQ004
@@ -115,6 +113,10 @@ async def filter_non_sticker(  # noqa: CFQ004
         )
         return None
 
+    if message.sticker.type == "custom_emoji":
+        await message.reply("Custom emoji can't be added to a sticker pack 🥲")
+        return None
+
     data["message_sticker"] = message.sticker
     data["sticker_emoji"] = message.sticker.emoji
 
@@ -126,8 +128,9 @@ async def filter_no_emoji_caption(  # noqa: CFQ004
     message: Message,
     data: dict[str, Any],
 ) -> Any:
-    def get_emoji_list(text: str) -> list[str]:
-        return distinct_emoji_list(text)  # type: ignore
+    if not message.caption and message.media_group_id and data.get("sticker_batcher"):
+        data["emojis"] = None
+        return await handler(message, data)
 
     if not message.caption:
         await message.reply(
@@ -135,13 +138,13 @@ async def filter_no_emoji_caption(  # noqa: CFQ004
         )
         return None
 
-    emoji_list = get_emoji_list(text=message.caption)
+    emojis = get_emojis(text=message.caption)
 
-    if len(emoji_list) < 1:
+    if not emojis:
         await message.reply("Your caption does not contain an emoji 🥲")
         return None
 
-    data["emoji"] = emoji_list[0]
+    data["emojis"] = "".join(emojis)
 
     return await handler(message, data)
 
@@ -162,7 +165,42 @@ async def filter_non_photo(
         )
         return None
 
-    largest_photo = get_largest_picture(pictures=message.photo)
+    suitable_photo = get_suitable_picture(pictures=message.photo)
 
-    data["picture"] = largest_photo
+    data["picture"] = suitable_photo
     return await handler(message, data)
+
+
+async def skip_processed_update(
+    handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+    update: Update,
+    data: dict[str, Any],
+) -> Any:
+    update_acknowledgement: UpdateAcknowledgement = data.setdefault(
+        "update_acknowledgement",
+        UpdateAcknowledgement(update_id=update.update_id, pending=False),
+    )
+
+    async with AsyncSession(bind=data["async_engine"]) as async_session:
+        async with async_session.begin():
+            is_processed_update = await is_update_processed(
+                async_session=async_session, update_id=update.update_id
+            )
+
+            if is_processed_update:
+                await update_acknowledgement.complete(async_session=async_session)
+
+    if is_processed_update:
+        logging.info("Update %s was already processed, skipping", update.update_id)
+        return None
+
+    result = await handler(update, data)
+
+    if update_acknowledgement.deferred:
+        return result
+
+    async with AsyncSession(bind=data["async_engine"]) as async_session:
+        async with async_session.begin():
+            await update_acknowledgement.complete(async_session=async_session)
+
+    return result
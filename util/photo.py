@@ -1,44 +1,95 @@
 from io import BytesIO
 from typing import BinaryIO
 
-from PIL import Image  # type: ignore
 from aiogram import Bot
 from aiogram.types import PhotoSize, BufferedInputFile
 
+from util.executor import ImageExecutor
+from util.image_cache import ProcessedImageCache
+from util.metrics import downloaded_bytes
+from util.tracing import tracer
 
-def get_picture_bytes(
-    bytes_io: BytesIO, resized_picture: Image, filename: str
+STICKER_SIZE = 512
+STICKER_FORMAT = "JPEG"
+
+
+def get_resized_picture_size(width: int, height: int) -> tuple[int, int]:
+    ratio = width / height
+    if ratio > 1:
+        return STICKER_SIZE, int(STICKER_SIZE / ratio)
+
+    return int(STICKER_SIZE * ratio), STICKER_SIZE
+
+
+def preload_image_library() -> None:
+    from PIL import Image  # type: ignore
+
+    Image.preinit()
+
+
+def resize_picture(picture_bytes: bytes) -> bytes:
+    from PIL import Image
+
+    with BytesIO(picture_bytes) as input_io, BytesIO() as output_io:
+        with Image.open(input_io) as pil_image:
+            resized_picture_size = get_resized_picture_size(
+                width=pil_image.width, height=pil_image.height
+            )
+
+            pil_image.draft(pil_image.mode, resized_picture_size)
+            resized_picture = pil_image.resize(resized_picture_size)
+
+            resized_picture.save(output_io, format=STICKER_FORMAT)
+            return output_io.getvalue()
+
+
+def get_picture_cache_key(picture: PhotoSize) -> str:
+    return f"{picture.file_unique_id}:{STICKER_SIZE}:{STICKER_FORMAT}"
+
+
+async def get_picture_buffered_input(
+    bot: Bot,
+    picture: PhotoSize,
+    image_executor: ImageExecutor,
+    image_cache: ProcessedImageCache,
 ) -> BufferedInputFile:
-    resized_picture.save(bytes_io, format="JPEG")
-    picture_bytes = bytes_io.getvalue()
-    return BufferedInputFile(picture_bytes, filename=filename)
+    filename = f"{picture.file_unique_id}.png"
+    cache_key = get_picture_cache_key(picture=picture)
 
+    cached_picture_bytes = await image_cache.get(
+        cache_key, source_size=picture.file_size
+    )
 
-async def get_picture_buffered_input(bot: Bot, picture: PhotoSize) -> BufferedInputFile:
-    downloaded_image: BinaryIO | None = await bot.download(file=picture.file_id)
+    if cached_picture_bytes:
+        return BufferedInputFile(cached_picture_bytes, filename=filename)
+
+    with tracer.span("download", file_size=picture.file_size or 0):
+        downloaded_image: BinaryIO | None = await bot.download(file=picture.file_id)
 
     if not downloaded_image:
         raise ValueError("Can't download downloaded_image")
 
-    with BytesIO() as bytes_io:
-        with Image.open(downloaded_image) as pil_image:
-            ratio = pil_image.width / pil_image.height
-            filename = f"{picture.file_unique_id}.png"
-            if ratio > 1:
-                resized_picture = pil_image.resize((512, int(512 / ratio)))
-                return get_picture_bytes(
-                    bytes_io=bytes_io,
-                    resized_picture=resized_picture,
-                    filename=filename,
-                )
-
-            resized_picture = pil_image.resize((int(512 * ratio), 512))
-            return get_picture_bytes(
-                bytes_io=bytes_io,
-                resized_picture=resized_picture,
-                filename=filename,
-            )
+    downloaded_picture_bytes = downloaded_image.read()
+    downloaded_bytes.inc(len(downloaded_picture_bytes))
+
+    picture_bytes = await image_executor.run(resize_picture, downloaded_picture_bytes)
+    await image_cache.set(cache_key, picture_bytes)
+
+    return BufferedInputFile(picture_bytes, filename=filename)
 
 
 def get_largest_picture(pictures: list[PhotoSize]) -> PhotoSize:
     return max(pictures, key=lambda photo: photo.width * photo.height)
+
+
+def get_suitable_picture(pictures: list[PhotoSize]) -> PhotoSize:
+    adequate_pictures = [
+        picture
+        for picture in pictures
+        if max(picture.width, picture.height) >= STICKER_SIZE
+    ]
+
+    if not adequate_pictures:
+        return get_largest_picture(pictures=pictures)
+
+    return min(adequate_pictures, key=lambda photo: photo.width * photo.height)
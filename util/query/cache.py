@@ -0,0 +1,36 @@
+from typing import Any, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from model.models import Base, StickerSetType
+from util.cache import TTLCache
+
+ModelType = TypeVar("ModelType", bound=Base)
+
+user_cache: TTLCache[int, dict[str, Any]] = TTLCache(max_size=10_000, ttl=300.0)
+sticker_set_cache: TTLCache[tuple[int, StickerSetType], dict[str, Any]] = TTLCache(
+    max_size=10_000, ttl=300.0
+)
+
+
+def configure_query_caches(max_size: int, ttl: float, cache_sticker_sets: bool) -> None:
+    user_cache.max_size = max_size
+    user_cache.ttl = sticker_set_cache.ttl = ttl
+    sticker_set_cache.max_size = max_size if cache_sticker_sets else 0
+    sticker_set_cache.clear()
+
+
+def snapshot_model(instance: Base) -> dict[str, Any]:
+    return {
+        column_attribute.key: getattr(instance, column_attribute.key)
+        for column_attribute in instance.__mapper__.column_attrs
+    }
+
+
+async def restore_model(
+    async_session: AsyncSession, model: type[ModelType], values: dict[str, Any]
+) -> ModelType:
+    instance = model(**values)
+    make_transient_to_detached(instance)
+    return await async_session.merge(instance, load=False)
@@ -0,0 +1,156 @@
+from datetime import timedelta
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from model.models import CloneJobModel, StickerSetType
+from util.metrics import observe_query
+
+
+@observe_query
+async def get_unfinished_clone_job(
+    async_session: AsyncSession, user_id: int, source_name: str
+) -> CloneJobModel | None:
+    result = await async_session.execute(
+        select(CloneJobModel).where(
+            CloneJobModel.user_id == user_id,
+            CloneJobModel.source_name == source_name,
+            CloneJobModel.completed_at.is_(None),
+        )
+    )
+
+    return result.scalars().first()
+
+
+@observe_query
+async def get_claimable_clone_job_ids(async_session: AsyncSession) -> list[int]:
+    result = await async_session.execute(
+        select(CloneJobModel.id)
+        .where(
+            CloneJobModel.completed_at.is_(None),
+            or_(
+                CloneJobModel.locked_until.is_(None),
+                CloneJobModel.locked_until < func.now(),
+            ),
+        )
+        .order_by(CloneJobModel.id)
+    )
+
+    return list(result.scalars().all())
+
+
+@observe_query
+async def claim_clone_job(
+    async_session: AsyncSession, job_id: int, lease: timedelta, lock_token: str
+) -> CloneJobModel | None:
+    claimable_job_id = (
+        select(CloneJobModel.id)
+        .where(
+            CloneJobModel.id == job_id,
+            CloneJobModel.completed_at.is_(None),
+            or_(
+                CloneJobModel.locked_until.is_(None),
+                CloneJobModel.locked_until < func.now(),
+            ),
+        )
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+
+    result = await async_session.execute(
+        update(CloneJobModel)
+        .where(CloneJobModel.id == claimable_job_id)
+        .values(locked_until=func.now() + lease, locked_by=lock_token)
+        .returning(CloneJobModel)
+    )
+
+    return result.scalars().first()
+
+
+@observe_query
+async def checkpoint_clone_job(  # noqa: CFQ002
+    async_session: AsyncSession,
+    job_id: int,
+    lease: timedelta,
+    lock_token: str,
+    next_index: int,
+    added: int,
+    failed: int,
+) -> bool:
+    result = await async_session.execute(
+        update(CloneJobModel)
+        .where(CloneJobModel.id == job_id, CloneJobModel.locked_by == lock_token)
+        .values(
+            next_index=next_index,
+            added=added,
+            failed=failed,
+            locked_until=func.now() + lease,
+        )
+        .returning(CloneJobModel.id)
+    )
+
+    return result.scalar() is not None
+
+
+@observe_query
+async def complete_clone_job(
+    async_session: AsyncSession, job_id: int, lock_token: str
+) -> bool:
+    result = await async_session.execute(
+        update(CloneJobModel)
+        .where(CloneJobModel.id == job_id, CloneJobModel.locked_by == lock_token)
+        .values(completed_at=func.now(), locked_until=None, locked_by=None)
+        .returning(CloneJobModel.id)
+    )
+
+    return result.scalar() is not None
+
+
+@observe_query
+async def release_clone_job(
+    async_session: AsyncSession, job_id: int, lock_token: str
+) -> None:
+    await async_session.execute(
+        update(CloneJobModel)
+        .where(CloneJobModel.id == job_id, CloneJobModel.locked_by == lock_token)
+        .values(locked_until=None, locked_by=None)
+    )
+
+
+@observe_query
+async def get_clone_job(async_session: AsyncSession, job_id: int) -> CloneJobModel:
+    result = await async_session.execute(
+        select(CloneJobModel).where(CloneJobModel.id == job_id)
+    )
+
+    return result.scalars().one()
+
+
+@observe_query
+async def create_clone_job(  # noqa: CFQ002
+    async_session: AsyncSession,
+    user_id: int,
+    source_name: str,
+    sticker_set_type: StickerSetType,
+    telegram_user_username: str,
+    chat_id: int,
+    progress_message_id: int,
+    total: int,
+    lease: timedelta,
+    lock_token: str,
+) -> CloneJobModel:
+    clone_job = CloneJobModel(
+        user_id=user_id,
+        source_name=source_name,
+        sticker_set_type=sticker_set_type,
+        telegram_user_username=telegram_user_username,
+        chat_id=chat_id,
+        progress_message_id=progress_message_id,
+        total=total,
+        locked_until=func.now() + lease,
+        locked_by=lock_token,
+    )
+    async_session.add(clone_job)
+    await async_session.flush()
+
+    return clone_job
@@ -0,0 +1,105 @@
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from model.models import StickerModel, StickerSetModel, UserModel
+from util.metrics import observe_query
+
+
+@observe_query
+async def get_user_sticker_set_by_file_unique_id(
+    async_session: AsyncSession, user: UserModel, file_unique_id: str
+) -> StickerSetModel | None:
+    result = await async_session.execute(
+        select(StickerSetModel)
+        .join(StickerModel, StickerModel.sticker_set_id == StickerSetModel.id)
+        .where(
+            StickerSetModel.user_id == user.id,
+            StickerModel.file_unique_id == file_unique_id,
+        )
+        .limit(1)
+    )
+
+    return result.scalars().first()
+
+
+@observe_query
+async def get_user_file_unique_ids(
+    async_session: AsyncSession, user: UserModel, file_unique_ids: list[str]
+) -> set[str]:
+    result = await async_session.execute(
+        select(StickerModel.file_unique_id)
+        .join(StickerSetModel, StickerModel.sticker_set_id == StickerSetModel.id)
+        .where(
+            StickerSetModel.user_id == user.id,
+            StickerModel.file_unique_id.in_(file_unique_ids),
+        )
+    )
+
+    return set(result.scalars().all())
+
+
+@observe_query
+async def get_user_sticker_sets_with_stickers(
+    async_session: AsyncSession, user: UserModel
+) -> list[StickerSetModel]:
+    result = await async_session.execute(
+        select(StickerSetModel)
+        .where(StickerSetModel.user_id == user.id)
+        .options(selectinload(StickerSetModel.stickers))
+        .order_by(StickerSetModel.sticker_set_type, StickerSetModel.position)
+    )
+
+    return list(result.scalars().all())
+
+
+@observe_query
+async def create_sticker(
+    async_session: AsyncSession,
+    sticker_set: StickerSetModel,
+    file_unique_id: str,
+    emoji: str,
+    position: int,
+) -> None:
+    async_session.add(
+        StickerModel(
+            sticker_set_id=sticker_set.id,
+            file_unique_id=file_unique_id,
+            emoji=emoji,
+            position=position,
+        )
+    )
+
+
+@observe_query
+async def get_sticker_position(
+    async_session: AsyncSession, sticker_set: StickerSetModel, file_unique_id: str
+) -> int | None:
+    result = await async_session.execute(
+        select(StickerModel.position).where(
+            StickerModel.sticker_set_id == sticker_set.id,
+            StickerModel.file_unique_id == file_unique_id,
+        )
+    )
+
+    return result.scalars().first()
+
+
+@observe_query
+async def delete_sticker(
+    async_session: AsyncSession, sticker_set: StickerSetModel, position: int
+) -> None:
+    await async_session.execute(
+        delete(StickerModel).where(
+            StickerModel.sticker_set_id == sticker_set.id,
+            StickerModel.position == position,
+        )
+    )
+    await async_session.execute(
+        update(StickerModel)
+        .where(
+            StickerModel.sticker_set_id == sticker_set.id,
+            StickerModel.position > position,
+        )
+        .values(position=StickerModel.position - 1)
+    )
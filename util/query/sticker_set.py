@@ -1,8 +1,14 @@
-from aiogram.types import Message
-from sqlalchemy import select
+from aiogram.types import Message, StickerSet
+from sqlalchemy import select, update, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from model.models import StickerSetModel, StickerSetType, UserModel
+from model.models import StickerModel, StickerSetModel, StickerSetType, UserModel
+from util.metrics import observe_query
+from util.query.cache import sticker_set_cache, snapshot_model, restore_model
+
+MAX_REGULAR_STICKERS_PER_SET = 120
+MAX_ANIMATED_STICKERS_PER_SET = 50
 
 
 def get_sticker_set_type(message: Message) -> StickerSetType:  # noqa: CFQ004
@@ -21,31 +27,189 @@ def get_sticker_set_type(message: Message) -> StickerSetType:  # noqa: CFQ004
     raise ValueError("Message is not a sticker or a photo.")
 
 
+def get_sticker_set_type_from_sticker_set(sticker_set: StickerSet) -> StickerSetType:
+    if sticker_set.is_animated:
+        return StickerSetType.ANIMATED
+
+    if sticker_set.is_video:
+        return StickerSetType.VIDEO
+
+    return StickerSetType.REGULAR
+
+
+def get_sticker_set_limit(sticker_set_type: StickerSetType) -> int:
+    if sticker_set_type == StickerSetType.REGULAR:
+        return MAX_REGULAR_STICKERS_PER_SET
+
+    return MAX_ANIMATED_STICKERS_PER_SET
+
+
+def is_sticker_set_full(sticker_set: StickerSetModel) -> bool:
+    return sticker_set.sticker_count >= get_sticker_set_limit(
+        sticker_set_type=sticker_set.sticker_set_type
+    )
+
+
+@observe_query
 async def get_sticker_set_for_user_by_type(
     async_session: AsyncSession,
     user: UserModel,
     sticker_set_type: StickerSetType,
 ) -> StickerSetModel | None:
+    cached_sticker_set = sticker_set_cache.get((user.id, sticker_set_type))
+
+    if cached_sticker_set:
+        return await restore_model(
+            async_session=async_session,
+            model=StickerSetModel,
+            values=cached_sticker_set,
+        )
+
     result = await async_session.execute(
-        select(StickerSetModel).where(
-            StickerSetModel.user == user,
+        select(StickerSetModel)
+        .where(
+            StickerSetModel.user_id == user.id,
             StickerSetModel.sticker_set_type == sticker_set_type,
+            StickerSetModel.sticker_count
+            < get_sticker_set_limit(sticker_set_type=sticker_set_type),
+        )
+        .order_by(StickerSetModel.position)
+        .limit(1)
+    )
+
+    sticker_set = result.scalars().first()
+
+    if sticker_set:
+        sticker_set_cache.set((user.id, sticker_set_type), snapshot_model(sticker_set))
+
+    return sticker_set
+
+
+@observe_query
+async def get_user_sticker_set_by_name(
+    async_session: AsyncSession, user: UserModel, name: str
+) -> StickerSetModel | None:
+    result = await async_session.execute(
+        select(StickerSetModel).where(
+            StickerSetModel.user_id == user.id, StickerSetModel.name == name
         )
     )
 
     return result.scalars().first()
 
 
-async def create_sticker_set(
+@observe_query
+async def get_next_sticker_set_position(
+    async_session: AsyncSession, user: UserModel, sticker_set_type: StickerSetType
+) -> int:
+    await async_session.execute(
+        select(UserModel.id).where(UserModel.id == user.id).with_for_update()
+    )
+    result = await async_session.execute(
+        select(func.max(StickerSetModel.position)).where(
+            StickerSetModel.user_id == user.id,
+            StickerSetModel.sticker_set_type == sticker_set_type,
+        )
+    )
+
+    last_position: int | None = result.scalar()
+    return 0 if last_position is None else last_position + 1
+
+
+@observe_query
+async def create_sticker_set(  # noqa: CFQ002
     async_session: AsyncSession,
     user: UserModel,
     sticker_set_type: StickerSetType,
     name: str,
     title: str,
+    position: int,
+    sticker_count: int,
 ) -> StickerSetModel:
     sticker_set: StickerSetModel = StickerSetModel(
-        user=user, sticker_set_type=sticker_set_type, name=name, title=title
+        user=user,
+        sticker_set_type=sticker_set_type,
+        name=name,
+        title=title,
+        position=position,
+        sticker_count=sticker_count,
     )
     async_session.add(sticker_set)
+    await async_session.flush()
+    sticker_set_cache.invalidate((user.id, sticker_set_type))
 
     return sticker_set
+
+
+@observe_query
+async def delete_sticker_set(
+    async_session: AsyncSession, sticker_set: StickerSetModel
+) -> None:
+    await async_session.execute(
+        delete(StickerModel).where(StickerModel.sticker_set_id == sticker_set.id)
+    )
+    await async_session.execute(
+        delete(StickerSetModel).where(StickerSetModel.id == sticker_set.id)
+    )
+    sticker_set_cache.invalidate((sticker_set.user_id, sticker_set.sticker_set_type))
+
+
+@observe_query
+async def get_sticker_sets_without_sticker_count(
+    async_session: AsyncSession,
+) -> list[StickerSetModel]:
+    result = await async_session.execute(
+        select(StickerSetModel)
+        .where(StickerSetModel.sticker_count == 0)
+        .order_by(StickerSetModel.id)
+    )
+
+    return list(result.scalars().all())
+
+
+@observe_query
+async def backfill_sticker_count(
+    async_session: AsyncSession, sticker_set: StickerSetModel, sticker_count: int
+) -> bool:
+    result = await async_session.execute(
+        update(StickerSetModel)
+        .where(StickerSetModel.id == sticker_set.id, StickerSetModel.sticker_count == 0)
+        .values(sticker_count=sticker_count)
+        .returning(StickerSetModel.id)
+    )
+    sticker_set_cache.invalidate((sticker_set.user_id, sticker_set.sticker_set_type))
+
+    return result.scalar() is not None
+
+
+@observe_query
+async def update_sticker_count(
+    async_session: AsyncSession, sticker_set: StickerSetModel, delta: int
+) -> None:
+    result = await async_session.execute(
+        update(StickerSetModel)
+        .where(StickerSetModel.id == sticker_set.id)
+        .values(sticker_count=func.greatest(StickerSetModel.sticker_count + delta, 0))
+        .returning(StickerSetModel.sticker_count)
+    )
+    set_committed_value(  # type: ignore
+        sticker_set, "sticker_count", result.scalar_one()
+    )
+
+    cache_key = (sticker_set.user_id, sticker_set.sticker_set_type)
+
+    if delta < 0 or is_sticker_set_full(sticker_set=sticker_set):
+        sticker_set_cache.invalidate(cache_key)
+    else:
+        sticker_set_cache.set(cache_key, snapshot_model(sticker_set))
+
+
+async def mark_sticker_set_full(
+    async_session: AsyncSession, sticker_set: StickerSetModel
+) -> None:
+    await update_sticker_count(
+        async_session=async_session,
+        sticker_set=sticker_set,
+        delta=get_sticker_set_limit(sticker_set_type=sticker_set.sticker_set_type)
+        - sticker_set.sticker_count,
+    )
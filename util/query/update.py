@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from model.models import ProcessedUpdateModel, PendingUpdateModel
+from util.metrics import observe_query
+
+
+@observe_query
+async def is_update_processed(async_session: AsyncSession, update_id: int) -> bool:
+    result = await async_session.execute(
+        select(ProcessedUpdateModel.update_id).where(
+            ProcessedUpdateModel.update_id == update_id
+        )
+    )
+
+    return result.scalar() is not None
+
+
+@observe_query
+async def mark_update_as_processed(async_session: AsyncSession, update_id: int) -> bool:
+    result = await async_session.execute(
+        insert(ProcessedUpdateModel)  # type: ignore
+        .values(update_id=update_id)
+        .on_conflict_do_nothing(index_elements=[ProcessedUpdateModel.update_id])
+        .returning(ProcessedUpdateModel.update_id)
+    )
+
+    return result.scalar() is not None
+
+
+@observe_query
+async def delete_processed_updates_before(
+    async_session: AsyncSession, created_before: datetime
+) -> None:
+    await async_session.execute(
+        delete(ProcessedUpdateModel).where(
+            ProcessedUpdateModel.created_at < created_before
+        )
+    )
+
+
+@observe_query
+async def save_pending_update(
+    async_session: AsyncSession, update_id: int, payload: dict[str, Any]
+) -> bool:
+    result = await async_session.execute(
+        insert(PendingUpdateModel)  # type: ignore
+        .values(update_id=update_id, payload=payload)
+        .on_conflict_do_nothing(index_elements=[PendingUpdateModel.update_id])
+        .returning(PendingUpdateModel.update_id)
+    )
+
+    return result.scalar() is not None
+
+
+@observe_query
+async def delete_pending_update(async_session: AsyncSession, update_id: int) -> None:
+    await async_session.execute(
+        delete(PendingUpdateModel).where(PendingUpdateModel.update_id == update_id)
+    )
+
+
+@observe_query
+async def get_pending_updates(async_session: AsyncSession) -> list[dict[str, Any]]:
+    result = await async_session.execute(
+        select(PendingUpdateModel.payload).order_by(PendingUpdateModel.update_id)
+    )
+
+    return list(result.scalars().all())
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from model.models import StickerSetType, UploadJobModel, UploadJobSource
+from util.metrics import observe_query
+
+UPLOAD_JOB_CLAIM_LOCK_KEY = 0x75706C64
+
+
+@observe_query
+async def create_upload_job(  # noqa: CFQ002
+    async_session: AsyncSession,
+    idempotency_key: str,
+    user_id: int,
+    source: UploadJobSource,
+    payload: dict[str, Any],
+    sticker_set_type: StickerSetType,
+    emojis: str,
+    file_unique_id: str,
+    telegram_user_username: str,
+    chat_id: int,
+    message_id: int,
+) -> bool:
+    result = await async_session.execute(
+        insert(UploadJobModel)  # type: ignore
+        .values(
+            idempotency_key=idempotency_key,
+            user_id=user_id,
+            source=source,
+            payload=payload,
+            sticker_set_type=sticker_set_type,
+            emojis=emojis,
+            file_unique_id=file_unique_id,
+            telegram_user_username=telegram_user_username,
+            chat_id=chat_id,
+            message_id=message_id,
+        )
+        .on_conflict_do_nothing(index_elements=[UploadJobModel.idempotency_key])
+        .returning(UploadJobModel.id)
+    )
+
+    return result.scalar() is not None
+
+
+@observe_query
+async def claim_upload_job(
+    async_session: AsyncSession, lease: timedelta
+) -> UploadJobModel | None:
+    await async_session.execute(
+        select(func.pg_advisory_xact_lock(UPLOAD_JOB_CLAIM_LOCK_KEY, 0))
+    )
+
+    leased_user_ids = select(UploadJobModel.user_id).where(
+        UploadJobModel.completed_at.is_(None),
+        UploadJobModel.locked_until >= func.now(),
+    )
+    due_job_id = (
+        select(UploadJobModel.id)
+        .where(
+            UploadJobModel.completed_at.is_(None),
+            UploadJobModel.next_attempt_at <= func.now(),
+            or_(
+                UploadJobModel.locked_until.is_(None),
+                UploadJobModel.locked_until < func.now(),
+            ),
+            UploadJobModel.user_id.not_in(leased_user_ids),
+        )
+        .order_by(UploadJobModel.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+
+    result = await async_session.execute(
+        update(UploadJobModel)
+        .where(UploadJobModel.id == due_job_id)
+        .values(
+            locked_until=func.now() + lease,
+            attempts=UploadJobModel.attempts + 1,
+        )
+        .returning(UploadJobModel)
+    )
+
+    return result.scalars().first()
+
+
+@observe_query
+async def renew_upload_job_lease(
+    async_session: AsyncSession, job_id: int, attempts: int, lease: timedelta
+) -> bool:
+    result = await async_session.execute(
+        update(UploadJobModel)
+        .where(
+            UploadJobModel.id == job_id,
+            UploadJobModel.attempts == attempts,
+            UploadJobModel.completed_at.is_(None),
+        )
+        .values(locked_until=func.now() + lease)
+        .returning(UploadJobModel.id)
+    )
+
+    return result.scalar() is not None
+
+
+@observe_query
+async def complete_upload_job(
+    async_session: AsyncSession, job_id: int, attempts: int, error: str | None
+) -> bool:
+    result = await async_session.execute(
+        update(UploadJobModel)
+        .where(
+            UploadJobModel.id == job_id,
+            UploadJobModel.attempts == attempts,
+            UploadJobModel.completed_at.is_(None),
+        )
+        .values(completed_at=func.now(), locked_until=None, last_error=error)
+        .returning(UploadJobModel.id)
+    )
+
+    return result.scalar() is not None
+
+
+@observe_query
+async def reschedule_upload_job(  # noqa: CFQ002
+    async_session: AsyncSession,
+    job_id: int,
+    attempts: int,
+    delay: timedelta,
+    error: str,
+    refund_attempt: bool,
+) -> bool:
+    result = await async_session.execute(
+        update(UploadJobModel)
+        .where(
+            UploadJobModel.id == job_id,
+            UploadJobModel.attempts == attempts,
+            UploadJobModel.completed_at.is_(None),
+        )
+        .values(
+            next_attempt_at=func.now() + delay,
+            locked_until=None,
+            last_error=error,
+            attempts=attempts - 1 if refund_attempt else attempts,
+        )
+        .returning(UploadJobModel.id)
+    )
+
+    return result.scalar() is not None
+
+
+@observe_query
+async def delete_upload_jobs_completed_before(
+    async_session: AsyncSession, completed_before: datetime
+) -> None:
+    await async_session.execute(
+        delete(UploadJobModel).where(UploadJobModel.completed_at < completed_before)
+    )
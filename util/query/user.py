@@ -1,26 +1,103 @@
 from aiogram.types import User as TelegramUser
-from sqlalchemy import select
+from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from model.models import UserModel
+from model.models import UserModel, StickerSetModel, StickerSetType
+from util.metrics import observe_query
+from util.query.sticker_set import get_sticker_set_limit
+from util.query.cache import (
+    user_cache,
+    sticker_set_cache,
+    snapshot_model,
+    restore_model,
+)
 
 
+@observe_query
 async def get_user_by_telegram_id(
     async_session: AsyncSession, telegram_id: int
 ) -> UserModel | None:
+    cached_user = user_cache.get(telegram_id)
+
+    if cached_user:
+        return await restore_model(
+            async_session=async_session, model=UserModel, values=cached_user
+        )
+
     result = await async_session.execute(
-        select(UserModel).where(UserModel.telegram_id == str(telegram_id))
+        select(UserModel).where(UserModel.telegram_id == telegram_id)
     )
 
-    return result.scalars().first()
+    user = result.scalars().first()
+
+    if user:
+        user_cache.set(telegram_id, snapshot_model(user))
+
+    return user
+
+
+@observe_query
+async def get_user_with_sticker_set_by_telegram_id(
+    async_session: AsyncSession, telegram_id: int, sticker_set_type: StickerSetType
+) -> tuple[UserModel | None, StickerSetModel | None]:
+    cached_user = user_cache.get(telegram_id)
+    cached_sticker_set = (
+        sticker_set_cache.get((cached_user["id"], sticker_set_type))
+        if cached_user
+        else None
+    )
+
+    if cached_user and cached_sticker_set:
+        return (
+            await restore_model(
+                async_session=async_session, model=UserModel, values=cached_user
+            ),
+            await restore_model(
+                async_session=async_session,
+                model=StickerSetModel,
+                values=cached_sticker_set,
+            ),
+        )
+
+    result = await async_session.execute(
+        select(UserModel, StickerSetModel)
+        .outerjoin(
+            StickerSetModel,
+            and_(
+                StickerSetModel.user_id == UserModel.id,
+                StickerSetModel.sticker_set_type == sticker_set_type,
+                StickerSetModel.sticker_count
+                < get_sticker_set_limit(sticker_set_type=sticker_set_type),
+            ),
+        )
+        .where(UserModel.telegram_id == telegram_id)
+        .order_by(StickerSetModel.position)
+        .limit(1)
+    )
+
+    row = result.first()
+
+    if not row:
+        return None, None
+
+    user, sticker_set = row
+
+    user_cache.set(telegram_id, snapshot_model(user))
+
+    if sticker_set:
+        sticker_set_cache.set((user.id, sticker_set_type), snapshot_model(sticker_set))
+
+    return user, sticker_set
 
 
+@observe_query
 async def save_user_to_database(
     telegram_user: TelegramUser, async_session: AsyncSession
 ) -> None:
     user: UserModel = UserModel(
-        telegram_id=str(telegram_user.id),
+        telegram_id=telegram_user.id,
     )
     async_session.add(user)
+    user_cache.invalidate(telegram_user.id)
 
     return
@@ -0,0 +1,278 @@
+import asyncio
+import heapq
+import logging
+from enum import IntEnum
+from itertools import count
+from time import monotonic
+from typing import TypedDict, TYPE_CHECKING
+
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    TelegramMethod,
+    Response,
+    AddStickerToSet,
+    CreateNewStickerSet,
+    UploadStickerFile,
+    SendMessage,
+    EditMessageText,
+)
+from aiogram.methods.base import TelegramType
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+class RequestPriority(IntEnum):
+    REPLY = 0
+    DEFAULT = 1
+    UPLOAD = 2
+
+
+class RequestSchedulerStats(TypedDict):
+    requests: int
+    retries: int
+    queue_depth: int
+    max_queue_depth: int
+    total_wait_seconds: float
+    chat_buckets: int
+    paused_users: int
+
+
+def get_request_priority(method: TelegramMethod[TelegramType]) -> RequestPriority:
+    if isinstance(method, (SendMessage, EditMessageText)):
+        return RequestPriority.REPLY
+
+    if isinstance(method, (AddStickerToSet, CreateNewStickerSet, UploadStickerFile)):
+        return RequestPriority.UPLOAD
+
+    return RequestPriority.DEFAULT
+
+
+def get_request_chat_id(method: TelegramMethod[TelegramType]) -> int | str | None:
+    return getattr(method, "chat_id", None)
+
+
+def get_request_user_id(method: TelegramMethod[TelegramType]) -> int | None:
+    return getattr(method, "user_id", None)
+
+
+class TokenBucket:
+    def __init__(self: "TokenBucket", rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self: "TokenBucket") -> None:
+        now = monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def delay(self: "TokenBucket") -> float:
+        self._refill()
+        pause_delay = self.paused_until - self.updated_at
+
+        if self.tokens >= 1:
+            return max(pause_delay, 0.0)
+
+        return max(pause_delay, (1 - self.tokens) / self.rate)
+
+    def take(self: "TokenBucket") -> None:
+        self.tokens -= 1
+
+    def pause(self: "TokenBucket", seconds: float) -> None:
+        self.paused_until = max(self.paused_until, monotonic() + seconds)
+
+    @property
+    def is_idle(self: "TokenBucket") -> bool:
+        return self.delay() == 0 and self.tokens >= self.capacity
+
+
+class RequestScheduler(BaseRequestMiddleware):
+    def __init__(
+        self: "RequestScheduler",
+        global_rate: float,
+        chat_rate: float,
+        chat_burst: int,
+        max_retries: int,
+        max_chat_buckets: int = 10_000,
+    ) -> None:
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_chat_buckets = max_chat_buckets
+
+        self._global_bucket = TokenBucket(rate=global_rate, capacity=global_rate)
+        self._chat_buckets: dict[int | str, TokenBucket] = {}
+        self._user_paused_until: dict[int, float] = {}
+        self._queue: list[tuple[int, int]] = []
+        self._counter = count()
+        self._condition = asyncio.Condition()
+
+        self.requests = 0
+        self.retries = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+
+    @property
+    def queue_depth(self: "RequestScheduler") -> int:
+        return len(self._queue)
+
+    def _get_chat_bucket(self: "RequestScheduler", chat_id: int | str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+
+        if bucket is None:
+            if len(self._chat_buckets) >= self.max_chat_buckets:
+                self._chat_buckets = {
+                    key: value
+                    for key, value in self._chat_buckets.items()
+                    if not value.is_idle
+                }
+
+            bucket = TokenBucket(rate=self.chat_rate, capacity=self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+
+        return bucket
+
+    async def _acquire_chat(self: "RequestScheduler", chat_id: int | str) -> None:
+        bucket = self._get_chat_bucket(chat_id=chat_id)
+
+        while (delay := bucket.delay()) > 0:
+            await asyncio.sleep(delay)
+
+        bucket.take()
+
+    async def _wait_user(self: "RequestScheduler", user_id: int) -> None:
+        while (delay := self._user_paused_until.get(user_id, 0.0) - monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+        self._user_paused_until.pop(user_id, None)
+
+    async def _acquire_global(self: "RequestScheduler", priority: int) -> None:
+        entry = (priority, next(self._counter))
+
+        async with self._condition:
+            heapq.heappush(self._queue, entry)
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+            try:
+                while True:
+                    timeout: float | None = None
+
+                    if self._queue[0] == entry:
+                        timeout = self._global_bucket.delay()
+
+                        if timeout <= 0:
+                            heapq.heappop(self._queue)
+                            self._global_bucket.take()
+                            self._condition.notify_all()
+                            return
+
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._condition.notify_all()
+
+    async def acquire(
+        self: "RequestScheduler",
+        chat_id: int | str | None,
+        user_id: int | None,
+        priority: int,
+    ) -> None:
+        started_at = monotonic()
+
+        if chat_id is not None:
+            await self._acquire_chat(chat_id=chat_id)
+        elif user_id is not None:
+            await self._wait_user(user_id=user_id)
+
+        await self._acquire_global(priority=priority)
+
+        self.total_wait_seconds += monotonic() - started_at
+
+    def pause(
+        self: "RequestScheduler",
+        chat_id: int | str | None,
+        user_id: int | None,
+        seconds: float,
+    ) -> None:
+        if chat_id is not None:
+            self._get_chat_bucket(chat_id=chat_id).pause(seconds=seconds)
+            return
+
+        if user_id is not None:
+            now = monotonic()
+            self._user_paused_until = {
+                key: paused_until
+                for key, paused_until in self._user_paused_until.items()
+                if paused_until > now
+            }
+            self._user_paused_until[user_id] = max(
+                self._user_paused_until.get(user_id, 0.0), now + seconds
+            )
+            return
+
+        self._global_bucket.pause(seconds=seconds)
+
+    async def __call__(
+        self: "RequestScheduler",
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        priority = get_request_priority(method=method)
+        chat_id = get_request_chat_id(method=method)
+        user_id = get_request_user_id(method=method)
+
+        attempt = 0
+        while True:
+            await self.acquire(chat_id=chat_id, user_id=user_id, priority=priority)
+            self.requests += 1
+
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as telegram_retry_after:
+                if attempt >= self.max_retries:
+                    raise
+
+                attempt += 1
+                self.retries += 1
+                self.pause(
+                    chat_id=chat_id,
+                    user_id=user_id,
+                    seconds=telegram_retry_after.retry_after,
+                )
+
+                logging.warning(
+                    "Flood control on %s (chat %s, user %s), retrying in %s seconds",
+                    type(method).__name__,
+                    chat_id,
+                    user_id,
+                    telegram_retry_after.retry_after,
+                )
+
+    def stats(self: "RequestScheduler") -> RequestSchedulerStats:
+        return RequestSchedulerStats(
+            requests=self.requests,
+            retries=self.retries,
+            queue_depth=self.queue_depth,
+            max_queue_depth=self.max_queue_depth,
+            total_wait_seconds=self.total_wait_seconds,
+            chat_buckets=len(self._chat_buckets),
+            paused_users=sum(
+                paused_until > monotonic()
+                for paused_until in self._user_paused_until.values()
+            ),
+        )
@@ -1,3 +1,4 @@
+import logging
 from random import choices
 from string import ascii_letters
 from typing import TypedDict
@@ -9,28 +10,53 @@ from aiogram.types import (
     Sticker,
     User as TelegramUser,
     File,
-    URLInputFile,
+    InputFile,
     BufferedInputFile,
     PhotoSize,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from model.models import StickerSetModel, UserModel, StickerSetType
+from util.bot_identity import BotIdentity
+from util.cache import BytesCache
+from util.executor import ImageExecutor
+from util.image_cache import ProcessedImageCache
+from util.metrics import stickers_added, stickers_removed, sticker_sets_created
 from util.photo import get_picture_buffered_input
-from util.query.sticker_set import create_sticker_set
+from util.query.sticker_set import (
+    create_sticker_set,
+    delete_sticker_set,
+    get_next_sticker_set_position,
+    get_user_sticker_set_by_name,
+    mark_sticker_set_full,
+    update_sticker_count,
+)
+from util.query.sticker import (
+    create_sticker,
+    delete_sticker,
+    get_sticker_position,
+    get_user_sticker_set_by_file_unique_id,
+)
+from util.transfer import StreamingInputFile
 
 
 class StickerFileInput(TypedDict, total=False):
     png_sticker: str | BufferedInputFile
-    tgs_sticker: URLInputFile
-    webm_sticker: URLInputFile
+    tgs_sticker: InputFile
+    webm_sticker: InputFile
 
 
 async def get_sticker_file_input_from_picture(
-    bot: Bot, picture: PhotoSize
+    bot: Bot,
+    picture: PhotoSize,
+    image_executor: ImageExecutor,
+    image_cache: ProcessedImageCache,
 ) -> StickerFileInput:
     picture_buffered_input: BufferedInputFile = await get_picture_buffered_input(
-        bot=bot, picture=picture
+        bot=bot,
+        picture=picture,
+        image_executor=image_executor,
+        image_cache=image_cache,
     )
 
     return {"png_sticker": picture_buffered_input}
@@ -40,53 +66,60 @@ async def get_sticker_file_input_from_sticker(  # noqa: CFQ004, CCR001
     bot: Bot,
     sticker_set_type: StickerSetType,
     sticker: Sticker,
+    sticker_file_cache: BytesCache[str],
 ) -> StickerFileInput:
-    def build_file_url(_bot: Bot, file_path: str) -> str:
-        return f"https://api.telegram.org/file/bot{_bot.token}/{file_path}"
+    async def get_input_file(extension: str) -> InputFile:
+        filename = f"{sticker.file_unique_id}.{extension}"
+        cached_file = sticker_file_cache.get(sticker.file_unique_id)
+
+        if cached_file:
+            return BufferedInputFile(cached_file, filename=filename)
 
-    if (
-        sticker_set_type == StickerSetType.ANIMATED
-        or sticker_set_type == StickerSetType.VIDEO
-    ):
         sticker_file: File = await bot.get_file(file_id=sticker.file_id)
 
         if not sticker_file.file_path:
             raise Exception("File path is oof.")
 
-        sticker_url = build_file_url(_bot=bot, file_path=sticker_file.file_path)
-
-        url_input_file = URLInputFile(url=sticker_url)
+        return StreamingInputFile(
+            url=bot.session.api.file_url(bot.token, sticker_file.file_path),
+            filename=filename,
+            file_cache=sticker_file_cache,
+            cache_key=sticker.file_unique_id,
+        )
 
-        if sticker_set_type == StickerSetType.ANIMATED:
-            return StickerFileInput(tgs_sticker=url_input_file)
+    if sticker_set_type == StickerSetType.ANIMATED:
+        return StickerFileInput(tgs_sticker=await get_input_file(extension="tgs"))
 
-        if sticker_set_type == StickerSetType.VIDEO:
-            return StickerFileInput(webm_sticker=url_input_file)
+    if sticker_set_type == StickerSetType.VIDEO:
+        return StickerFileInput(webm_sticker=await get_input_file(extension="webm"))
 
     return StickerFileInput(png_sticker=sticker.file_id)
 
 
-async def create_new_sticker_set(  # noqa: CFQ004, CFQ002
+async def register_new_sticker_set(  # noqa: CFQ002
     bot: Bot,
-    message: Message,
+    bot_identity: BotIdentity,
     sticker_set_type: StickerSetType,
     async_session: AsyncSession,
-    telegram_user: TelegramUser,
+    telegram_id: int,
     telegram_user_username: str,
     user: UserModel,
     emojis: str,
+    file_unique_id: str,
     sticker_file_input: StickerFileInput,
-) -> None:
+) -> StickerSetModel:
     def build_sticker_set_title(
-        _sticker_set_type: StickerSetType, username: str
+        _sticker_set_type: StickerSetType, username: str, position: int
     ) -> str:
+        volume = f" #{position + 1}" if position else ""
+
         if _sticker_set_type == StickerSetType.ANIMATED:
-            return f"{username}'s Greatest Animated Hits"
+            return f"{username}'s Greatest Animated Hits{volume}"
 
         if _sticker_set_type == StickerSetType.VIDEO:
-            return f"{username}'s Greatest Video Hits"
+            return f"{username}'s Greatest Video Hits{volume}"
 
-        return f"{username}'s Greatest Hits"
+        return f"{username}'s Greatest Hits{volume}"
 
     def build_sticker_set_prefix(_telegram_user_username: str) -> str:
         def random_letter_string(length: int) -> str:
@@ -94,50 +127,228 @@ async def create_new_sticker_set(  # noqa: CFQ004, CFQ002
 
         return f"{_telegram_user_username}_{random_letter_string(length=4)}"
 
-    bot_user = await bot.get_me()
-    bot_username = bot_user.username
-
-    if not bot_username:
-        raise ValueError("Bot username is not set!")
-
-    sticker_set_title = build_sticker_set_title(
-        _sticker_set_type=sticker_set_type, username=telegram_user_username
-    )
+    bot_username = await bot_identity.get_username(bot=bot)
 
     sticker_pack_prefix: str = build_sticker_set_prefix(
         _telegram_user_username=telegram_user_username
     )
     sticker_set_name = f"{sticker_pack_prefix}_by_{bot_username}"
 
-    sticker_set = await create_sticker_set(
+    async with async_session.begin():
+        position = await get_next_sticker_set_position(
+            async_session=async_session, user=user, sticker_set_type=sticker_set_type
+        )
+
+        sticker_set = await create_sticker_set(
+            async_session=async_session,
+            user=user,
+            sticker_set_type=sticker_set_type,
+            name=sticker_set_name,
+            title=build_sticker_set_title(
+                _sticker_set_type=sticker_set_type,
+                username=telegram_user_username,
+                position=position,
+            ),
+            position=position,
+            sticker_count=1,
+        )
+        await create_sticker(
+            async_session=async_session,
+            sticker_set=sticker_set,
+            file_unique_id=file_unique_id,
+            emoji=emojis,
+            position=0,
+        )
+
+    try:
+        await bot.create_new_sticker_set(
+            user_id=telegram_id,
+            name=sticker_set.name,
+            title=sticker_set.title,
+            emojis=emojis,
+            **sticker_file_input,
+        )
+    except Exception:
+        async with async_session.begin():
+            await delete_sticker_set(
+                async_session=async_session, sticker_set=sticker_set
+            )
+        raise
+
+    sticker_sets_created.inc(sticker_set_type=sticker_set_type.name)
+    stickers_added.inc(sticker_set_type=sticker_set_type.name)
+
+    return sticker_set
+
+
+async def add_sticker_to_user_sticker_set(  # noqa: CFQ002
+    bot: Bot,
+    bot_identity: BotIdentity,
+    async_session: AsyncSession,
+    telegram_id: int,
+    telegram_user_username: str,
+    user: UserModel,
+    sticker_set_type: StickerSetType,
+    sticker_set: StickerSetModel | None,
+    emojis: str,
+    file_unique_id: str,
+    sticker_file_input: StickerFileInput,
+) -> tuple[StickerSetModel, bool]:
+    if sticker_set:
+        try:
+            await bot.add_sticker_to_set(
+                user_id=telegram_id,
+                name=sticker_set.name,
+                emojis=emojis,
+                **sticker_file_input,
+            )
+        except TelegramBadRequest as telegram_bad_request:
+            if not is_sticker_set_full_error(telegram_bad_request):
+                raise
+
+            async with async_session.begin():
+                await mark_sticker_set_full(
+                    async_session=async_session, sticker_set=sticker_set
+                )
+        else:
+            async with async_session.begin():
+                await create_sticker(
+                    async_session=async_session,
+                    sticker_set=sticker_set,
+                    file_unique_id=file_unique_id,
+                    emoji=emojis,
+                    position=sticker_set.sticker_count,
+                )
+                await update_sticker_count(
+                    async_session=async_session, sticker_set=sticker_set, delta=1
+                )
+
+            stickers_added.inc(sticker_set_type=sticker_set_type.name)
+            return sticker_set, False
+
+    sticker_set = await register_new_sticker_set(
+        bot=bot,
+        bot_identity=bot_identity,
+        sticker_set_type=sticker_set_type,
         async_session=async_session,
+        telegram_id=telegram_id,
+        telegram_user_username=telegram_user_username,
         user=user,
-        sticker_set_type=sticker_set_type,
-        name=sticker_set_name,
-        title=sticker_set_title,
+        emojis=emojis,
+        file_unique_id=file_unique_id,
+        sticker_file_input=sticker_file_input,
     )
+    return sticker_set, True
 
-    await bot.create_new_sticker_set(
-        user_id=telegram_user.id,
-        name=sticker_set.name,
-        title=sticker_set.title,
-        emojis=emojis,
-        **sticker_file_input,
+
+def build_sticker_addition_text(sticker_set: StickerSetModel, created: bool) -> str:
+    text = "Sticker pack created!" if created else "Sticker added to the pack."
+
+    return (
+        f"{text}\n\n"
+        f"Link: <a href='https://t.me/addstickers/{sticker_set.name}'>{sticker_set.title}</a>"  # noqa: E501
     )
 
+
+def is_sticker_set_full_error(telegram_bad_request: TelegramBadRequest) -> bool:
+    return "STICKERS_TOO_MUCH" in telegram_bad_request.message
+
+
+async def get_owned_sticker_set(
+    bot: Bot,
+    bot_identity: BotIdentity,
+    async_session: AsyncSession,
+    user: UserModel,
+    sticker_set: StickerSetModel | None,
+    sticker: Sticker,
+) -> StickerSetModel | None:
+    if not sticker.set_name:
+        return None
+
+    if sticker_set and sticker.set_name == sticker_set.name:
+        return sticker_set
+
+    bot_username = await bot_identity.get_username(bot=bot)
+
+    if not sticker.set_name.endswith(f"_by_{bot_username}"):
+        return None
+
+    async with async_session.begin():
+        return await get_user_sticker_set_by_name(
+            async_session=async_session, user=user, name=sticker.set_name
+        )
+
+
+async def handle_duplicate_sticker(
+    message: Message,
+    async_session: AsyncSession,
+    user: UserModel,
+    file_unique_id: str,
+) -> bool:
+    async with async_session.begin():
+        sticker_set = await get_user_sticker_set_by_file_unique_id(
+            async_session=async_session, user=user, file_unique_id=file_unique_id
+        )
+
+    if not sticker_set:
+        return False
+
     await message.reply(
-        "Sticker pack created!\n\n"
-        f"Link: <a href='https://t.me/addstickers/{sticker_set_name}'>{sticker_set.title}</a>",  # noqa: E501
+        "This sticker is already in your pack.\n\n"
+        f"Link: <a href='https://t.me/addstickers/{sticker_set.name}'>{sticker_set.title}</a>",  # noqa: E501
         parse_mode="HTML",
     )
+    return True
+
+
+async def get_received_sticker_position(
+    bot: Bot,
+    async_session: AsyncSession,
+    sticker_set: StickerSetModel,
+    received_sticker: Sticker,
+) -> int | None:
+    async with async_session.begin():
+        position = await get_sticker_position(
+            async_session=async_session,
+            sticker_set=sticker_set,
+            file_unique_id=received_sticker.file_unique_id,
+        )
+
+    if position is not None:
+        return position
+
+    try:
+        telegram_sticker_set = await bot.get_sticker_set(name=sticker_set.name)
+    except TelegramBadRequest as telegram_bad_request:
+        logging.warning(
+            "Can't fetch sticker set %s: %s",
+            sticker_set.name,
+            telegram_bad_request.message,
+        )
+        return None
+
+    for index, sticker in enumerate(telegram_sticker_set.stickers):
+        if sticker.file_unique_id == received_sticker.file_unique_id:
+            return index
+
+    return None
 
 
 async def handle_sticker_removal(
     bot: Bot,
     message: Message,
+    async_session: AsyncSession,
+    sticker_set: StickerSetModel,
     received_sticker: Sticker,
     admin_username: str,
 ) -> None:
+    position = await get_received_sticker_position(
+        bot=bot,
+        async_session=async_session,
+        sticker_set=sticker_set,
+        received_sticker=received_sticker,
+    )
+
     try:
         await bot.delete_sticker_from_set(sticker=received_sticker.file_id)
     except TelegramBadRequest as telegram_bad_request:
@@ -151,28 +362,52 @@ async def handle_sticker_removal(
             )
             await message.reply(text=text, parse_mode="HTML")
     else:
+        if position is not None:
+            async with async_session.begin():
+                await delete_sticker(
+                    async_session=async_session,
+                    sticker_set=sticker_set,
+                    position=position,
+                )
+                await update_sticker_count(
+                    async_session=async_session, sticker_set=sticker_set, delta=-1
+                )
+
+        stickers_removed.inc(sticker_set_type=sticker_set.sticker_set_type.name)
         await message.reply(
             text="Sticker removed from the pack. It may take a few minutes for sticker pack to update."  # noqa: E501
         )
 
 
-async def handle_sticker_addition(
+async def handle_sticker_addition(  # noqa: CFQ002
     bot: Bot,
+    bot_identity: BotIdentity,
     message: Message,
-    user_sticker_set: StickerSetModel,
+    async_session: AsyncSession,
     telegram_user: TelegramUser,
+    telegram_user_username: str,
+    user: UserModel,
+    sticker_set_type: StickerSetType,
+    user_sticker_set: StickerSetModel | None,
     sticker_file_input: StickerFileInput,
     emojis: str,
+    file_unique_id: str,
 ) -> None:
-    await bot.add_sticker_to_set(
-        user_id=telegram_user.id,
-        name=user_sticker_set.name,
+    sticker_set, created = await add_sticker_to_user_sticker_set(
+        bot=bot,
+        bot_identity=bot_identity,
+        async_session=async_session,
+        telegram_id=telegram_user.id,
+        telegram_user_username=telegram_user_username,
+        user=user,
+        sticker_set_type=sticker_set_type,
+        sticker_set=user_sticker_set,
         emojis=emojis,
-        **sticker_file_input,
+        file_unique_id=file_unique_id,
+        sticker_file_input=sticker_file_input,
     )
 
     await message.reply(
-        "Sticker added to the pack.\n\n"
-        f"Link: <a href='https://t.me/addstickers/{user_sticker_set.name}'>{user_sticker_set.title}</a>",  # noqa: E501
+        build_sticker_addition_text(sticker_set=sticker_set, created=created),
         parse_mode="HTML",
     )
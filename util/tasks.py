@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from util.query.sticker_set import (
+    backfill_sticker_count,
+    get_sticker_sets_without_sticker_count,
+)
+from util.query.update import delete_processed_updates_before
+from util.query.upload_job import delete_upload_jobs_completed_before
+
+
+async def prune_processed_updates(
+    async_engine: AsyncEngine, retention: timedelta, interval: float
+) -> None:
+    while True:
+        try:
+            async with AsyncSession(bind=async_engine) as async_session:
+                async with async_session.begin():
+                    await delete_processed_updates_before(
+                        async_session=async_session,
+                        created_before=datetime.now(tz=timezone.utc) - retention,
+                    )
+        except Exception as exception:
+            logging.error("Can't prune processed updates: %s", exception)
+
+        await asyncio.sleep(interval)
+
+
+async def prune_upload_jobs(
+    async_engine: AsyncEngine, retention: timedelta, interval: float
+) -> None:
+    while True:
+        try:
+            async with AsyncSession(bind=async_engine) as async_session:
+                async with async_session.begin():
+                    await delete_upload_jobs_completed_before(
+                        async_session=async_session,
+                        completed_before=datetime.now(tz=timezone.utc) - retention,
+                    )
+        except Exception as exception:
+            logging.error("Can't prune upload jobs: %s", exception)
+
+        await asyncio.sleep(interval)
+
+
+async def backfill_sticker_counts(bot: Bot, async_engine: AsyncEngine) -> None:
+    async with AsyncSession(bind=async_engine) as async_session:
+        sticker_sets = await get_sticker_sets_without_sticker_count(
+            async_session=async_session
+        )
+
+    backfilled = 0
+
+    for sticker_set in sticker_sets:
+        try:
+            telegram_sticker_set = await bot.get_sticker_set(name=sticker_set.name)
+        except TelegramBadRequest as telegram_bad_request:
+            logging.warning(
+                "Can't backfill sticker count of %s: %s",
+                sticker_set.name,
+                telegram_bad_request.message,
+            )
+            continue
+
+        if not telegram_sticker_set.stickers:
+            continue
+
+        async with AsyncSession(bind=async_engine) as async_session:
+            async with async_session.begin():
+                if await backfill_sticker_count(
+                    async_session=async_session,
+                    sticker_set=sticker_set,
+                    sticker_count=len(telegram_sticker_set.stickers),
+                ):
+                    backfilled += 1
+
+    if backfilled:
+        logging.info("Backfilled sticker counts of %s sticker sets", backfilled)
@@ -0,0 +1,155 @@
+from collections.abc import AsyncGenerator
+from time import monotonic
+from types import SimpleNamespace
+from typing import Any, TypedDict, TYPE_CHECKING
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiohttp import ClientSession, ClientTimeout, TraceConfig
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+class TelegramSessionStats(TypedDict):
+    requests: int
+    connections_created: int
+    connections_reused: int
+    connection_waits: int
+    total_connection_wait_seconds: float
+    max_connection_wait_seconds: float
+    dns_cache_hits: int
+    dns_cache_misses: int
+
+
+class TelegramSession(AiohttpSession):
+    def __init__(  # noqa: CFQ002
+        self: "TelegramSession",
+        connection_limit: int,
+        connection_limit_per_host: int,
+        keepalive_timeout: float,
+        dns_cache_ttl: int,
+        request_timeout: float,
+        connect_timeout: float,
+        read_timeout: float,
+        api: TelegramAPIServer = PRODUCTION,
+    ) -> None:
+        super().__init__(api=api, timeout=request_timeout)
+
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._connector_init.update(
+            limit=connection_limit,
+            limit_per_host=connection_limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=dns_cache_ttl,
+        )
+
+        self._trace_config = TraceConfig()
+        self._trace_config.on_request_start.append(self._on_request_start)
+        self._trace_config.on_connection_create_end.append(
+            self._on_connection_create_end
+        )
+        self._trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+        self._trace_config.on_connection_queued_start.append(
+            self._on_connection_queued_start
+        )
+        self._trace_config.on_connection_queued_end.append(
+            self._on_connection_queued_end
+        )
+        self._trace_config.on_dns_cache_hit.append(self._on_dns_cache_hit)
+        self._trace_config.on_dns_cache_miss.append(self._on_dns_cache_miss)
+
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.connection_waits = 0
+        self.total_connection_wait_seconds = 0.0
+        self.max_connection_wait_seconds = 0.0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+
+    async def create_session(self: "TelegramSession") -> ClientSession:
+        if self._should_reset_connector:
+            await self.close()
+
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                trace_configs=[self._trace_config],
+            )
+            self._should_reset_connector = False
+
+        return self._session
+
+    async def make_request(
+        self: "TelegramSession",
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+        timeout: int | None = None,
+    ) -> TelegramType:
+        return await super().make_request(
+            bot,
+            method,
+            timeout=ClientTimeout(  # type: ignore
+                total=self.timeout if timeout is None else timeout,
+                sock_connect=self.connect_timeout,
+            ),
+        )
+
+    async def stream_content(
+        self: "TelegramSession", url: str, timeout: int, chunk_size: int
+    ) -> AsyncGenerator[bytes, None]:
+        async for chunk in super().stream_content(
+            url=url,
+            timeout=ClientTimeout(  # type: ignore
+                total=timeout,
+                sock_connect=self.connect_timeout,
+                sock_read=self.read_timeout,
+            ),
+            chunk_size=chunk_size,
+        ):
+            yield chunk
+
+    async def _on_request_start(self: "TelegramSession", *_: Any) -> None:
+        self.requests += 1
+
+    async def _on_connection_create_end(self: "TelegramSession", *_: Any) -> None:
+        self.connections_created += 1
+
+    async def _on_connection_reused(self: "TelegramSession", *_: Any) -> None:
+        self.connections_reused += 1
+
+    async def _on_connection_queued_start(self: "TelegramSession", *args: Any) -> None:
+        trace_config_ctx: SimpleNamespace = args[1]
+        self.connection_waits += 1
+        trace_config_ctx.connection_queued_at = monotonic()
+
+    async def _on_connection_queued_end(self: "TelegramSession", *args: Any) -> None:
+        trace_config_ctx: SimpleNamespace = args[1]
+        connection_wait_seconds = monotonic() - trace_config_ctx.connection_queued_at
+        self.total_connection_wait_seconds += connection_wait_seconds
+        self.max_connection_wait_seconds = max(
+            self.max_connection_wait_seconds, connection_wait_seconds
+        )
+
+    async def _on_dns_cache_hit(self: "TelegramSession", *_: Any) -> None:
+        self.dns_cache_hits += 1
+
+    async def _on_dns_cache_miss(self: "TelegramSession", *_: Any) -> None:
+        self.dns_cache_misses += 1
+
+    def stats(self: "TelegramSession") -> TelegramSessionStats:
+        return TelegramSessionStats(
+            requests=self.requests,
+            connections_created=self.connections_created,
+            connections_reused=self.connections_reused,
+            connection_waits=self.connection_waits,
+            total_connection_wait_seconds=self.total_connection_wait_seconds,
+            max_connection_wait_seconds=self.max_connection_wait_seconds,
+            dns_cache_hits=self.dns_cache_hits,
+            dns_cache_misses=self.dns_cache_misses,
+        )
@@ -0,0 +1,404 @@
+import asyncio
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from random import random
+from time import time_ns
+from typing import Any, TypedDict, TYPE_CHECKING
+
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import TelegramMethod, Response
+from aiogram.methods.base import TelegramType
+from aiogram.types import Message, Update, User as TelegramUser
+from aiohttp import ClientSession, ClientTimeout
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+SERVICE_NAME = "sutekkapakku"
+
+AttributeValue = str | int | float | bool
+MessageMiddleware = Callable[
+    [Callable[[Message, dict[str, Any]], Awaitable[Any]], Message, dict[str, Any]],
+    Awaitable[Any],
+]
+
+
+class TracerStats(TypedDict):
+    enabled: bool
+    sample_rate: float
+    traces: int
+    spans: int
+    queued: int
+    dropped: int
+    exported: int
+    export_errors: int
+
+
+class Span:
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "start_time",
+        "end_time",
+        "error",
+    )
+
+    def __init__(
+        self: "Span",
+        name: str,
+        trace_id: str,
+        parent_id: str | None,
+        attributes: dict[str, AttributeValue],
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_time = time_ns()
+        self.end_time = 0
+        self.error: str | None = None
+
+    def set_attribute(self: "Span", key: str, value: AttributeValue) -> None:
+        self.attributes[key] = value
+
+    def end(self: "Span") -> None:
+        self.end_time = time_ns()
+
+    def to_json(self: "Span") -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": (self.end_time - self.start_time) / 1_000_000,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def to_otlp(self: "Span") -> dict[str, Any]:
+        otlp_span: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_time),
+            "endTimeUnixNano": str(self.end_time),
+            "attributes": [
+                {"key": key, "value": get_otlp_value(value=value)}
+                for key, value in self.attributes.items()
+            ],
+        }
+
+        if self.parent_id:
+            otlp_span["parentSpanId"] = self.parent_id
+
+        if self.error:
+            otlp_span["status"] = {"code": 2, "message": self.error}
+
+        return otlp_span
+
+
+def get_otlp_value(value: AttributeValue) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+
+    if isinstance(value, float):
+        return {"doubleValue": value}
+
+    return {"stringValue": value}
+
+
+class SpanExporter(ABC):
+    @abstractmethod
+    async def export(self: "SpanExporter", spans: list[Span]) -> None:
+        pass
+
+    async def close(self: "SpanExporter") -> None:
+        pass
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    def __init__(self: "JsonLinesSpanExporter", path: str) -> None:
+        self.path = path
+
+    def _write(self: "JsonLinesSpanExporter", lines: list[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("".join(lines))
+
+    async def export(self: "JsonLinesSpanExporter", spans: list[Span]) -> None:
+        lines = [
+            json.dumps(span.to_json(), ensure_ascii=False) + "\n" for span in spans
+        ]
+        await asyncio.to_thread(self._write, lines)
+
+
+class OtlpSpanExporter(SpanExporter):
+    def __init__(self: "OtlpSpanExporter", endpoint: str, timeout: float = 10) -> None:
+        self.url = f"{endpoint.rstrip('/')}/v1/traces"
+        self.timeout = timeout
+        self._client_session: ClientSession | None = None
+
+    async def export(self: "OtlpSpanExporter", spans: list[Span]) -> None:
+        if not self._client_session:
+            self._client_session = ClientSession(
+                timeout=ClientTimeout(total=self.timeout)
+            )
+
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": SERVICE_NAME},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": SERVICE_NAME},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+        async with self._client_session.post(self.url, json=payload) as response:
+            response.raise_for_status()
+
+    async def close(self: "OtlpSpanExporter") -> None:
+        if self._client_session:
+            await self._client_session.close()
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    def __init__(self: "Tracer") -> None:
+        self.exporter: SpanExporter | None = None
+        self.sample_rate = 0.0
+        self.flush_interval = 5.0
+        self.max_queue_size = 10_000
+
+        self._spans: list[Span] = []
+        self._flush_task: asyncio.Task[None] | None = None
+
+        self.traces = 0
+        self.spans = 0
+        self.dropped = 0
+        self.exported = 0
+        self.export_errors = 0
+
+    def configure(
+        self: "Tracer",
+        exporter: SpanExporter | None,
+        sample_rate: float,
+        flush_interval: float,
+        max_queue_size: int,
+    ) -> None:
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+
+    @property
+    def enabled(self: "Tracer") -> bool:
+        return self.exporter is not None and self.sample_rate > 0
+
+    @contextmanager
+    def start_trace(
+        self: "Tracer", name: str, **attributes: AttributeValue
+    ) -> Iterator[Span | None]:
+        if not self.enabled or random() >= self.sample_rate:
+            yield None
+            return
+
+        self.traces += 1
+
+        with self._start_span(
+            name=name,
+            trace_id=os.urandom(16).hex(),
+            parent_id=None,
+            attributes=attributes,
+        ) as span:
+            yield span
+
+    @contextmanager
+    def span(
+        self: "Tracer", name: str, **attributes: AttributeValue
+    ) -> Iterator[Span | None]:
+        parent = _current_span.get()
+
+        if parent is None:
+            yield None
+            return
+
+        with self._start_span(
+            name=name,
+            trace_id=parent.trace_id,
+            parent_id=parent.span_id,
+            attributes=attributes,
+        ) as span:
+            yield span
+
+    @contextmanager
+    def _start_span(
+        self: "Tracer",
+        name: str,
+        trace_id: str,
+        parent_id: str | None,
+        attributes: dict[str, AttributeValue],
+    ) -> Iterator[Span]:
+        span = Span(
+            name=name, trace_id=trace_id, parent_id=parent_id, attributes=attributes
+        )
+        token = _current_span.set(span)
+
+        try:
+            yield span
+        except BaseException as exception:
+            span.error = type(exception).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            self._finish(span=span)
+
+    def _finish(self: "Tracer", span: Span) -> None:
+        self.spans += 1
+
+        if len(self._spans) >= self.max_queue_size:
+            self.dropped += 1
+            return
+
+        self._spans.append(span)
+
+    def start(self: "Tracer") -> None:
+        if self.enabled and not self._flush_task:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self: "Tracer") -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self: "Tracer") -> None:
+        if not self.exporter or not self._spans:
+            return
+
+        spans, self._spans = self._spans, []
+
+        try:
+            await self.exporter.export(spans)
+        except Exception as exception:
+            self.export_errors += 1
+            logging.error("Can't export %s spans: %s", len(spans), exception)
+            return
+
+        self.exported += len(spans)
+
+    async def close(self: "Tracer") -> None:
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+        await self.flush()
+
+        if self.exporter:
+            await self.exporter.close()
+
+    def stats(self: "Tracer") -> TracerStats:
+        return TracerStats(
+            enabled=self.enabled,
+            sample_rate=self.sample_rate,
+            traces=self.traces,
+            spans=self.spans,
+            queued=len(self._spans),
+            dropped=self.dropped,
+            exported=self.exported,
+            export_errors=self.export_errors,
+        )
+
+
+tracer = Tracer()
+
+
+def create_span_exporter(
+    file_path: str | None, otlp_endpoint: str | None
+) -> SpanExporter | None:
+    if otlp_endpoint:
+        return OtlpSpanExporter(endpoint=otlp_endpoint)
+
+    if file_path:
+        return JsonLinesSpanExporter(path=file_path)
+
+    return None
+
+
+async def trace_update(
+    handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+    update: Update,
+    data: dict[str, Any],
+) -> Any:
+    telegram_user: TelegramUser | None = data.get("event_from_user")
+
+    with tracer.start_trace("update", update_id=update.update_id) as span:
+        if span and telegram_user:
+            span.set_attribute("user_id", telegram_user.id)
+
+        return await handler(update, data)
+
+
+def traced_middleware(middleware: MessageMiddleware) -> MessageMiddleware:
+    @wraps(middleware)
+    async def wrapper(
+        handler: Callable[[Message, dict[str, Any]], Awaitable[Any]],
+        message: Message,
+        data: dict[str, Any],
+    ) -> Any:
+        with tracer.span(f"middleware {middleware.__name__}"):
+            return await middleware(handler, message, data)
+
+    return wrapper
+
+
+async def trace_handler(
+    handler: Callable[[Message, dict[str, Any]], Awaitable[Any]],
+    message: Message,
+    data: dict[str, Any],
+) -> Any:
+    with tracer.span("handler", router=data["event_router"].name):
+        return await handler(message, data)
+
+
+class TelegramRequestTracing(BaseRequestMiddleware):
+    async def __call__(
+        self: "TelegramRequestTracing",
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        method_name = type(method).__name__
+
+        with tracer.span(f"telegram {method_name}", method=method_name):
+            return await make_request(bot, method)
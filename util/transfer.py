@@ -0,0 +1,51 @@
+from collections.abc import AsyncGenerator
+
+from aiogram import Bot
+from aiogram.types import InputFile
+from aiogram.types.input_file import DEFAULT_CHUNK_SIZE
+
+from util.cache import BytesCache
+from util.metrics import downloaded_bytes, uploaded_bytes
+
+MAX_CACHEABLE_FILE_SIZE = 512 * 1024
+
+
+class StreamingInputFile(InputFile):
+    def __init__(  # noqa: CFQ002
+        self: "StreamingInputFile",
+        url: str,
+        filename: str,
+        file_cache: BytesCache[str],
+        cache_key: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        timeout: int = 30,
+    ) -> None:
+        super().__init__(filename=filename, chunk_size=chunk_size)
+
+        self.url = url
+        self.timeout = timeout
+        self.file_cache = file_cache
+        self.cache_key = cache_key
+
+    async def read(
+        self: "StreamingInputFile", chunk_size: int
+    ) -> AsyncGenerator[bytes, None]:
+        bot = Bot.get_current(no_error=False)
+        buffer = bytearray()
+        cacheable = True
+
+        async for chunk in bot.session.stream_content(
+            url=self.url, timeout=self.timeout, chunk_size=chunk_size
+        ):
+            if cacheable and len(buffer) + len(chunk) <= MAX_CACHEABLE_FILE_SIZE:
+                buffer.extend(chunk)
+            else:
+                cacheable = False
+                buffer.clear()
+
+            downloaded_bytes.inc(len(chunk))
+            uploaded_bytes.inc(len(chunk))
+            yield chunk
+
+        if cacheable:
+            self.file_cache.set(self.cache_key, bytes(buffer))
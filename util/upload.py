@@ -0,0 +1,447 @@
+import asyncio
+import json
+import logging
+from datetime import timedelta
+from random import uniform
+from typing import Any, TypedDict
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from aiogram.types import Message, PhotoSize, Sticker
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from model.models import (
+    StickerSetType,
+    UploadJobModel,
+    UploadJobSource,
+    UserModel,
+)
+from util.bot_identity import BotIdentity
+from util.cache import BytesCache
+from util.executor import ImageExecutor
+from util.image_cache import ProcessedImageCache
+from util.query.sticker import get_user_sticker_set_by_file_unique_id
+from util.query.sticker_set import get_sticker_set_for_user_by_type
+from util.query.upload_job import (
+    claim_upload_job,
+    complete_upload_job,
+    create_upload_job,
+    renew_upload_job_lease,
+    reschedule_upload_job,
+)
+from util.sticker import (
+    StickerFileInput,
+    add_sticker_to_user_sticker_set,
+    build_sticker_addition_text,
+    get_sticker_file_input_from_picture,
+    get_sticker_file_input_from_sticker,
+)
+from util.tracing import tracer
+
+
+class PermanentUploadJobError(Exception):
+    pass
+
+
+PERMANENT_UPLOAD_ERRORS = (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    PermanentUploadJobError,
+)
+
+
+class UploadJobWorkerStats(TypedDict):
+    running: int
+    enqueued: int
+    completed: int
+    duplicates: int
+    retried: int
+    failed: int
+
+
+def get_upload_job_payload(file: Sticker | PhotoSize) -> dict[str, Any]:
+    payload: dict[str, Any] = json.loads(file.json(exclude_none=True))
+    return payload
+
+
+def get_retry_delay(
+    attempts: int, retry_delay: float, max_retry_delay: float, exception: Exception
+) -> float:
+    delay = min(retry_delay * 2 ** (attempts - 1), max_retry_delay)
+
+    if isinstance(exception, TelegramRetryAfter):
+        delay = max(delay, exception.retry_after)
+
+    return delay * uniform(1.0, 1.25)
+
+
+class UploadJobWorker:
+    def __init__(  # noqa: CFQ002
+        self: "UploadJobWorker",
+        async_engine: AsyncEngine,
+        bot_identity: BotIdentity,
+        sticker_file_cache: BytesCache[str],
+        image_executor: ImageExecutor,
+        image_cache: ProcessedImageCache,
+        concurrency: int,
+        poll_interval: float,
+        lease: float,
+        max_attempts: int,
+        retry_delay: float,
+        max_retry_delay: float,
+    ) -> None:
+        self.async_engine = async_engine
+        self.bot_identity = bot_identity
+        self.sticker_file_cache = sticker_file_cache
+        self.image_executor = image_executor
+        self.image_cache = image_cache
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self._tasks: list[asyncio.Task[None]] = []
+        self._wakeup = asyncio.Event()
+
+        self.running = 0
+        self.enqueued = 0
+        self.completed = 0
+        self.duplicates = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def enqueue(  # noqa: CFQ002
+        self: "UploadJobWorker",
+        async_session: AsyncSession,
+        message: Message,
+        user: UserModel,
+        telegram_user_username: str,
+        sticker_set_type: StickerSetType,
+        emojis: str,
+        source: UploadJobSource,
+        file: Sticker | PhotoSize,
+    ) -> None:
+        async with async_session.begin():
+            created = await create_upload_job(
+                async_session=async_session,
+                idempotency_key=f"{message.chat.id}:{message.message_id}",
+                user_id=user.id,
+                source=source,
+                payload=get_upload_job_payload(file=file),
+                sticker_set_type=sticker_set_type,
+                emojis=emojis,
+                file_unique_id=file.file_unique_id,
+                telegram_user_username=telegram_user_username,
+                chat_id=message.chat.id,
+                message_id=message.message_id,
+            )
+
+        if created:
+            self.enqueued += 1
+            self._wakeup.set()
+
+    def start(self: "UploadJobWorker", bot: Bot) -> None:
+        for _ in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._work(bot=bot)))
+
+    async def _work(self: "UploadJobWorker", bot: Bot) -> None:
+        token = Bot.set_current(bot)
+
+        try:
+            while True:
+                self._wakeup.clear()
+
+                try:
+                    upload_job = await self._claim()
+                except Exception as exception:
+                    logging.error("Can't claim upload job: %s", exception)
+                    upload_job = None
+
+                if not upload_job:
+                    try:
+                        await asyncio.wait_for(
+                            self._wakeup.wait(), timeout=self.poll_interval
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+
+                    continue
+
+                try:
+                    await self._run(bot=bot, upload_job=upload_job)
+                except Exception as exception:
+                    logging.exception(
+                        "Upload job %s crashed: %s", upload_job.id, exception
+                    )
+        finally:
+            Bot.reset_current(token)
+
+    async def _claim(self: "UploadJobWorker") -> UploadJobModel | None:
+        async with AsyncSession(
+            bind=self.async_engine, expire_on_commit=False
+        ) as async_session:
+            async with async_session.begin():
+                return await claim_upload_job(
+                    async_session=async_session, lease=timedelta(seconds=self.lease)
+                )
+
+    async def _run(
+        self: "UploadJobWorker", bot: Bot, upload_job: UploadJobModel
+    ) -> None:
+        self.running += 1
+
+        try:
+            with tracer.start_trace(
+                "upload job", job_id=upload_job.id, attempt=upload_job.attempts
+            ):
+                text = await self._upload_leased(bot=bot, upload_job=upload_job)
+        except asyncio.CancelledError:
+            await self._reschedule(
+                upload_job=upload_job,
+                delay=0.0,
+                error="Interrupted by shutdown",
+                refund_attempt=True,
+            )
+            raise
+        except Exception as exception:
+            await self._handle_failure(
+                bot=bot, upload_job=upload_job, exception=exception
+            )
+        else:
+            self.completed += 1
+
+            if await self._complete(upload_job=upload_job, error=None):
+                await self._notify(bot=bot, upload_job=upload_job, text=text)
+        finally:
+            self.running -= 1
+
+    async def _upload_leased(
+        self: "UploadJobWorker", bot: Bot, upload_job: UploadJobModel
+    ) -> str:
+        lease_renewal = asyncio.create_task(self._renew_lease(upload_job=upload_job))
+
+        try:
+            return await self._upload(bot=bot, upload_job=upload_job)
+        finally:
+            lease_renewal.cancel()
+
+    async def _renew_lease(self: "UploadJobWorker", upload_job: UploadJobModel) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+
+            try:
+                async with AsyncSession(bind=self.async_engine) as async_session:
+                    async with async_session.begin():
+                        renewed = await renew_upload_job_lease(
+                            async_session=async_session,
+                            job_id=upload_job.id,
+                            attempts=upload_job.attempts,
+                            lease=timedelta(seconds=self.lease),
+                        )
+            except Exception as exception:
+                logging.error(
+                    "Can't renew upload job %s lease: %s", upload_job.id, exception
+                )
+                continue
+
+            if not renewed:
+                logging.warning("Upload job %s lost its lease", upload_job.id)
+                return
+
+    async def _upload(
+        self: "UploadJobWorker", bot: Bot, upload_job: UploadJobModel
+    ) -> str:
+        async with AsyncSession(
+            bind=self.async_engine, expire_on_commit=False
+        ) as async_session:
+            async with async_session.begin():
+                user = await async_session.get(UserModel, upload_job.user_id)
+
+                if not user:
+                    raise PermanentUploadJobError(
+                        f"User {upload_job.user_id} does not exist"
+                    )
+
+                duplicate_sticker_set = await get_user_sticker_set_by_file_unique_id(
+                    async_session=async_session,
+                    user=user,
+                    file_unique_id=upload_job.file_unique_id,
+                )
+                sticker_set = await get_sticker_set_for_user_by_type(
+                    async_session=async_session,
+                    user=user,
+                    sticker_set_type=upload_job.sticker_set_type,
+                )
+
+            if duplicate_sticker_set:
+                self.duplicates += 1
+                return (
+                    "This sticker is already in your pack.\n\n"
+                    f"Link: <a href='https://t.me/addstickers/{duplicate_sticker_set.name}'>{duplicate_sticker_set.title}</a>"  # noqa: E501
+                )
+
+            sticker_set, created = await add_sticker_to_user_sticker_set(
+                bot=bot,
+                bot_identity=self.bot_identity,
+                async_session=async_session,
+                telegram_id=user.telegram_id,
+                telegram_user_username=upload_job.telegram_user_username,
+                user=user,
+                sticker_set_type=upload_job.sticker_set_type,
+                sticker_set=sticker_set,
+                emojis=upload_job.emojis,
+                file_unique_id=upload_job.file_unique_id,
+                sticker_file_input=await self._get_sticker_file_input(
+                    bot=bot, upload_job=upload_job
+                ),
+            )
+
+        return build_sticker_addition_text(sticker_set=sticker_set, created=created)
+
+    async def _get_sticker_file_input(
+        self: "UploadJobWorker", bot: Bot, upload_job: UploadJobModel
+    ) -> StickerFileInput:
+        if upload_job.source == UploadJobSource.PICTURE:
+            return await get_sticker_file_input_from_picture(
+                bot=bot,
+                picture=PhotoSize(**upload_job.payload),
+                image_executor=self.image_executor,
+                image_cache=self.image_cache,
+            )
+
+        return await get_sticker_file_input_from_sticker(
+            bot=bot,
+            sticker_set_type=upload_job.sticker_set_type,
+            sticker=Sticker(**upload_job.payload),
+            sticker_file_cache=self.sticker_file_cache,
+        )
+
+    async def _handle_failure(
+        self: "UploadJobWorker",
+        bot: Bot,
+        upload_job: UploadJobModel,
+        exception: Exception,
+    ) -> None:
+        error = f"{type(exception).__name__}: {exception}"[:1024]
+
+        if (
+            isinstance(exception, PERMANENT_UPLOAD_ERRORS)
+            or upload_job.attempts >= self.max_attempts
+        ):
+            logging.warning(
+                "Upload job %s failed after %s attempts: %s",
+                upload_job.id,
+                upload_job.attempts,
+                error,
+            )
+            self.failed += 1
+
+            if await self._complete(upload_job=upload_job, error=error):
+                await self._notify(
+                    bot=bot,
+                    upload_job=upload_job,
+                    text="I couldn't add this sticker to your pack 🥲\n"
+                    "Please try again later.",
+                )
+            return
+
+        delay = get_retry_delay(
+            attempts=upload_job.attempts,
+            retry_delay=self.retry_delay,
+            max_retry_delay=self.max_retry_delay,
+            exception=exception,
+        )
+        logging.warning(
+            "Upload job %s attempt %s failed, retrying in %.1fs: %s",
+            upload_job.id,
+            upload_job.attempts,
+            delay,
+            error,
+        )
+        self.retried += 1
+        await self._reschedule(
+            upload_job=upload_job, delay=delay, error=error, refund_attempt=False
+        )
+
+    async def _complete(
+        self: "UploadJobWorker", upload_job: UploadJobModel, error: str | None
+    ) -> bool:
+        async with AsyncSession(bind=self.async_engine) as async_session:
+            async with async_session.begin():
+                completed = await complete_upload_job(
+                    async_session=async_session,
+                    job_id=upload_job.id,
+                    attempts=upload_job.attempts,
+                    error=error,
+                )
+
+        if not completed:
+            logging.warning(
+                "Upload job %s was claimed by another worker, not completing it",
+                upload_job.id,
+            )
+
+        return completed
+
+    async def _reschedule(
+        self: "UploadJobWorker",
+        upload_job: UploadJobModel,
+        delay: float,
+        error: str,
+        refund_attempt: bool,
+    ) -> None:
+        async with AsyncSession(bind=self.async_engine) as async_session:
+            async with async_session.begin():
+                rescheduled = await reschedule_upload_job(
+                    async_session=async_session,
+                    job_id=upload_job.id,
+                    attempts=upload_job.attempts,
+                    delay=timedelta(seconds=delay),
+                    error=error,
+                    refund_attempt=refund_attempt,
+                )
+
+        if not rescheduled:
+            logging.warning(
+                "Upload job %s was claimed by another worker, not rescheduling it",
+                upload_job.id,
+            )
+
+    async def _notify(
+        self: "UploadJobWorker", bot: Bot, upload_job: UploadJobModel, text: str
+    ) -> None:
+        try:
+            await bot.send_message(
+                chat_id=upload_job.chat_id,
+                text=text,
+                parse_mode="HTML",
+                reply_to_message_id=upload_job.message_id,
+                allow_sending_without_reply=True,
+            )
+        except (TelegramBadRequest, TelegramForbiddenError) as exception:
+            logging.warning(
+                "Can't notify about upload job %s: %s", upload_job.id, exception
+            )
+
+    async def close(self: "UploadJobWorker") -> None:
+        for upload_task in self._tasks:
+            upload_task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def stats(self: "UploadJobWorker") -> UploadJobWorkerStats:
+        return UploadJobWorkerStats(
+            running=self.running,
+            enqueued=self.enqueued,
+            completed=self.completed,
+            duplicates=self.duplicates,
+            retried=self.retried,
+            failed=self.failed,
+        )
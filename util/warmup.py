@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import TypedDict
+
+from aiogram import Bot
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from util.bot_identity import BotIdentity
+from util.emoji_caption import get_emoji_patterns
+from util.executor import ImageExecutor
+from util.photo import preload_image_library
+
+
+class ReadinessStats(TypedDict):
+    ready: bool
+    warm_up_seconds: float
+
+
+async def warm_up_database(async_engine: AsyncEngine, connections: int) -> None:
+    async def open_connection() -> None:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    await asyncio.gather(*[open_connection() for _ in range(connections)])
+
+
+class Readiness:
+    def __init__(self: "Readiness") -> None:
+        self.ready = False
+        self.warm_up_seconds = 0.0
+
+    async def warm_up(
+        self: "Readiness",
+        bot: Bot,
+        bot_identity: BotIdentity,
+        async_engine: AsyncEngine,
+        image_executor: ImageExecutor,
+        database_connections: int,
+    ) -> None:
+        started_at = monotonic()
+
+        await asyncio.gather(
+            bot_identity.refresh(bot=bot),
+            warm_up_database(
+                async_engine=async_engine, connections=database_connections
+            ),
+            image_executor.warm_up(preload_image_library),
+            asyncio.to_thread(get_emoji_patterns),
+        )
+
+        self.warm_up_seconds = monotonic() - started_at
+        logging.info("Warmed up in %.3fs", self.warm_up_seconds)
+
+    async def check(self: "Readiness") -> tuple[bool, str]:
+        return self.ready, "ready" if self.ready else "not ready"
+
+    def stats(self: "Readiness") -> ReadinessStats:
+        return ReadinessStats(ready=self.ready, warm_up_seconds=self.warm_up_seconds)
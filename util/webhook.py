@@ -0,0 +1,253 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import Any, TypedDict
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from util.query.update import (
+    save_pending_update,
+    delete_pending_update,
+    get_pending_updates,
+    mark_update_as_processed,
+)
+
+
+class UpdateQueueStats(TypedDict):
+    depth: int
+    in_flight: int
+    max_size: int
+    workers: int
+    oldest_age_seconds: float
+    enqueued: int
+    duplicates: int
+    restored: int
+    rejected: int
+    processed: int
+    failed: int
+
+
+class UpdateAcknowledgement:
+    def __init__(self: "UpdateAcknowledgement", update_id: int, pending: bool) -> None:
+        self.update_id = update_id
+        self.pending = pending
+        self.deferred = False
+        self.completed = False
+
+    def defer(self: "UpdateAcknowledgement") -> None:
+        self.deferred = True
+
+    async def complete(
+        self: "UpdateAcknowledgement", async_session: AsyncSession
+    ) -> None:
+        await mark_update_as_processed(
+            async_session=async_session, update_id=self.update_id
+        )
+
+        if self.pending:
+            await delete_pending_update(
+                async_session=async_session, update_id=self.update_id
+            )
+
+        self.completed = True
+
+
+class UpdateQueue:
+    def __init__(
+        self: "UpdateQueue",
+        dispatcher: Dispatcher,
+        bot: Bot,
+        async_engine: AsyncEngine,
+        max_size: int,
+        workers: int,
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.async_engine = async_engine
+        self.max_size = max_size
+        self.workers = workers
+
+        self._queue: asyncio.Queue[
+            asyncio.Future[dict[str, Any] | None]
+        ] = asyncio.Queue(maxsize=max_size)
+        self._received_at: dict[int, float] = {}
+        self._worker_tasks: list[asyncio.Task[None]] = []
+
+        self.in_flight = 0
+        self.enqueued = 0
+        self.duplicates = 0
+        self.restored = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+
+    @property
+    def depth(self: "UpdateQueue") -> int:
+        return self._queue.qsize()
+
+    @property
+    def oldest_age_seconds(self: "UpdateQueue") -> float:
+        if not self._received_at:
+            return 0.0
+
+        return monotonic() - min(self._received_at.values())
+
+    async def put(self: "UpdateQueue", update: dict[str, Any]) -> bool:
+        queued_update: asyncio.Future[
+            dict[str, Any] | None
+        ] = asyncio.get_running_loop().create_future()
+
+        try:
+            self._queue.put_nowait(queued_update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+        try:
+            async with AsyncSession(bind=self.async_engine) as async_session:
+                async with async_session.begin():
+                    is_new_update = await save_pending_update(
+                        async_session=async_session,
+                        update_id=update["update_id"],
+                        payload=update,
+                    )
+
+            if not is_new_update:
+                self.duplicates += 1
+                return True
+
+            self.enqueued += 1
+            self._received_at.setdefault(update["update_id"], monotonic())
+            queued_update.set_result(update)
+            return True
+        finally:
+            if not queued_update.done():
+                queued_update.set_result(None)
+
+    async def _enqueue(self: "UpdateQueue", update: dict[str, Any]) -> None:
+        queued_update: asyncio.Future[
+            dict[str, Any] | None
+        ] = asyncio.get_running_loop().create_future()
+        queued_update.set_result(update)
+
+        self._received_at.setdefault(update["update_id"], monotonic())
+        await self._queue.put(queued_update)
+
+    async def restore(self: "UpdateQueue") -> None:
+        async with AsyncSession(bind=self.async_engine) as async_session:
+            pending_updates = await get_pending_updates(async_session=async_session)
+
+        for update in pending_updates:
+            await self._enqueue(update=update)
+
+        self.restored += len(pending_updates)
+
+        if pending_updates:
+            logging.info("Restored %s pending updates", len(pending_updates))
+
+    def start(self: "UpdateQueue") -> None:
+        self._worker_tasks = [
+            asyncio.create_task(self._work(), name=f"update-queue-{worker_index}")
+            for worker_index in range(self.workers)
+        ]
+
+    async def _work(self: "UpdateQueue") -> None:
+        while True:
+            queued_update = await self._queue.get()
+
+            try:
+                update = await queued_update
+
+                if update is None:
+                    continue
+
+                self.in_flight += 1
+
+                try:
+                    await self._process(update=update)
+                finally:
+                    self.in_flight -= 1
+                    self._received_at.pop(update["update_id"], None)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self: "UpdateQueue", update: dict[str, Any]) -> None:
+        update_acknowledgement = UpdateAcknowledgement(
+            update_id=update["update_id"], pending=True
+        )
+
+        try:
+            result = await self.dispatcher.feed_raw_update(
+                bot=self.bot,
+                update=update,
+                update_acknowledgement=update_acknowledgement,
+            )
+
+            if isinstance(result, TelegramMethod):
+                await self.dispatcher.silent_call_request(bot=self.bot, result=result)
+
+            self.processed += 1
+        except Exception as exception:
+            self.failed += 1
+            logging.exception(
+                "Can't process update %s: %s", update["update_id"], exception
+            )
+
+        if update_acknowledgement.deferred or update_acknowledgement.completed:
+            return
+
+        async with AsyncSession(bind=self.async_engine) as async_session:
+            async with async_session.begin():
+                await delete_pending_update(
+                    async_session=async_session, update_id=update["update_id"]
+                )
+
+    async def close(self: "UpdateQueue") -> None:
+        for worker_task in self._worker_tasks:
+            worker_task.cancel()
+
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def stats(self: "UpdateQueue") -> UpdateQueueStats:
+        return UpdateQueueStats(
+            depth=self.depth,
+            in_flight=self.in_flight,
+            max_size=self.max_size,
+            workers=self.workers,
+            oldest_age_seconds=self.oldest_age_seconds,
+            enqueued=self.enqueued,
+            duplicates=self.duplicates,
+            restored=self.restored,
+            rejected=self.rejected,
+            processed=self.processed,
+            failed=self.failed,
+        )
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    def __init__(
+        self: "QueuedRequestHandler",
+        dispatcher: Dispatcher,
+        bot: Bot,
+        update_queue: UpdateQueue,
+    ) -> None:
+        super().__init__(dispatcher=dispatcher, bot=bot)
+        self.update_queue = update_queue
+
+    async def handle(
+        self: "QueuedRequestHandler", request: web.Request
+    ) -> web.Response:
+        update = await request.json(loads=self.bot.session.json_loads)
+
+        if not await self.update_queue.put(update=update):
+            logging.warning("Update queue is full, rejecting %s", update["update_id"])
+            return web.json_response({}, status=503, dumps=self.bot.session.json_dumps)
+
+        return web.json_response({}, dumps=self.bot.session.json_dumps)
+
+    __call__ = handle